@@ -1,4 +1,6 @@
 from server import create_server
 
-server = create_server()
-server.start_io()
+# The guard keeps the worker processes of the server from starting a server
+if __name__ == "__main__":
+    server = create_server()
+    server.start_io()
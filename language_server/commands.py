@@ -1,18 +1,76 @@
 from __future__ import annotations
 
 import asyncio
-from concurrent.futures import Future
-from typing import Awaitable, NamedTuple, TypedDict, cast
+import contextlib
+import functools
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    AsyncContextManager,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    NamedTuple,
+    TypedDict,
+    TypeVar,
+    cast,
+)
 
 import lsprotocol.types as lsp
+from openai import AsyncOpenAI, OpenAIError
+from pygls import uris
 from pygls.workspace import TextDocument as LSPTextDocument
 
 import server
-from settings import ALLOWED_PROXY_PROTOCOLS
-from utils import get_entity_at_cursor, mark_as_command, match_line_endings
-from utils.code_analyzers.base import CodeEntity, NamedCodeEntity
-from utils.docstring import format_docstring, generate_docstring, parse_docstring
+from settings import (
+    ALLOWED_PROXY_PROTOCOLS,
+    DEFAULT_BASE_URL,
+    MAX_PACKED_CODE_LENGTH,
+    MAX_PACKED_ENTITY_LENGTH,
+)
+from utils import (
+    get_document_entity_at_cursor,
+    mark_as_command,
+    match_line_endings,
+)
+from utils.batch import (
+    AnalyzedFile,
+    BatchJournal,
+    WorkspaceJob,
+    discover_workspace_files,
+)
+from utils.code_analyzers.base import BaseClass, CodeEntity, NamedCodeEntity
+from utils.code_analyzers.cache import AnalyzerCache
+from utils.code_analyzers.line_index import LINE_BREAK_RE
+from utils.docstring import (
+    PACKED_SYSTEM_MESSAGE,
+    SYSTEM_MESSAGE,
+    PackedResponseError,
+    format_docstring,
+    generate_docstring,
+    pack_prompts,
+    parse_docstring,
+    stream_docstring,
+    unpack_response,
+)
+from utils.docstring_cache import DocstringCache
+from utils.docstring_sections import (
+    SECTIONS_PROMPT_PATTERN,
+    SECTIONS_SYSTEM_MESSAGE,
+    get_signature,
+    parse_sections,
+    render_docstring,
+)
+from utils.prompt import build_prompt, get_token_budget
 from utils.proxy import Proxy
+from utils.routing import Endpoint
+from utils.scheduler import Priority
+
+T = TypeVar("T")
 
 
 class TextDocument(TypedDict):
@@ -51,6 +109,40 @@ class CommandArguments(NamedTuple):
     progress_token: lsp.ProgressToken
 
 
+class DocumentCommandArguments(NamedTuple):
+    """Represents arguments of a command for a whole document."""
+
+    text_document: TextDocument
+    api_key: str
+    progress_token: lsp.ProgressToken
+
+
+class SpeculationArguments(NamedTuple):
+    """Represents arguments of the speculative generation command."""
+
+    text_document_position: TextDocumentPosition
+    api_key: str
+
+
+class WorkspaceCommandArguments(NamedTuple):
+    """Represents arguments of a command for the whole workspace."""
+
+    api_key: str
+    progress_token: lsp.ProgressToken
+
+
+class AnalyzedEntity(NamedTuple):
+    """Represents the analysis of a code entity needed to insert its docstring."""
+
+    entity_name: str
+    cleaned_code: str
+    fingerprint: str
+    indent_level: int
+    docstring_range: lsp.Range | None
+    docstring: str
+    docstring_insert_position: lsp.Position
+
+
 @mark_as_command("chatgpt-docstrings.applyGenerate")
 async def apply_generate_docstring(
     ls: server.DocstringLanguageServer,
@@ -68,81 +160,1065 @@ async def apply_generate_docstring(
         _notify_invalid_proxy(ls, proxy)
         return False
 
-    # Parse and clean code entity
-    code_entity = get_entity_at_cursor(
-        document.source, cursor, settings["codeAnalyzer"]
+    # Parse and clean code entity in the analysis executor
+    analyzed_entity = await ls.run_analysis(
+        document,
+        lambda snapshot: _analyze_entity(
+            snapshot,
+            cursor,
+            settings["codeAnalyzer"],
+            ls.analyzer_cache,
+            settings["summarizeClasses"],
+        ),
     )
-    if not code_entity or not isinstance(code_entity, NamedCodeEntity):
+    if not analyzed_entity:
         _notify_invalid_context(ls)
         return False
-    cleaned_code_entity = code_entity.clean_code()
+    existing_docstring_range = analyzed_entity.docstring_range
+    docstring_insert_position = analyzed_entity.docstring_insert_position
 
     # Prepare the docstring generation prompt
     prompt = _prepare_docstring_prompt(
-        settings, code_entity.entity_name, cleaned_code_entity
+        ls, settings, analyzed_entity.entity_name, analyzed_entity.cleaned_code
     )
     ls.log_to_output(f"Prompt used:\n{prompt}")
 
+    # Reuse the response for the same code structure, or generate a docstring.
+    # The response is cached with the model of the endpoint it came from.
+    endpoints = _get_endpoints(ls, settings, api_key)
+    cache_key = _create_cache_key(settings, analyzed_entity)
+
+    def cache_response(endpoint: Endpoint, response: str) -> None:
+        ls.docstring_cache.set(
+            _create_cache_key(settings, analyzed_entity, endpoint), response
+        )
+
+    response = _get_cached_response(ls, settings, analyzed_entity, endpoints)
+    if response is not None:
+        ls.log_to_output(f"Cached response used:\n{response}")
+    elif settings["streamResponse"] and not settings["synthesizeSections"]:
+        # Insert the docstring while it is being generated
+        insertion = StreamingInsertion(
+            ls,
+            document,
+            document_version,
+            analyzed_entity,
+            lambda response: _format_response(
+                response, analyzed_entity, settings, document
+            ),
+        )
+        response = await _request_docstring(
+            ls,
+            settings,
+            endpoints,
+            proxy,
+            progress_token,
+            lambda client, model: insertion.insert(
+                stream_docstring(client=client, model=model, prompt=prompt)
+            ),
+            cache_key=cache_key,
+            on_response=cache_response,
+            first_response_time=lambda: insertion.first_response_time,
+        )
+        if response is None:
+            return False
+        ls.log_to_output(f"Response received:\n{response}")
+        if insertion.inserted:
+            return True
+    else:
+        response = await _request_docstring(
+            ls,
+            settings,
+            endpoints,
+            proxy,
+            progress_token,
+            lambda client, model: generate_docstring(
+                client=client,
+                model=model,
+                prompt=prompt,
+                system_message=_get_system_message(settings),
+            ),
+            cache_key=cache_key,
+            on_response=cache_response,
+            hedge=True,
+        )
+        if response is None:
+            return False
+        ls.log_to_output(f"Response received:\n{response}")
+
+    # Format and apply the docstring
+    docstring = _format_response(response, analyzed_entity, settings, document)
+    if docstring is None:
+        ls.show_warning("The AI response does not contain a docstring.")
+        return False
+    if document.version != document_version and await _is_docstring_inserted(
+        ls, document, settings, analyzed_entity, docstring
+    ):
+        # Inserted by a concurrent request for the same code entity
+        return True
+
+    return await _add_docstring_to_document(
+        ls,
+        docstring,
+        docstring_insert_position,
+        existing_docstring_range,
+        document,
+        document_version,
+    )
+
+
+class StreamingInsertion:
+    """Inserts a docstring into the document while its response is streamed.
+
+    The inserted text is replaced each time a new line of the response is received.
+    Every edit is applied to the document version produced by the previous edit,
+    so the insertion stops if the document is changed meanwhile.
+
+    Attributes:
+        failed: Whether an edit has not been applied to the document.
+        first_response_time: The event loop time the first part of the response
+            was received at, or None if not received yet.
+        _range: The range of the docstring in the document to replace.
+        _text: The text of the inserted docstring, or None if not inserted yet.
+    """
+
+    def __init__(
+        self,
+        ls: server.DocstringLanguageServer,
+        document: LSPTextDocument,
+        document_version: int,
+        analyzed_entity: AnalyzedEntity,
+        format_response: Callable[[str], str | None],
+    ) -> None:
+        self._ls = ls
+        self._document = document
+        self._document_version = document_version
+        self._format_response = format_response
+        self._original_text = analyzed_entity.docstring
+        insert_position = analyzed_entity.docstring_insert_position
+        self._range = analyzed_entity.docstring_range or lsp.Range(
+            insert_position, insert_position
+        )
+        self._text: str | None = None
+        self.failed = False
+        self.first_response_time: float | None = None
+
+    @property
+    def inserted(self) -> bool:
+        """Whether the docstring has been inserted into the document."""
+        return self._text is not None and not self.failed
+
+    async def insert(self, responses: AsyncGenerator[str, None]) -> str | None:
+        """Inserts the growing response; returns the full response.
+
+        Returns None if the docstring could not be inserted into the document.
+        The stream of responses is closed in any case, and the original
+        docstring is restored if the insertion is not completed.
+        """
+        response = ""
+        line_count = 0
+        try:
+            async for response in responses:
+                if self.first_response_time is None:
+                    self.first_response_time = asyncio.get_running_loop().time()
+                if response.count("\n") > line_count:
+                    line_count = response.count("\n")
+                    if not await self._refresh(response):
+                        return None
+            if not await self._refresh(response):
+                return None
+        except BaseException:
+            await self.restore()
+            raise
+        finally:
+            await responses.aclose()
+        return response
+
+    async def restore(self) -> None:
+        """Replaces the inserted docstring with the original one."""
+        if self._text is not None and not self.failed:
+            await self._replace(self._original_text)
+
+    async def _refresh(self, response: str) -> bool:
+        """Replaces the inserted docstring with the one from the response."""
+        # Close the triple quotes of an incomplete docstring
+        if response.count('"""') == 1:
+            response += '"""'
+        text = self._format_response(response)
+        if text is None or text == self._text:
+            return True
+        return await self._replace(text)
+
+    async def _replace(self, text: str) -> bool:
+        """Replaces the inserted docstring with the text."""
+        text_edit = lsp.TextEdit(range=self._range, new_text=text)
+        if not await _apply_text_edits(
+            self._ls, self._document, self._document_version, [text_edit]
+        ):
+            self.failed = True
+            return False
+        self._document_version += 1
+        self._text = text
+        start = self._range.start
+        end = lsp.Position(start.line + len(LINE_BREAK_RE.findall(text)), 0)
+        self._range = lsp.Range(start, end)
+        return True
+
+
+@mark_as_command("chatgpt-docstrings.speculate")
+async def speculate_docstring(
+    ls: server.DocstringLanguageServer,
+    args: tuple[TextDocumentPosition, str],
+) -> bool:
+    """Generates the docstring at the cursor in the background, before it is requested.
+
+    The response is stored in the docstring cache, so `applyGenerate` inserts
+    the docstring at once. Documented code entities and cached responses are
+    skipped, and nothing is generated once `speculationTokensPerHour` is used.
+    The generation is cancelled when the code entity is changed.
+    """
+    command_args = SpeculationArguments(*args)
+    uri = command_args.text_document_position["textDocument"]["uri"]
+    cursor = lsp.Position(**command_args.text_document_position["position"])
+    document = ls.workspace.get_text_document(uri)
+    settings = ls.workspace_settings.get_settings_for_document(document)
+    if not settings["speculativeGeneration"]:
+        return False
+    if ls.speculator.budget.used() >= settings["speculationTokensPerHour"]:
+        return False
+    proxy = _create_proxy(settings["proxy"])
+    if proxy and not proxy.is_valid(ALLOWED_PROXY_PROTOCOLS):
+        return False
+
+    analyzed_entity = await ls.run_analysis(
+        document,
+        lambda snapshot: _analyze_entity(
+            snapshot,
+            cursor,
+            settings["codeAnalyzer"],
+            ls.analyzer_cache,
+            settings["summarizeClasses"],
+        ),
+    )
+    if not analyzed_entity or analyzed_entity.docstring_range:
+        return False
+    cache_key = _create_cache_key(settings, analyzed_entity)
+    if ls.inflight_requests.is_running(cache_key) or ls.docstring_cache.get(cache_key):
+        return False
+
+    ls.speculator.start(
+        uri,
+        cursor,
+        analyzed_entity.fingerprint,
+        _speculate(ls, settings, command_args.api_key, proxy, analyzed_entity),
+    )
+    return True
+
+
+async def _speculate(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    api_key: str,
+    proxy: Proxy | None,
+    analyzed_entity: AnalyzedEntity,
+) -> None:
+    """Generates and caches the response for the code entity; errors are logged."""
+    try:
+        async with ls.circuit_breaker.guard(
+            _describe_endpoint(settings, settings["baseUrl"])
+        ):
+            async with ls.scheduler.slot(
+                settings["baseUrl"],
+                priority=Priority.SPECULATIVE,
+                max_concurrent=settings["maxConcurrentRequests"],
+                folder=settings["workspaceFS"],
+            ):
+                async with ls.client_pool.client(
+                    api_key=api_key,
+                    base_url=settings["baseUrl"],
+                    proxy=proxy,
+                    max_connections=settings["maxConnections"],
+                    idle_timeout=settings["connectionIdleTimeout"],
+                ) as client:
+                    await asyncio.wait_for(
+                        _get_response(
+                            ls,
+                            client,
+                            settings,
+                            analyzed_entity,
+                            on_usage=ls.speculator.budget.add,
+                        ),
+                        settings["requestTimeout"],
+                    )
+    except (OpenAIError, asyncio.TimeoutError) as e:
+        _log_generation_error(ls, analyzed_entity, e)
+        return
+    ls.log_to_output(
+        f"Docstring for '{analyzed_entity.entity_name}' generated in the background"
+    )
+
+
+async def check_speculation(
+    ls: server.DocstringLanguageServer, document: LSPTextDocument
+) -> None:
+    """Cancels the speculative generation in the document if its code entity changed.
+
+    The document is analyzed again until it stops changing during the analysis.
+    """
+    speculation = ls.speculator.get(document.uri)
+    if speculation is None or speculation.checking:
+        return
+    settings = ls.workspace_settings.get_settings_for_document(document)
+    speculation.checking = True
+    try:
+        version = None
+        while (
+            version != document.version
+            and ls.speculator.get(document.uri) is speculation
+        ):
+            version = document.version
+            analyzed_entity = await ls.run_analysis(
+                document,
+                lambda snapshot: _analyze_entity(
+                    snapshot,
+                    speculation.cursor,
+                    settings["codeAnalyzer"],
+                    ls.analyzer_cache,
+                    settings["summarizeClasses"],
+                ),
+            )
+            changed = (
+                not analyzed_entity
+                or analyzed_entity.fingerprint != speculation.fingerprint
+            )
+            if changed and ls.speculator.get(document.uri) is speculation:
+                ls.speculator.cancel()
+    finally:
+        speculation.checking = False
+
+
+@mark_as_command("chatgpt-docstrings.applyGenerateAll")
+async def apply_generate_all_docstrings(
+    ls: server.DocstringLanguageServer,
+    args: tuple[TextDocument, str, lsp.ProgressToken],
+) -> bool:
+    """Generates docstrings for all undocumented code entities of the document.
+
+    The docstrings are generated concurrently, up to `maxConcurrentRequests`
+    requests to the endpoint at a time, with small entities packed into shared
+    requests, and inserted into the document with a single edit.
+    """
+    command_args = DocumentCommandArguments(*args)
+    document = ls.workspace.get_text_document(command_args.text_document["uri"])
+    document_version = document.version or 0
+    settings = ls.workspace_settings.get_settings_for_document(document)
+    progress_token = command_args.progress_token
+
+    # Proxy setup and validation
+    proxy = _create_proxy(settings["proxy"])
+    if proxy and not proxy.is_valid(ALLOWED_PROXY_PROTOCOLS):
+        _notify_invalid_proxy(ls, proxy)
+        return False
+
+    # Find undocumented code entities in the analysis executor
+    analyzed_entities = await ls.run_analysis(
+        document,
+        lambda snapshot: _analyze_undocumented_entities(
+            snapshot,
+            settings["codeAnalyzer"],
+            ls.analyzer_cache,
+            settings["summarizeClasses"],
+        ),
+    )
+    if not analyzed_entities:
+        ls.show_info("All functions and classes already have docstrings.")
+        return False
+
     # Create a future to track the progress cancellation
     progress = ls.progress.tokens.setdefault(progress_token, Future())
+    total = len(analyzed_entities)
+    completed = 0
+    _report_batch_progress(ls, progress_token, completed, total)
 
-    # Start the progress reporting task
-    report_task = asyncio.create_task(
-        _report_progress(ls, progress_token, settings["requestTimeout"])
+    @contextlib.asynccontextmanager
+    async def request_slot() -> AsyncIterator[AsyncOpenAI]:
+        async with ls.scheduler.slot(
+            settings["baseUrl"],
+            priority=Priority.BATCH,
+            max_concurrent=settings["maxConcurrentRequests"],
+            folder=settings["workspaceFS"],
+        ):
+            async with ls.client_pool.client(
+                api_key=command_args.api_key,
+                base_url=settings["baseUrl"],
+                proxy=proxy,
+                max_connections=settings["maxConnections"],
+                idle_timeout=settings["connectionIdleTimeout"],
+            ) as client:
+                yield client
+
+    def on_processed(count: int) -> None:
+        nonlocal completed
+        completed += count
+        _report_batch_progress(ls, progress_token, completed, total)
+
+    task = asyncio.ensure_future(
+        _generate_responses(
+            ls, settings, analyzed_entities, request_slot, on_processed=on_processed
+        )
+    )
+    progress.add_done_callback(lambda _: task.cancel())
+    try:
+        responses = await task
+    except asyncio.CancelledError:
+        return False
+
+    # Format all docstrings and apply them at once
+    text_edits: list[lsp.TextEdit] = []
+    for analyzed_entity, response in zip(analyzed_entities, responses):
+        if response is None:
+            continue
+        docstring = _format_response(response, analyzed_entity, settings, document)
+        if docstring is None:
+            continue
+        text_edits.extend(
+            _create_docstring_edits(
+                docstring,
+                analyzed_entity.docstring_insert_position,
+                analyzed_entity.docstring_range,
+            )
+        )
+    if not text_edits:
+        ls.show_warning("Failed to generate docstrings. See the output for details.")
+        return False
+
+    return await _apply_text_edits(ls, document, document_version, text_edits)
+
+
+async def _generate_responses(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    analyzed_entities: list[AnalyzedEntity],
+    request_slot: Callable[[], AsyncContextManager[AsyncOpenAI]],
+    *,
+    on_processed: Callable[[int], None],
+    on_usage: Callable[[int], None] | None = None,
+    path: str | None = None,
+) -> list[str | None]:
+    """Returns the responses for many code entities; None for the failed ones.
+
+    Small code entities are packed into one request, up to `maxEntitiesPerRequest`
+    at a time. If the response to a packed request cannot be split into
+    a docstring for each entity, the entities are requested one by one.
+    Each request waits for `request_slot`, which provides the client.
+    `on_processed` is called with the number of entities processed.
+    """
+
+    async def generate(analyzed_entity: AnalyzedEntity) -> str | None:
+        cache_key = _create_cache_key(settings, analyzed_entity)
+        try:
+            if (response := ls.docstring_cache.get(cache_key)) is None:
+                async with ls.circuit_breaker.guard(
+                    _describe_endpoint(settings, settings["baseUrl"])
+                ):
+                    async with request_slot() as client:
+                        response = await asyncio.wait_for(
+                            _get_response(
+                                ls, client, settings, analyzed_entity, on_usage
+                            ),
+                            settings["requestTimeout"],
+                        )
+            return response
+        except (asyncio.TimeoutError, OpenAIError) as e:
+            _log_generation_error(ls, analyzed_entity, e, path)
+            return None
+        finally:
+            on_processed(1)
+
+    def is_packable(analyzed_entity: AnalyzedEntity) -> bool:
+        # Cached responses and responses requested elsewhere are not packed
+        cache_key = _create_cache_key(settings, analyzed_entity)
+        return ls.docstring_cache.get(
+            cache_key
+        ) is None and not ls.inflight_requests.is_running(cache_key)
+
+    async def generate_packed(group: list[AnalyzedEntity]) -> list[str | None]:
+        packable = [is_packable(analyzed_entity) for analyzed_entity in group]
+        if sum(packable) < 2:
+            return list(await asyncio.gather(*map(generate, group)))
+        packed_responses, other_responses = await asyncio.gather(
+            request_packed([e for e, packed in zip(group, packable) if packed]),
+            asyncio.gather(
+                *[generate(e) for e, packed in zip(group, packable) if not packed]
+            ),
+        )
+        packed_iter, other_iter = iter(packed_responses), iter(other_responses)
+        return [next(packed_iter if packed else other_iter) for packed in packable]
+
+    async def request_packed(group: list[AnalyzedEntity]) -> list[str | None]:
+        try:
+            async with ls.circuit_breaker.guard(
+                _describe_endpoint(settings, settings["baseUrl"])
+            ):
+                async with request_slot() as client:
+                    responses = await asyncio.wait_for(
+                        _get_packed_responses(ls, client, settings, group, on_usage),
+                        settings["requestTimeout"],
+                    )
+        except (asyncio.TimeoutError, PackedResponseError) as e:
+            reason = str(e) or "request timed out"
+            ls.log_to_output(
+                f"Failed to generate {len(group)} docstrings with one request "
+                f"({reason}), requesting them one by one"
+            )
+            return list(await asyncio.gather(*map(generate, group)))
+        except OpenAIError as e:
+            for analyzed_entity in group:
+                _log_generation_error(ls, analyzed_entity, e, path)
+            on_processed(len(group))
+            return [None] * len(group)
+        on_processed(len(group))
+        return list(responses)
+
+    # The described sections of the code entities are not packed
+    max_entities = (
+        1 if settings["synthesizeSections"] else settings["maxEntitiesPerRequest"]
+    )
+    groups = _pack_entities(analyzed_entities, max_entities)
+    results = await asyncio.gather(*map(generate_packed, groups))
+    return [response for responses in results for response in responses]
+
+
+def _pack_entities(
+    analyzed_entities: list[AnalyzedEntity], max_entities: int
+) -> list[list[AnalyzedEntity]]:
+    """Groups the small code entities to be documented with one request.
+
+    Code entities longer than `MAX_PACKED_ENTITY_LENGTH` are left alone,
+    and the code of a group does not exceed `MAX_PACKED_CODE_LENGTH`.
+    """
+    groups: list[list[AnalyzedEntity]] = []
+    group: list[AnalyzedEntity] = []
+    length = 0
+    for analyzed_entity in analyzed_entities:
+        size = len(analyzed_entity.cleaned_code)
+        if size > MAX_PACKED_ENTITY_LENGTH:
+            groups.append([analyzed_entity])
+            continue
+        if len(group) == max_entities or length + size > MAX_PACKED_CODE_LENGTH:
+            group = []
+        if not group:
+            groups.append(group)
+            length = 0
+        group.append(analyzed_entity)
+        length += size
+    return groups
+
+
+async def _get_packed_responses(
+    ls: server.DocstringLanguageServer,
+    client: AsyncOpenAI,
+    settings: dict,
+    analyzed_entities: list[AnalyzedEntity],
+    on_usage: Callable[[int], None] | None = None,
+) -> list[str]:
+    """Returns the cached responses for the code entities.
+
+    The missing responses are generated with one request.
+
+    Raises:
+        PackedResponseError: If the response cannot be split into a response
+            for each code entity.
+    """
+    cache_keys = [_create_cache_key(settings, entity) for entity in analyzed_entities]
+    responses = [ls.docstring_cache.get(cache_key) for cache_key in cache_keys]
+    missing = [index for index, response in enumerate(responses) if response is None]
+    prompt = pack_prompts(
+        [
+            _prepare_docstring_prompt(
+                ls,
+                settings,
+                analyzed_entities[index].entity_name,
+                analyzed_entities[index].cleaned_code,
+            )
+            for index in missing
+        ]
+    )
+    response = await generate_docstring(
+        client=client,
+        model=settings["aiModel"],
+        prompt=prompt,
+        on_usage=on_usage,
+        system_message=PACKED_SYSTEM_MESSAGE,
     )
+    for index, unpacked_response in zip(
+        missing, unpack_response(response, len(missing))
+    ):
+        responses[index] = unpacked_response
+        ls.docstring_cache.set(cache_keys[index], unpacked_response)
+    return cast(list[str], responses)
 
-    # Generate docstring
-    docstring_task = asyncio.create_task(
-        generate_docstring(
-            api_key=api_key,
-            base_url=settings["baseUrl"],
+
+async def _get_response(
+    ls: server.DocstringLanguageServer,
+    client: AsyncOpenAI,
+    settings: dict,
+    analyzed_entity: AnalyzedEntity,
+    on_usage: Callable[[int], None] | None = None,
+) -> str:
+    """Returns the cached response for the code entity, or generates a new one."""
+    cache_key = _create_cache_key(settings, analyzed_entity)
+    if (response := ls.docstring_cache.get(cache_key)) is not None:
+        return response
+    prompt = _prepare_docstring_prompt(
+        ls, settings, analyzed_entity.entity_name, analyzed_entity.cleaned_code
+    )
+    return await _generate_response(ls, client, settings, cache_key, prompt, on_usage)
+
+
+async def _generate_response(
+    ls: server.DocstringLanguageServer,
+    client: AsyncOpenAI,
+    settings: dict,
+    cache_key: str,
+    prompt: str,
+    on_usage: Callable[[int], None] | None = None,
+) -> str:
+    """Generates and caches the response for the prompt.
+
+    Concurrent requests for the same cache key share one AI request, which is
+    cancelled only when all of them are cancelled.
+    """
+
+    async def generate() -> str:
+        response = await generate_docstring(
+            client=client,
             model=settings["aiModel"],
             prompt=prompt,
-            proxy=proxy,
+            on_usage=on_usage,
+            system_message=_get_system_message(settings),
         )
+        ls.docstring_cache.set(cache_key, response)
+        return response
+
+    response = await ls.inflight_requests.run(cache_key, generate)
+    if response is None:
+        # The interactive request in flight for the same entity has failed.
+        raise OpenAIError("No response received for the code entity.")
+    return response
+
+
+def _report_batch_progress(
+    ls: server.DocstringLanguageServer,
+    progress_token: lsp.ProgressToken,
+    completed: int,
+    total: int,
+) -> None:
+    """Reports the progress of the generation of multiple docstrings."""
+    ls.progress.report(
+        progress_token,
+        lsp.WorkDoneProgressReport(
+            message=f"Generating docstrings ({completed}/{total})...",
+            percentage=completed * 100 // total,
+        ),
     )
 
-    # Handle cancellations
-    progress.add_done_callback(docstring_task.cancel)
-    docstring_task.add_done_callback(report_task.cancel)
 
-    # Await docstring generation
+def _log_generation_error(
+    ls: server.DocstringLanguageServer,
+    analyzed_entity: AnalyzedEntity,
+    error: Exception,
+    path: str | None = None,
+) -> None:
+    """Logs the error of the generation of a docstring among many."""
+    location = f"{path}:" if path else "line "
+    reason = str(error) or "request timed out"
+    ls.log_to_output(
+        f"Failed to generate docstring for '{analyzed_entity.entity_name}' "
+        f"at {location}{analyzed_entity.docstring_insert_position.line} ({reason})",
+        lsp.MessageType.Error,
+    )
+
+
+@mark_as_command("chatgpt-docstrings.applyGenerateWorkspace")
+async def apply_generate_workspace_docstrings(
+    ls: server.DocstringLanguageServer,
+    args: tuple[str, lsp.ProgressToken],
+) -> bool:
+    """Generates docstrings for all undocumented code entities of the workspace.
+
+    The Python files of the workspace folders are documented by a `WorkspaceJob`.
+    An interrupted job is resumed by running the command again.
+    """
+    command_args = WorkspaceCommandArguments(*args)
+
+    # Proxy setup and validation for every workspace folder
+    for settings in ls.workspace_settings.values():
+        proxy = _create_proxy(settings["proxy"])
+        if proxy and not proxy.is_valid(ALLOWED_PROXY_PROTOCOLS):
+            _notify_invalid_proxy(ls, proxy)
+            return False
+
+    roots = [settings["workspaceFS"] for settings in ls.workspace_settings.values()]
+    file_paths = await asyncio.to_thread(discover_workspace_files, roots)
+    if not file_paths:
+        ls.show_info("No Python files found in the workspace.")
+        return False
+
+    journal_path = (
+        os.path.join(ls.storage_path, "workspace-job.jsonl")
+        if ls.storage_path
+        else None
+    )
+    journal = BatchJournal(journal_path, roots)
+    if len(journal):
+        ls.log_to_output(f"Resuming the job, {len(journal)} files already processed")
+
+    # Worker processes import the server first, as `_start.py` does,
+    # so that the functions of this module can be unpickled there.
+    workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=importlib.import_module,
+        initargs=("server",),
+    )
+    job = WorkspaceJob(
+        ls,
+        command_args.progress_token,
+        journal,
+        executor,
+        max_analyses=workers,
+        max_documented_files=max(
+            settings["maxConcurrentRequests"]
+            for settings in ls.workspace_settings.values()
+        ),
+        get_analysis=functools.partial(_get_workspace_analysis, ls),
+        generate_edits=functools.partial(
+            _generate_workspace_edits, ls, command_args.api_key
+        ),
+    )
+    task = asyncio.ensure_future(job.run(file_paths))
+
+    # Cancel the job when the progress is cancelled
+    progress = ls.progress.tokens.setdefault(command_args.progress_token, Future())
+    progress.add_done_callback(lambda _: task.cancel())
     try:
-        docstring = await asyncio.wait_for(docstring_task, settings["requestTimeout"])
-    except (asyncio.CancelledError, asyncio.TimeoutError):
+        documented_files, failed_files = await task
+    except asyncio.CancelledError:
         return False
-    except Exception as err:
-        raise err
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        ls.log_to_output(f"Request queues: {ls.scheduler.describe_metrics()}")
 
-    ls.log_to_output(f"Response received:\n{docstring}")
+    if failed_files:
+        ls.show_warning(
+            f"Failed to document {failed_files} files of the workspace. "
+            "Run the command again to resume. See the output for details."
+        )
+    else:
+        journal.finish()
+        ls.show_info(f"Docstrings added to {documented_files} files.")
+    return not failed_files
 
-    # Define the position of the existing docstring
-    existing_docstring_range = _get_docstring_range(code_entity)
 
-    # Define the insertion position of the docstring
-    docstring_insert_position = (
-        lsp.Position(existing_docstring_range.start.line, 0)
-        if existing_docstring_range
-        else lsp.Position(code_entity.signature_end.line, 0)
+def _get_workspace_analysis(
+    ls: server.DocstringLanguageServer, path: str
+) -> Callable[[LSPTextDocument], list[AnalyzedEntity]]:
+    """Returns the analysis of a file of the workspace, as set for its folder.
+
+    The analysis is picklable, since it is run in a worker process.
+    """
+    settings = ls.workspace_settings.get_settings_for_file(Path(path))
+    return functools.partial(
+        _analyze_workspace_file,
+        analyzer_name=settings["codeAnalyzer"],
+        summarize_classes=settings["summarizeClasses"],
     )
 
-    # Extract, format and apply the docstring
-    docstring = parse_docstring(docstring)
-    docstring = format_docstring(
-        docstring, code_entity.indent_level + 1, settings["onNewLine"]
+
+def _analyze_workspace_file(
+    document: LSPTextDocument, analyzer_name: str, summarize_classes: bool
+) -> list[AnalyzedEntity]:
+    """Analyzes the undocumented code entities of a file in a worker process."""
+    return _analyze_undocumented_entities(
+        document, analyzer_name, AnalyzerCache(), summarize_classes
     )
-    docstring = match_line_endings(document, docstring)
 
-    await _add_docstring_to_document(
+
+async def _generate_workspace_edits(
+    ls: server.DocstringLanguageServer,
+    api_key: str,
+    path: str,
+    analyzed_file: AnalyzedFile[AnalyzedEntity],
+    on_processed: Callable[[int], None],
+    on_usage: Callable[[int], None],
+) -> list[lsp.TextEdit]:
+    """Generates the docstrings of a file of the workspace; returns their text edits."""
+    settings = ls.workspace_settings.get_settings_for_file(Path(path))
+
+    @contextlib.asynccontextmanager
+    async def request_slot() -> AsyncIterator[AsyncOpenAI]:
+        async with ls.scheduler.slot(
+            settings["baseUrl"],
+            priority=Priority.BATCH,
+            max_concurrent=settings["maxConcurrentRequests"],
+            folder=settings["workspaceFS"],
+            requests_per_minute=settings["maxRequestsPerMinute"],
+        ):
+            async with ls.client_pool.client(
+                api_key=api_key,
+                base_url=settings["baseUrl"],
+                proxy=_create_proxy(settings["proxy"]),
+                max_connections=settings["maxConnections"],
+                idle_timeout=settings["connectionIdleTimeout"],
+            ) as client:
+                yield client
+
+    responses = await _generate_responses(
         ls,
-        docstring,
-        docstring_insert_position,
-        existing_docstring_range,
-        document,
-        document_version,
+        settings,
+        analyzed_file.analyzed_entities,
+        request_slot,
+        on_processed=on_processed,
+        on_usage=on_usage,
+        path=path,
     )
 
-    return True
+    # Format the docstrings of the file
+    document = LSPTextDocument(uris.from_fs_path(path) or path, analyzed_file.source)
+    text_edits: list[lsp.TextEdit] = []
+    for analyzed_entity, response in zip(analyzed_file.analyzed_entities, responses):
+        docstring = (
+            _format_response(response, analyzed_entity, settings, document)
+            if response is not None
+            else None
+        )
+        if docstring is None:
+            continue
+        text_edits.extend(
+            _create_docstring_edits(
+                docstring,
+                analyzed_entity.docstring_insert_position,
+                analyzed_entity.docstring_range,
+            )
+        )
+    return text_edits
+
+
+async def _request_docstring(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    endpoints: list[Endpoint],
+    proxy: Proxy | None,
+    progress_token: lsp.ProgressToken,
+    request: Callable[[AsyncOpenAI, str], Awaitable[str | None]],
+    cache_key: str | None = None,
+    on_response: Callable[[Endpoint, str], None] | None = None,
+    first_response_time: Callable[[], float | None] | None = None,
+    hedge: bool = False,
+) -> str | None:
+    """Requests a docstring from the AI; returns None if cancelled or timed out.
+
+    The request is made by the given function with a pooled client and the model
+    of the endpoint it is routed to. Requests with a cache key are shared with
+    the concurrent requests for the same key. `on_response` is called with
+    the endpoint that answered. Requests are hedged only if `hedge` is True,
+    since a duplicate request must not have side effects.
+
+    A streamed request gives `first_response_time`, which returns the event loop
+    time its first part was received at; it is routed by the time to first token.
+
+    Raises:
+        CircuitOpenError: If the endpoints are unreachable, without waiting
+            for the request to time out.
+    """
+    try:
+        return await _request_docstring_with_progress(
+            ls,
+            settings,
+            endpoints,
+            proxy,
+            progress_token,
+            request,
+            cache_key,
+            on_response,
+            first_response_time,
+            hedge,
+        )
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        return None
+
+
+async def _request_docstring_with_progress(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    endpoints: list[Endpoint],
+    proxy: Proxy | None,
+    progress_token: lsp.ProgressToken,
+    request: Callable[[AsyncOpenAI, str], Awaitable[str | None]],
+    cache_key: str | None,
+    on_response: Callable[[Endpoint, str], None] | None,
+    first_response_time: Callable[[], float | None] | None,
+    hedge: bool,
+) -> str | None:
+    """Requests a docstring from the AI while reporting the remaining time.
+
+    Raises:
+        asyncio.CancelledError: If the progress is cancelled.
+        asyncio.TimeoutError: If the request times out.
+    """
+    # The requests to the endpoints time out before the docstring task,
+    # so that the timeouts are recorded by the circuit breaker
+    deadline = asyncio.get_running_loop().time() + settings["requestTimeout"]
+
+    # Create a future to track the progress cancellation
+    progress = ls.progress.tokens.setdefault(progress_token, Future())
+
+    # Start the progress reporting task
+    report_task = asyncio.create_task(
+        _report_progress(ls, progress_token, settings["requestTimeout"])
+    )
+
+    async def route() -> str | None:
+        return await _route_request(
+            ls,
+            settings,
+            endpoints,
+            proxy,
+            deadline,
+            request,
+            on_response=on_response,
+            first_response_time=first_response_time,
+            hedge=hedge,
+        )
+
+    if cache_key is None:
+        docstring_task = asyncio.create_task(route())
+    else:
+        docstring_task = asyncio.create_task(ls.inflight_requests.run(cache_key, route))
+
+    # Handle cancellations
+    progress.add_done_callback(docstring_task.cancel)
+    docstring_task.add_done_callback(report_task.cancel)
+
+    # Await docstring generation
+    return await asyncio.wait_for(docstring_task, settings["requestTimeout"])
+
+
+async def _route_request(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    endpoints: list[Endpoint],
+    proxy: Proxy | None,
+    deadline: float,
+    request: Callable[[AsyncOpenAI, str], Awaitable[str | None]],
+    *,
+    on_response: Callable[[Endpoint, str], None] | None = None,
+    first_response_time: Callable[[], float | None] | None = None,
+    hedge: bool = False,
+) -> str | None:
+    """Sends the request to the endpoints as set by `endpointRouting`.
+
+    Endpoints with an open circuit are skipped while others are available.
+    The latency of each answered request is recorded for the routing: the time
+    to the first part of the response for the streamed requests, which are
+    never hedged, or the time to the complete response otherwise.
+
+    Raises:
+        asyncio.TimeoutError: If the request is not answered by the deadline.
+    """
+    loop = asyncio.get_running_loop()
+    streamed = first_response_time is not None
+    available = [
+        endpoint
+        for endpoint in endpoints
+        if ls.circuit_breaker.is_available(
+            _describe_endpoint(settings, endpoint.base_url)
+        )
+    ] or endpoints
+
+    # Generate docstring with a pooled client, ahead of the background requests.
+    # Only the API call is guarded and timed: waiting for a slot or for the rate
+    # limits does not count against the endpoint.
+    async def send(endpoint: Endpoint) -> str | None:
+        async with ls.scheduler.slot(
+            endpoint.base_url,
+            priority=Priority.INTERACTIVE,
+            max_concurrent=settings["maxConcurrentRequests"],
+            folder=settings["workspaceFS"],
+        ):
+            async with ls.client_pool.client(
+                api_key=endpoint.api_key,
+                base_url=endpoint.base_url,
+                proxy=proxy,
+                max_connections=settings["maxConnections"],
+                idle_timeout=settings["connectionIdleTimeout"],
+            ) as client:
+                await ls.rate_limiter.wait((endpoint.base_url, endpoint.model))
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                async with ls.circuit_breaker.guard(
+                    _describe_endpoint(settings, endpoint.base_url)
+                ):
+                    start = loop.time()
+                    response = await asyncio.wait_for(
+                        request(client, endpoint.model), timeout
+                    )
+        end = first_response_time() if first_response_time else loop.time()
+        if end is not None:
+            ls.router.record(endpoint, end - start, streamed)
+        if response is not None and on_response:
+            on_response(endpoint, response)
+        return response
+
+    if (
+        hedge
+        and not streamed
+        and settings["endpointRouting"] == "hedge"
+        and len(available) > 1
+    ):
+        return await ls.router.hedge(available[0], available[1], send)
+    return await send(ls.router.choose(available, streamed))
+
+
+def _get_endpoints(
+    ls: server.DocstringLanguageServer, settings: dict, api_key: str
+) -> list[Endpoint]:
+    """Returns the endpoints the docstring requests are routed to.
+
+    These are the endpoints of the `endpoints` setting, or the endpoint of
+    the `baseUrl` and `aiModel` settings if there are none. The API key of
+    an endpoint is read from its environment variable, or is the API key set
+    with the extension if no variable is given. Endpoints whose variable is
+    not set are skipped.
+    """
+    endpoints = []
+    for endpoint in settings["endpoints"]:
+        key = api_key
+        if (env := endpoint.get("apiKeyEnv")) and not (key := os.environ.get(env, "")):
+            ls.log_to_output(
+                f"Endpoint {endpoint['baseUrl']} skipped: "
+                f"the environment variable '{env}' is not set"
+            )
+            continue
+        endpoints.append(
+            Endpoint(
+                base_url=endpoint["baseUrl"] or None,
+                model=endpoint.get("model") or settings["aiModel"],
+                api_key=key,
+            )
+        )
+    return endpoints or [Endpoint(settings["baseUrl"], settings["aiModel"], api_key)]
+
+
+def _describe_endpoint(settings: dict, base_url: str | None) -> str:
+    """Describes the API endpoint of the requests, which identifies its circuit."""
+    endpoint = f"The AI API at {base_url or DEFAULT_BASE_URL}"
+    if proxy_url := settings["proxy"]["url"]:
+        endpoint += f" through the proxy {proxy_url}"
+    return endpoint
 
 
 def _unpack_args(
@@ -155,6 +1231,117 @@ def _unpack_args(
     return uri, cursor, args.api_key, args.progress_token
 
 
+def _analyze_entity(
+    document: LSPTextDocument,
+    cursor: lsp.Position,
+    analyzer_name: str,
+    analyzer_cache: AnalyzerCache,
+    summarize_classes: bool,
+) -> AnalyzedEntity | None:
+    """Analyzes the named code entity at the cursor; returns None if not found.
+
+    Everything needed from the syntax tree is extracted here, since the tree may
+    be reused by the analysis of a newer version of the document later.
+    """
+    code_entity = get_document_entity_at_cursor(
+        document, cursor, analyzer_name, analyzer_cache
+    )
+    if not code_entity or not isinstance(code_entity, NamedCodeEntity):
+        return None
+    return _create_analyzed_entity(document, code_entity, summarize_classes)
+
+
+async def _is_docstring_inserted(
+    ls: server.DocstringLanguageServer,
+    document: LSPTextDocument,
+    settings: dict,
+    analyzed_entity: AnalyzedEntity,
+    docstring: str,
+) -> bool:
+    """Checks if the docstring has been inserted for the code entity meanwhile.
+
+    The code entity is analyzed again on the last line of its signature, which
+    is not moved by the insertion of its own docstring.
+    """
+    insert_position = analyzed_entity.docstring_insert_position
+    if not insert_position.line:
+        return False
+
+    def analyze(snapshot: LSPTextDocument) -> AnalyzedEntity | None:
+        if insert_position.line > len(snapshot.lines):
+            return None
+        line = snapshot.lines[insert_position.line - 1].rstrip("\r\n")
+        return _analyze_entity(
+            snapshot,
+            lsp.Position(insert_position.line - 1, len(line)),
+            settings["codeAnalyzer"],
+            ls.analyzer_cache,
+            settings["summarizeClasses"],
+        )
+
+    current_entity = await ls.run_analysis(document, analyze)
+    return (
+        current_entity is not None
+        and current_entity.docstring_insert_position == insert_position
+        and current_entity.docstring == docstring
+    )
+
+
+def _analyze_undocumented_entities(
+    document: LSPTextDocument,
+    analyzer_name: str,
+    analyzer_cache: AnalyzerCache,
+    summarize_classes: bool,
+) -> list[AnalyzedEntity]:
+    """Analyzes all named code entities of the document without a docstring."""
+    analyzer = analyzer_cache.get_analyzer(analyzer_name, document)
+    return [
+        _create_analyzed_entity(document, code_entity, summarize_classes)
+        for code_entity in analyzer.iter_entities()
+        if not code_entity.has_docstring
+    ]
+
+
+def _create_analyzed_entity(
+    document: LSPTextDocument, code_entity: NamedCodeEntity, summarize_classes: bool
+) -> AnalyzedEntity:
+    """Extracts everything needed to insert the docstring of a code entity.
+
+    The code of a class is summarized to the signatures and the docstrings
+    of its methods, unless `summarize_classes` is False.
+    """
+    existing_docstring_range = _get_docstring_range(code_entity)
+    existing_docstring = (
+        "".join(
+            document.lines[
+                existing_docstring_range.start.line : existing_docstring_range.end.line
+            ]
+        )
+        if existing_docstring_range
+        else ""
+    )
+    docstring_insert_position = (
+        lsp.Position(existing_docstring_range.start.line, 0)
+        if existing_docstring_range
+        else lsp.Position(code_entity.signature_end.line, 0)
+    )
+    return AnalyzedEntity(
+        entity_name=code_entity.entity_name,
+        cleaned_code=code_entity.clean_code(
+            skip=(
+                ["method_bodies"]
+                if isinstance(code_entity, BaseClass) and not summarize_classes
+                else None
+            )
+        ),
+        fingerprint=code_entity.fingerprint,
+        indent_level=code_entity.indent_level,
+        docstring_range=existing_docstring_range,
+        docstring=existing_docstring,
+        docstring_insert_position=docstring_insert_position,
+    )
+
+
 def _create_proxy(proxy_settings: ProxySettings) -> Proxy | None:
     """Creates a Proxy instance from settings; returns None if no URL."""
     if not proxy_settings["url"]:
@@ -190,13 +1377,89 @@ def _notify_invalid_context(ls: server.DocstringLanguageServer) -> None:
     )
 
 
-def _prepare_docstring_prompt(settings: dict, entity: str, code: str) -> str:
-    """Prepares the prompt for docstring generation."""
-    return settings["promptPattern"].format(
-        docstring_style=settings["docstringStyle"], entity=entity, code=code
+def _prepare_docstring_prompt(
+    ls: server.DocstringLanguageServer, settings: dict, entity: str, code: str
+) -> str:
+    """Prepares the prompt for docstring generation.
+
+    The code is elided to fit in `promptTokenBudget`, or in the default budget
+    of the model if not set.
+    """
+    max_tokens = _get_token_budget(settings)
+    prompt, saved_tokens = build_prompt(
+        _get_prompt_pattern(settings),
+        docstring_style=settings["docstringStyle"],
+        entity=entity,
+        code=code,
+        max_tokens=max_tokens,
+    )
+    if saved_tokens > 0:
+        ls.log_to_output(
+            f"Code of the {entity} elided to fit in {max_tokens} tokens "
+            f"(about {saved_tokens} tokens saved)"
+        )
+    return prompt
+
+
+def _get_cached_response(
+    ls: server.DocstringLanguageServer,
+    settings: dict,
+    analyzed_entity: AnalyzedEntity,
+    endpoints: list[Endpoint],
+) -> str | None:
+    """Returns the cached response for the code entity from any of the endpoints."""
+    cache_keys = [
+        _create_cache_key(settings, analyzed_entity),
+        *(_create_cache_key(settings, analyzed_entity, e) for e in endpoints),
+    ]
+    for cache_key in dict.fromkeys(cache_keys):
+        if (response := ls.docstring_cache.get(cache_key)) is not None:
+            return response
+    return None
+
+
+def _create_cache_key(
+    settings: dict, analyzed_entity: AnalyzedEntity, endpoint: Endpoint | None = None
+) -> str:
+    """Creates the key of the cached response for the code entity.
+
+    The response comes from the model of the endpoint, or from the model of
+    the `aiModel` and `baseUrl` settings if no endpoint is given.
+    """
+    return DocstringCache.make_key(
+        fingerprint=analyzed_entity.fingerprint,
+        model=endpoint.model if endpoint else settings["aiModel"],
+        docstring_style=settings["docstringStyle"],
+        prompt_pattern=_get_prompt_pattern(settings),
+        base_url=endpoint.base_url if endpoint else settings["baseUrl"],
+        summarize_classes=settings["summarizeClasses"],
+        token_budget=_get_token_budget(settings),
     )
 
 
+def _get_token_budget(settings: dict) -> int:
+    """Returns the maximum number of tokens of a prompt."""
+    return settings["promptTokenBudget"] or get_token_budget(settings["aiModel"])
+
+
+def _get_prompt_pattern(settings: dict) -> str:
+    """Returns the pattern of the prompt for the docstring generation.
+
+    When `synthesizeSections` is enabled, the AI is asked to describe the code
+    with a fixed pattern, since the docstring is rendered by the server.
+    """
+    if settings["synthesizeSections"]:
+        return SECTIONS_PROMPT_PATTERN
+    return settings["promptPattern"]
+
+
+def _get_system_message(settings: dict) -> str:
+    """Returns the system message for the docstring generation."""
+    if settings["synthesizeSections"]:
+        return SECTIONS_SYSTEM_MESSAGE
+    return SYSTEM_MESSAGE
+
+
 async def _report_progress(
     ls: server.DocstringLanguageServer, progress_token: lsp.ProgressToken, timeout: int
 ) -> None:
@@ -244,6 +1507,32 @@ def _create_workspace_edit(
     )
 
 
+def _format_response(
+    response: str,
+    analyzed_entity: AnalyzedEntity,
+    settings: dict,
+    document: LSPTextDocument,
+) -> str | None:
+    """Extracts and formats the docstring; returns None if the response has none.
+
+    When `synthesizeSections` is enabled, the docstring is rendered from the
+    described sections and the signature of the code entity. A response that
+    is not a description is expected to contain the docstring itself.
+    """
+    sections = parse_sections(response) if settings["synthesizeSections"] else None
+    if sections is not None:
+        signature = get_signature(analyzed_entity.cleaned_code)
+        docstring = render_docstring(sections, signature, settings["docstringStyle"])
+    else:
+        docstring = parse_docstring(response)
+    if not docstring:
+        return None
+    docstring = format_docstring(
+        docstring, analyzed_entity.indent_level + 1, settings["onNewLine"]
+    )
+    return match_line_endings(document, docstring)
+
+
 async def _add_docstring_to_document(
     ls: server.DocstringLanguageServer,
     docstring: str,
@@ -251,8 +1540,20 @@ async def _add_docstring_to_document(
     existing_docstring_range: lsp.Range | None,
     document: LSPTextDocument,
     document_version: int,
-) -> None:
+) -> bool:
     """Adds the generated docstring to the document."""
+    text_edits = _create_docstring_edits(
+        docstring, docstring_insert_position, existing_docstring_range
+    )
+    return await _apply_text_edits(ls, document, document_version, text_edits)
+
+
+def _create_docstring_edits(
+    docstring: str,
+    docstring_insert_position: lsp.Position,
+    existing_docstring_range: lsp.Range | None,
+) -> list[lsp.TextEdit]:
+    """Creates the text edits replacing the existing docstring with the new one."""
     text_edits = []
 
     # Remove existing docstring if present
@@ -266,7 +1567,16 @@ async def _add_docstring_to_document(
             new_text=docstring,
         )
     )
+    return text_edits
+
 
+async def _apply_text_edits(
+    ls: server.DocstringLanguageServer,
+    document: LSPTextDocument,
+    document_version: int,
+    text_edits: list[lsp.TextEdit],
+) -> bool:
+    """Applies the text edits to the document; shows a warning if not applied."""
     workspace_edit = _create_workspace_edit(document, document_version, text_edits)
     result = await cast(
         Awaitable[lsp.ApplyWorkspaceEditResult], ls.apply_edit_async(workspace_edit)
@@ -278,3 +1588,4 @@ async def _add_docstring_to_document(
             or "maybe you made changes to the source code at generation time"
         )
         ls.show_warning(f"Failed to add docstring to source code ({reason})")
+    return result.applied
@@ -1,37 +1,63 @@
 from __future__ import annotations
 
 import re
-from typing import Iterable
 
 import lsprotocol.types as lsp
 from pygls.workspace import TextDocument
 
 import server
-from utils import get_entity_at_cursor, mark_as_feature
-from utils.code_analyzers.base import CodeEntity, NamedCodeEntity
+from utils import get_document_entity_at_cursor, mark_as_feature
+from utils.code_analyzers.base import NamedCodeEntity
+from utils.code_analyzers.cache import AnalyzerCache
 
 
 @mark_as_feature(
     lsp.TEXT_DOCUMENT_COMPLETION, lsp.CompletionOptions(trigger_characters=['"'])
 )
-def completions(
+async def completions(
     ls: server.DocstringLanguageServer, params: lsp.CompletionParams
 ) -> None | lsp.CompletionList:
-    """Returns completion items for docstring generation."""
+    """Returns completion items for docstring generation.
+
+    The document is analyzed in the analysis executor. Requests for a version
+    of the document that has been changed in the meantime are dropped.
+    """
     cursor = params.position
     uri = params.text_document.uri
-    document = ls.workspace.get_document(uri)
+    document = ls.workspace.get_text_document(uri)
     settings = ls.workspace_settings.get_settings_for_document(document)
 
     if not _cursor_after_quotes(document, cursor):
         return None
 
-    if settings["codeAnalyzer"] == "ast":
-        code_entity = _get_entity_using_ast(ls, document, cursor)
-    else:
-        code_entity = get_entity_at_cursor(
-            document.source, cursor, settings["codeAnalyzer"]
-        )
+    # The triple quotes just typed are not closed yet, so the code contains
+    # a syntax error which is not allowed by the `ast` analyzer.
+    analyzer_name = settings["codeAnalyzer"]
+    if analyzer_name == "ast":
+        analyzer_name = "ast-tolerant"
+
+    def get_completion_text(snapshot: TextDocument) -> str | None:
+        if snapshot.version != document.version:
+            return None
+        return _get_completion_text(snapshot, cursor, analyzer_name, ls.analyzer_cache)
+
+    version = document.version
+    completion_text = await ls.run_analysis(document, get_completion_text)
+    if completion_text is None or version != document.version:
+        return None
+    return _create_completion_list(cursor, completion_text)
+
+
+def _get_completion_text(
+    document: TextDocument,
+    cursor: lsp.Position,
+    analyzer_name: str,
+    analyzer_cache: AnalyzerCache,
+) -> str | None:
+    """Returns the completion text, or None if the cursor is not after a signature."""
+    code_entity = get_document_entity_at_cursor(
+        document, cursor, analyzer_name, analyzer_cache
+    )
 
     if (
         not code_entity
@@ -40,43 +66,7 @@ def completions(
     ):
         return None
 
-    completion_text = (
-        "" if code_entity.docstring_range else 'Await docstring generation..."""'
-    )
-    return _create_completion_list(cursor, completion_text)
-
-
-def _remove_line_from_source(document: TextDocument, line_to_remove: int) -> str:
-    """Remove a specific line from the document source."""
-    lines = document.lines[:]
-    del lines[line_to_remove]
-    return "".join(lines)
-
-
-def _sources_for_ast_analysis(
-    document: TextDocument, cursor: lsp.Position
-) -> Iterable[str]:
-    """Yields the source code and the source code without the current line."""
-    yield document.source
-    yield _remove_line_from_source(document, cursor.line)
-
-
-def _get_entity_using_ast(
-    ls: server.DocstringLanguageServer, document: TextDocument, cursor: lsp.Position
-) -> CodeEntity | None:
-    """Tries to analyze the code using `ast`.
-
-    If the triple quotes are not closed, a syntax error occurs.
-    We remove the line with the opening quotes and repeat the code analysis.
-    """
-    for source in _sources_for_ast_analysis(document, cursor):
-        try:
-            return get_entity_at_cursor(source, cursor, "ast")
-        except SyntaxError:
-            continue
-    else:
-        ls.show_warning("The source code contains a syntax error.")
-    return None
+    return "" if code_entity.docstring_range else 'Await docstring generation..."""'
 
 
 def _cursor_after_quotes(document: TextDocument, cursor: lsp.Position) -> bool:
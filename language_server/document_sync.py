@@ -0,0 +1,32 @@
+import asyncio
+
+import lsprotocol.types as lsp
+
+import server
+from commands import check_speculation
+from utils import mark_as_feature
+
+
+@mark_as_feature(lsp.TEXT_DOCUMENT_DID_CHANGE)
+def did_change(
+    ls: "server.DocstringLanguageServer", params: lsp.DidChangeTextDocumentParams
+) -> None:
+    """LSP handler for textDocument/didChange notification.
+
+    A speculative docstring generation in the document is cancelled
+    if its code entity has changed.
+    """
+    document = ls.workspace.get_text_document(params.text_document.uri)
+    ls.analyzer_cache.update(document, params.content_changes)
+    if ls.speculator.get(document.uri):
+        asyncio.ensure_future(check_speculation(ls, document))
+
+
+@mark_as_feature(lsp.TEXT_DOCUMENT_DID_CLOSE)
+def did_close(
+    ls: "server.DocstringLanguageServer", params: lsp.DidCloseTextDocumentParams
+) -> None:
+    """LSP handler for textDocument/didClose notification."""
+    ls.analyzer_cache.invalidate(params.text_document.uri)
+    if ls.speculator.get(params.text_document.uri):
+        ls.speculator.cancel()
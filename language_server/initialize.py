@@ -7,6 +7,7 @@ import lsprotocol.types as lsp
 import server
 from settings import GlobalSettings, WorkspaceSettings
 from utils import mark_as_feature
+from utils.docstring_cache import DocstringCache
 
 
 @mark_as_feature(lsp.INITIALIZE)
@@ -28,6 +29,13 @@ def initialize(
     workspace_settings = initialization_options.get("settings", {})
     ls.workspace_settings = WorkspaceSettings(workspace_settings, ls.global_settings)
 
+    # Persist the generated docstrings in the extension storage, if provided
+    if storage_path := initialization_options.get("storagePath"):
+        ls.storage_path = storage_path
+        cache_path = os.path.join(storage_path, "docstrings.sqlite3")
+        ls.docstring_cache = DocstringCache(cache_path)
+        ls.log_to_output(f"Docstring cache: {cache_path}")
+
     # fmt: off
     global_settings_output = json.dumps(
         ls.global_settings, indent=4, ensure_ascii=False
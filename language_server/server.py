@@ -1,16 +1,44 @@
 from __future__ import annotations
 
+import asyncio
 import enum
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
 
 import lsprotocol.types as lsp
 from attr import dataclass
 from pygls.server import LanguageServer
-
-from commands import apply_generate_docstring
+from pygls.workspace import TextDocument
+
+from commands import (
+    apply_generate_all_docstrings,
+    apply_generate_docstring,
+    apply_generate_workspace_docstrings,
+    speculate_docstring,
+)
 from completions import completions
+from document_sync import did_change, did_close
 from initialize import initialize
-from settings import SERVER_NAME, SERVER_VERSION, GlobalSettings, WorkspaceSettings
+from settings import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    SERVER_NAME,
+    SERVER_VERSION,
+    GlobalSettings,
+    WorkspaceSettings,
+)
+from shutdown import shutdown
+from utils.circuit_breaker import CircuitBreaker
+from utils.client_pool import ClientPool
+from utils.code_analyzers.cache import AnalyzerCache
+from utils.docstring_cache import DocstringCache
+from utils.rate_limit import RateLimiter
+from utils.routing import EndpointRouter
+from utils.scheduler import GenerationScheduler
+from utils.single_flight import SingleFlight
+from utils.speculation import Speculator
+
+T = TypeVar("T")
 
 
 @enum.unique
@@ -36,6 +64,24 @@ class DocstringLanguageServer(LanguageServer):
     global_settings: GlobalSettings
     workspace_settings: WorkspaceSettings
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.analyzer_cache = AnalyzerCache()
+        self.analysis_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="analysis"
+        )
+        self.rate_limiter = RateLimiter()
+        self.client_pool = ClientPool(self.rate_limiter)
+        self.circuit_breaker = CircuitBreaker(
+            CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+        )
+        self.docstring_cache = DocstringCache()
+        self.inflight_requests: SingleFlight[str | None] = SingleFlight()
+        self.scheduler = GenerationScheduler()
+        self.router = EndpointRouter()
+        self.speculator = Speculator()
+        self.storage_path: str | None = None
+
     def register_feature(self, function: Callable) -> None:
         """Register a function as an LSP feature.
 
@@ -66,6 +112,22 @@ class DocstringLanguageServer(LanguageServer):
         """
         self.command(function.command_name)(function)
 
+    async def run_analysis(
+        self, document: TextDocument, function: Callable[[TextDocument], T]
+    ) -> T:
+        """Runs the analysis of a document in the analysis executor.
+
+        The function receives a snapshot of the document taken on the event loop,
+        so the analysis is not affected by changes made to the document meanwhile.
+        Analyses are run one at a time in the order they were requested.
+
+        Example:
+            entity = await server.run_analysis(document, lambda doc: analyze(doc))
+        """
+        snapshot = TextDocument(document.uri, document.source, document.version)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.analysis_executor, function, snapshot)
+
     def log_to_output(
         self, message: str, msg_type: lsp.MessageType = lsp.MessageType.Log
     ) -> None:
@@ -107,5 +169,11 @@ def create_server() -> DocstringLanguageServer:
     server = DocstringLanguageServer(name=SERVER_NAME, version=SERVER_VERSION)
     server.register_feature(initialize)
     server.register_feature(completions)
+    server.register_feature(did_change)
+    server.register_feature(did_close)
+    server.register_feature(shutdown)
     server.register_command(apply_generate_docstring)
+    server.register_command(apply_generate_all_docstrings)
+    server.register_command(apply_generate_workspace_docstrings)
+    server.register_command(speculate_docstring)
     return server
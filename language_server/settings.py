@@ -9,6 +9,15 @@ from pygls import uris, workspace
 SERVER_NAME = "chatgpt-docstrings"
 SERVER_VERSION = "0.1"
 ALLOWED_PROXY_PROTOCOLS = ("http", "https", "socks5", "socks5h")
+# Limits of the code of the entities packed into one request, in characters
+MAX_PACKED_ENTITY_LENGTH = 1500
+MAX_PACKED_CODE_LENGTH = 6000
+# The API endpoint used if the `baseUrl` setting is empty
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+# Consecutive connection failures opening the circuit of an endpoint,
+# and the time in seconds before the endpoint is probed again
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 30
 
 
 class GlobalSettings(dict):
@@ -0,0 +1,15 @@
+import lsprotocol.types as lsp
+
+import server
+from utils import mark_as_feature
+
+
+@mark_as_feature(lsp.SHUTDOWN)
+async def shutdown(ls: "server.DocstringLanguageServer", params: None) -> None:
+    """LSP handler for shutdown request.
+
+    It is called after the built-in handler, which cancels pending requests.
+    """
+    ls.speculator.cancel()
+    await ls.client_pool.aclose()
+    ls.docstring_cache.close()
@@ -1,5 +1,6 @@
 from .utils import (  # noqa: F401
     create_httpx_client,
+    get_document_entity_at_cursor,
     get_entity_at_cursor,
     get_line_endings,
     mark_as_command,
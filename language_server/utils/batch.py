@@ -0,0 +1,453 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Iterator, Sequence, TypeVar, cast
+
+import lsprotocol.types as lsp
+from pygls import uris
+from pygls.server import LanguageServer
+from pygls.workspace import TextDocument
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Directories that never contain the user's source code.
+EXCLUDED_DIRS = {"__pycache__", "node_modules", "site-packages"}
+
+
+@dataclass(frozen=True)
+class AnalyzedFile(Generic[T]):
+    """Represents the analysis of a file of the workspace.
+
+    Attributes:
+        path: The path to the file.
+        source: The source code of the file when it was analyzed.
+        analyzed_entities: The analyses of the undocumented code entities.
+    """
+
+    path: str
+    source: str
+    analyzed_entities: list[T]
+
+
+def discover_python_files(root: str) -> Iterator[str]:
+    """Yields the paths of the Python files under the root directory.
+
+    Hidden directories, virtual environments and the directories of
+    installed packages are skipped.
+    """
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(
+            name
+            for name in dir_names
+            if not name.startswith(".")
+            and name not in EXCLUDED_DIRS
+            and not os.path.exists(os.path.join(dir_path, name, "pyvenv.cfg"))
+        )
+        for file_name in sorted(file_names):
+            if file_name.endswith(".py"):
+                yield os.path.join(dir_path, file_name)
+
+
+def discover_workspace_files(roots: list[str]) -> list[str]:
+    """Returns the paths of the Python files of the workspace folders."""
+    file_paths = dict.fromkeys(
+        file_path for root in roots for file_path in discover_python_files(root)
+    )
+    return list(file_paths)
+
+
+def read_and_analyze(
+    path: str,
+    source: str | None,
+    completed_digest: str | None,
+    analyze: Callable[[TextDocument], list[T]],
+) -> AnalyzedFile[T] | None:
+    """Analyzes the undocumented code entities of a file in a worker process.
+
+    The source code of the file is read from disk unless provided.
+    Returns None if the file has not changed since it was processed.
+    """
+    if source is None:
+        with open(path, encoding="utf-8", newline="") as file:
+            source = file.read()
+    if get_digest(source) == completed_digest:
+        return None
+    document = TextDocument(uris.from_fs_path(path) or path, source)
+    return AnalyzedFile(path, source, analyze(document))
+
+
+def write_source(path: str, expected_source: str, source: str) -> bool:
+    """Replaces the source code of the file unless it differs from the expected one."""
+    with open(path, encoding="utf-8", newline="") as file:
+        if file.read() != expected_source:
+            return False
+    temp_path = f"{path}.docstrings.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as file:
+        file.write(source)
+    shutil.copymode(path, temp_path)
+    os.replace(temp_path, path)
+    return True
+
+
+def get_digest(source: str) -> str:
+    """Returns a hash of the source code of a file."""
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def apply_text_edits(source: str, text_edits: Sequence[lsp.TextEdit]) -> str:
+    """Returns the source code with the text edits applied.
+
+    The edits must not overlap, as the edits of a workspace edit.
+    """
+    document = TextDocument("untitled:batch", source)
+    for text_edit in sorted(
+        text_edits,
+        key=lambda edit: (edit.range.start.line, edit.range.start.character),
+        reverse=True,
+    ):
+        document.apply_change(
+            lsp.TextDocumentContentChangeEvent_Type1(
+                range=text_edit.range, text=text_edit.new_text
+            )
+        )
+    return document.source
+
+
+class BatchJournal:
+    """Records the files processed by a batch job, so that it can be resumed.
+
+    A file is recorded with the hash of its documented source code, and is
+    skipped by the following jobs until the file is changed. The journal is
+    a JSON Lines file: a header with the roots of the job, then one record
+    appended per processed file, so a record cut short by a crash loses only
+    that file. The journal is removed when the job is finished.
+
+    Attributes:
+        _path: The path to the journal file, or None if not persisted.
+        _roots: The root directories processed by the job.
+        _completed: The hashes of the processed files, keyed by the file path.
+        _rewritten: Whether the journal has been rewritten for this job.
+    """
+
+    def __init__(self, path: str | None, roots: Sequence[str]) -> None:
+        self._path = path
+        self._roots = sorted(roots)
+        self._completed: dict[str, str] = self._load()
+        self._rewritten = False
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def completed_digest(self, file_path: str) -> str | None:
+        """Returns the hash of the processed file, or None if not processed."""
+        return self._completed.get(file_path)
+
+    def complete(self, file_path: str, source: str) -> None:
+        """Records the processed file with its source code."""
+        digest = get_digest(source)
+        self._append({"path": file_path, "digest": digest})
+        self._completed[file_path] = digest
+
+    def finish(self) -> None:
+        """Removes the journal of the finished job."""
+        self._completed.clear()
+        if self._path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(self._path)
+
+    def _load(self) -> dict[str, str]:
+        """Loads the files processed by an interrupted job on the same roots.
+
+        Records that cannot be read, such as one cut short by a crash,
+        are skipped.
+        """
+        if self._path is None:
+            return {}
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                lines = file.readlines()
+        except OSError:
+            return {}
+        records = []
+        for line in lines:
+            with contextlib.suppress(ValueError):
+                records.append(json.loads(line))
+        if not records or not isinstance(records[0], dict):
+            return {}
+        if records[0].get("roots") != self._roots:
+            return {}
+        return {
+            record["path"]: record["digest"]
+            for record in records[1:]
+            if isinstance(record, dict)
+            and isinstance(record.get("path"), str)
+            and isinstance(record.get("digest"), str)
+        }
+
+    def _append(self, record: dict[str, str]) -> None:
+        """Appends the record to the journal; the errors are ignored.
+
+        The journal is first rewritten atomically with the header and the
+        records loaded, dropping the records of other jobs and unreadable ones.
+        """
+        if self._path is None:
+            return
+        with contextlib.suppress(OSError):
+            if not self._rewritten:
+                self._rewrite(self._path)
+                self._rewritten = True
+            with open(self._path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def _rewrite(self, path: str) -> None:
+        """Writes the header and the records loaded to the journal atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"roots": self._roots}) + "\n")
+            for file_path, digest in self._completed.items():
+                file.write(json.dumps({"path": file_path, "digest": digest}) + "\n")
+        os.replace(temp_path, path)
+
+
+class Throughput:
+    """Measures the number of generated docstrings and used tokens per minute."""
+
+    def __init__(self) -> None:
+        self._start = time.monotonic()
+        self.entities = 0
+        self.tokens = 0
+
+    def add(self, entities: int = 0, tokens: int = 0) -> None:
+        """Counts the generated docstrings and the used tokens."""
+        self.entities += entities
+        self.tokens += tokens
+
+    def per_minute(self) -> tuple[float, float]:
+        """Returns the docstrings and the tokens per minute since the start."""
+        minutes = max(time.monotonic() - self._start, 1) / 60
+        return self.entities / minutes, self.tokens / minutes
+
+
+class WorkspaceJob(Generic[T]):
+    """Documents the Python files of the workspace as a pipeline.
+
+    The files are analyzed in a process pool, the docstrings of their
+    undocumented code entities are generated within the limits of each
+    API endpoint, and each file is written back as soon as all its docstrings
+    are generated. Files opened in the editor are edited through the client,
+    the other files are written on disk. The processed files are recorded
+    in the journal, so they are skipped when an interrupted job is resumed.
+    The progress and the throughput are reported after each docstring.
+
+    Attributes:
+        _get_analysis: Returns the function analyzing the undocumented code
+            entities of a file, which is sent to the process pool.
+        _generate_edits: Generates the docstrings of an analyzed file; returns
+            their text edits. It is called with the file path, the analyzed
+            file, and the callbacks counting the processed code entities
+            and the used tokens.
+    """
+
+    def __init__(
+        self,
+        ls: LanguageServer,
+        progress_token: lsp.ProgressToken,
+        journal: BatchJournal,
+        executor: Executor,
+        *,
+        max_analyses: int,
+        max_documented_files: int,
+        get_analysis: Callable[[str], Callable[[TextDocument], list[T]]],
+        generate_edits: Callable[
+            [str, AnalyzedFile[T], Callable[[int], None], Callable[[int], None]],
+            Awaitable[list[lsp.TextEdit]],
+        ],
+    ) -> None:
+        self._ls = ls
+        self._progress_token = progress_token
+        self._journal = journal
+        self._executor = executor
+        self._max_analyses = max_analyses
+        self._max_documented_files = max_documented_files
+        self._get_analysis = get_analysis
+        self._generate_edits = generate_edits
+        self._throughput = Throughput()
+        self._total_files = 0
+        self._processed_files = 0
+
+    async def run(self, file_paths: list[str]) -> tuple[int, int]:
+        """Processes the files; returns the numbers of documented and failed files.
+
+        The files are analyzed by one task per worker of the process pool,
+        and the analyzed files wait in a bounded queue for the tasks
+        generating their docstrings, as many as the requests sent at once
+        to an API endpoint, so only a few files are held in memory.
+        """
+        self._total_files = len(file_paths)
+        self._report_progress()
+        pending_paths = iter(file_paths)
+        analyzed_files: asyncio.Queue[tuple[str, AnalyzedFile[T]] | None] = (
+            asyncio.Queue(maxsize=self._max_documented_files)
+        )
+        results: list[bool | None] = []
+
+        async def analyze_files() -> None:
+            for path in pending_paths:
+                result = await self._process_file(path, self._analyze_file(path))
+                if isinstance(result, AnalyzedFile):
+                    await analyzed_files.put((path, result))
+                else:
+                    self._finish_file(results, result)
+
+        async def document_files() -> None:
+            while (item := await analyzed_files.get()) is not None:
+                path, analyzed_file = item
+                result = await self._process_file(
+                    path, self._document_file(path, analyzed_file)
+                )
+                self._finish_file(results, result)
+
+        documenters = [
+            asyncio.ensure_future(document_files())
+            for _ in range(self._max_documented_files)
+        ]
+        try:
+            await asyncio.gather(*[analyze_files() for _ in range(self._max_analyses)])
+            for _ in documenters:
+                await analyzed_files.put(None)
+            await asyncio.gather(*documenters)
+        finally:
+            for documenter in documenters:
+                documenter.cancel()
+        documented_files = sum(1 for result in results if result)
+        failed_files = sum(1 for result in results if result is None)
+        return documented_files, failed_files
+
+    async def _process_file(self, path: str, step: Awaitable[R]) -> R | None:
+        """Runs a step of the file processing; returns None if it has failed."""
+        try:
+            return await step
+        except Exception as e:
+            self._ls.show_message_log(
+                f"Failed to document {path} ({e})", lsp.MessageType.Error
+            )
+            return None
+
+    def _finish_file(self, results: list[bool | None], result: bool | None) -> None:
+        """Records the result of a processed file and reports the progress."""
+        results.append(result)
+        self._processed_files += 1
+        self._report_progress()
+
+    async def _analyze_file(self, path: str) -> AnalyzedFile[T] | bool:
+        """Analyzes the file in the process pool.
+
+        Returns False if there is nothing to document in the file.
+        """
+        uri = uris.from_fs_path(path) or path
+        document = self._ls.workspace.text_documents.get(uri)
+        analyzed_file = await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            read_and_analyze,
+            path,
+            document.source if document else None,
+            self._journal.completed_digest(path),
+            self._get_analysis(path),
+        )
+        if analyzed_file is None:
+            return False
+        if not analyzed_file.analyzed_entities:
+            self._journal.complete(path, analyzed_file.source)
+            return False
+        return analyzed_file
+
+    async def _document_file(
+        self, path: str, analyzed_file: AnalyzedFile[T]
+    ) -> bool | None:
+        """Generates the docstrings of the analyzed file and writes them back.
+
+        Returns True if docstrings were added, and None if the file has failed.
+        """
+        text_edits = await self._generate_edits(
+            path,
+            analyzed_file,
+            self._on_processed,
+            lambda tokens: self._throughput.add(tokens=tokens),
+        )
+        if not text_edits:
+            return None
+
+        source = apply_text_edits(analyzed_file.source, text_edits)
+        uri = uris.from_fs_path(path) or path
+        if not await self._write_file(uri, analyzed_file, source, text_edits):
+            self._ls.show_message_log(
+                f"Failed to document {path} (the file was changed at generation time)",
+                lsp.MessageType.Error,
+            )
+            return None
+        if len(text_edits) < len(analyzed_file.analyzed_entities):
+            return None
+        self._journal.complete(path, source)
+        return True
+
+    def _on_processed(self, count: int) -> None:
+        """Counts the processed code entities and reports the progress."""
+        self._throughput.add(entities=count)
+        self._report_progress()
+
+    async def _write_file(
+        self,
+        uri: str,
+        analyzed_file: AnalyzedFile[T],
+        source: str,
+        text_edits: list[lsp.TextEdit],
+    ) -> bool:
+        """Writes the documented source code unless the file has been changed."""
+        document = self._ls.workspace.text_documents.get(uri)
+        if document is None:
+            return await asyncio.to_thread(
+                write_source, analyzed_file.path, analyzed_file.source, source
+            )
+        if document.source != analyzed_file.source:
+            return False
+        workspace_edit = lsp.WorkspaceEdit(
+            document_changes=[
+                lsp.TextDocumentEdit(
+                    text_document=lsp.OptionalVersionedTextDocumentIdentifier(
+                        uri=uri, version=document.version or 0
+                    ),
+                    edits=text_edits,  # type: ignore
+                )
+            ]
+        )
+        result = await cast(
+            Awaitable[lsp.ApplyWorkspaceEditResult],
+            self._ls.apply_edit_async(workspace_edit),
+        )
+        return result.applied
+
+    def _report_progress(self) -> None:
+        """Reports the processed files and the throughput of the job."""
+        entities_per_minute, tokens_per_minute = self._throughput.per_minute()
+        self._ls.progress.report(
+            self._progress_token,
+            lsp.WorkDoneProgressReport(
+                message=(
+                    f"{self._processed_files}/{self._total_files} files, "
+                    f"{self._throughput.entities} docstrings "
+                    f"({entities_per_minute:.0f} docstrings/min, "
+                    f"{tokens_per_minute:.0f} tokens/min)"
+                ),
+                percentage=self._processed_files * 100 // max(self._total_files, 1),
+            ),
+        )
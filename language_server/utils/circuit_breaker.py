@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from openai import APIConnectionError, OpenAIError
+
+# Errors showing that an endpoint is unreachable, as opposed to the errors
+# returned by a reachable endpoint.
+CONNECTION_ERRORS = (APIConnectionError, asyncio.TimeoutError)
+
+
+class CircuitOpenError(OpenAIError):
+    """Raised when a request is not sent because its endpoint is unreachable."""
+
+
+@dataclass
+class Circuit:
+    """Represents the health of an endpoint.
+
+    Attributes:
+        failures: The number of consecutive connection failures.
+        opened_at: The time the circuit was opened, or None if it is closed.
+        probing: Whether a request is probing the endpoint of the open circuit.
+    """
+
+    failures: int = 0
+    opened_at: float | None = None
+    probing: bool = False
+
+
+class CircuitBreaker:
+    """Fails the requests to an unreachable endpoint without sending them.
+
+    The circuit of an endpoint is opened after consecutive connection
+    failures or timeouts, and the following requests fail immediately.
+    Once `reset_timeout` has passed, one request probes the endpoint:
+    the circuit is closed if it succeeds, and opened again if it fails.
+    Any response of the endpoint, even an error, counts as a success.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: dict[str, Circuit] = {}
+
+    @contextlib.asynccontextmanager
+    async def guard(self, endpoint: str) -> AsyncIterator[None]:
+        """Records the outcome of the requests made in the context.
+
+        Example:
+            async with breaker.guard(endpoint):
+                await asyncio.wait_for(request(), timeout)
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open.
+        """
+        circuit = self._circuits.setdefault(endpoint, Circuit())
+        probe = self._admit(endpoint, circuit)
+        try:
+            yield
+        except CONNECTION_ERRORS:
+            circuit.failures += 1
+            if probe or circuit.failures >= self.failure_threshold:
+                circuit.opened_at = time.monotonic()
+            raise
+        except Exception:
+            self._close(circuit)
+            raise
+        else:
+            self._close(circuit)
+        finally:
+            if probe:
+                circuit.probing = False
+
+    def is_available(self, endpoint: str) -> bool:
+        """Checks if a request to the endpoint would be admitted now."""
+        circuit = self._circuits.get(endpoint)
+        if circuit is None or circuit.opened_at is None:
+            return True
+        elapsed = time.monotonic() - circuit.opened_at
+        return elapsed >= self.reset_timeout and not circuit.probing
+
+    def _admit(self, endpoint: str, circuit: Circuit) -> bool:
+        """Admits a request; returns True if it probes the open circuit.
+
+        Raises:
+            CircuitOpenError: If the request is not admitted.
+        """
+        if circuit.opened_at is None:
+            return False
+        remaining = circuit.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0 or circuit.probing:
+            raise CircuitOpenError(
+                f"{endpoint} is unreachable, requests are paused for "
+                f"{max(round(remaining), 1)} secs. Check the network connection "
+                "and the `baseUrl` and proxy settings."
+            )
+        circuit.probing = True
+        return True
+
+    @staticmethod
+    def _close(circuit: Circuit) -> None:
+        """Closes the circuit after a response of the endpoint."""
+        circuit.failures = 0
+        circuit.opened_at = None
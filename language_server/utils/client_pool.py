@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, NamedTuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from . import create_httpx_client
+from .proxy import Proxy
+from .rate_limit import RateLimiter
+
+
+class ClientKey(NamedTuple):
+    """Identifies the requests that can share a client and its connections."""
+
+    base_url: str | None
+    proxy: tuple[str, str, bool] | None
+    api_key_hash: str
+    max_connections: int
+    idle_timeout: float
+
+
+@dataclass
+class PooledClient:
+    """Represents a client of the pool and its usage."""
+
+    client: AsyncOpenAI
+    idle_timeout: float
+    in_use: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    def is_expired(self, now: float) -> bool:
+        """Checks if the client has not been used for longer than its idle timeout."""
+        return not self.in_use and now - self.last_used > self.idle_timeout
+
+
+class ClientPool:
+    """Pool of long-lived OpenAI clients reusing keep-alive connections.
+
+    A client is shared by the requests with the same base URL, proxy, API key
+    and connection limits, so only the first request pays for establishing
+    a connection. The pool is keyed by the hash of the API key, not the key
+    itself. Clients not used for longer than their idle timeout are closed
+    on the next request, the remaining ones are closed by `aclose`.
+    If a rate limiter is given, the chat completions of the clients are paced
+    by it.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter | None = None) -> None:
+        self._clients: dict[ClientKey, PooledClient] = {}
+        self._rate_limiter = rate_limiter
+
+    @contextlib.asynccontextmanager
+    async def client(
+        self,
+        *,
+        api_key: str,
+        base_url: str | None = None,
+        proxy: Proxy | None = None,
+        max_connections: int = 10,
+        idle_timeout: float = 60,
+    ) -> AsyncIterator[AsyncOpenAI]:
+        """Provides a client for the duration of the context.
+
+        Example:
+            async with pool.client(api_key=api_key) as client:
+                await client.chat.completions.create(...)
+        """
+        await self._close_expired()
+        key = ClientKey(
+            base_url=base_url,
+            proxy=(proxy.url, proxy.authorization, proxy.strict_ssl) if proxy else None,
+            api_key_hash=hashlib.sha256(api_key.encode()).hexdigest(),
+            max_connections=max_connections,
+            idle_timeout=idle_timeout,
+        )
+        if (pooled := self._clients.get(key)) is None:
+            pooled = self._clients[key] = PooledClient(
+                self._create_client(api_key, base_url, proxy, key), idle_timeout
+            )
+        pooled.in_use += 1
+        try:
+            yield pooled.client
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+
+    def _create_client(
+        self, api_key: str, base_url: str | None, proxy: Proxy | None, key: ClientKey
+    ) -> AsyncOpenAI:
+        """Creates a client with the connection limits of the key."""
+        limits = httpx.Limits(
+            max_connections=key.max_connections,
+            max_keepalive_connections=key.max_connections,
+            keepalive_expiry=key.idle_timeout,
+        )
+        event_hooks = (
+            self._rate_limiter.event_hooks(base_url) if self._rate_limiter else None
+        )
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=create_httpx_client(proxy, limits, event_hooks),
+        )
+
+    async def _close_expired(self) -> None:
+        """Closes the clients that have not been used for too long."""
+        now = time.monotonic()
+        for key, pooled in list(self._clients.items()):
+            if pooled.is_expired(now):
+                del self._clients[key]
+                await pooled.client.close()
+
+    async def aclose(self) -> None:
+        """Closes all clients of the pool."""
+        clients, self._clients = self._clients, {}
+        for pooled in clients.values():
+            await pooled.client.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -1,12 +1,26 @@
 from __future__ import annotations
 
 import ast
+import bisect
 import contextlib
+import copy
 import re
 import tokenize
+import weakref
 from io import BytesIO
 from tokenize import TokenInfo
-from typing import Protocol, TypeVar, Union, cast
+from typing import (
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Protocol,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+)
+
+import lsprotocol.types as lsp
 
 from .base import (
     BaseAnalyzer,
@@ -17,19 +31,32 @@ from .base import (
     DocumentPosition,
     DocumentRange,
     IPosition,
+    IRange,
     NamedCodeEntity,
     Position,
+    memoized_property,
 )
 from .factory import AnalyzerFactory
+from .line_index import LINE_BREAK_RE, LineIndex
 
 NamedNodes = Union[ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef]
 ContextNodes = Union[ast.Module, NamedNodes]
 TContextNode = TypeVar("TContextNode", bound=ContextNodes)
 
+# Nodes that can contain statements (`match_case` is available since Python 3.10).
+STATEMENT_CONTAINERS: tuple[type[ast.AST], ...] = (
+    ast.mod,
+    ast.stmt,
+    ast.excepthandler,
+    *((ast.match_case,) if hasattr(ast, "match_case") else ()),
+)
+
 
 class ASTWithLocation(ast.mod):
-    """AST node with end location information."""
+    """AST node with start and end location information."""
 
+    lineno: int
+    col_offset: int
     end_lineno: int
     end_col_offset: int
 
@@ -110,14 +137,23 @@ def is_child_node(node: ast.AST, parent: ast.AST) -> bool:
     return any(i for i in ast.walk(parent) if i is node)
 
 
-def get_source_segment(source: str, node: ast.AST, *, padded: bool = False) -> str:
+def get_source_segment(
+    source: str | LineIndex,
+    node: ast.AST,
+    *,
+    padded: bool = False,
+    line_offset: int = 0,
+) -> str:
     """Get source code segment of the *source* that generated *node*.
 
     Args:
-        source: The source code as a string from which the segment will be extracted.
+        source: The source code from which the segment will be extracted,
+            either as a string or as its line index.
         node: The node whose corresponding source code segment is to be extracted.
         padded: If True, the function ensures the extracted segment maintains
             proper indentation by padding the first line of the statement.
+        line_offset: The number of lines to add to the node line numbers
+            to get the line numbers in the *source*.
 
     Returns:
         The source code segment corresponding to the node, or None if any location
@@ -125,36 +161,30 @@ def get_source_segment(source: str, node: ast.AST, *, padded: bool = False) -> s
         or `end_col_offset`).
     """
     node = ensure_node_has_location(node)
+    line_index = source if isinstance(source, LineIndex) else LineIndex(source)
 
-    lineno = node.lineno - 1
-    end_lineno = node.end_lineno - 1
-    col_offset = node.col_offset
-    end_col_offset = node.end_col_offset
-
-    lines = _splitlines_no_ff(source)
+    lineno = node.lineno - 1 + line_offset
+    start = line_index.offset(lineno, node.col_offset, utf8=True)
+    end = line_index.offset(
+        node.end_lineno - 1 + line_offset, node.end_col_offset, utf8=True
+    )
 
     if padded:
-        padding = _pad_whitespace(lines[lineno].encode()[:col_offset].decode())
+        line_start = line_index.line_starts[lineno]
+        padding = _pad_whitespace(line_index.source[line_start:start])
     else:
         padding = ""
 
-    if end_lineno == lineno:
-        return padding + lines[lineno].encode()[col_offset:end_col_offset].decode()
-
-    first = padding + lines[lineno].encode()[col_offset:].decode()
-    last = lines[end_lineno].encode()[:end_col_offset].decode()
-    lines = lines[lineno + 1 : end_lineno]
-
-    lines.insert(0, first)
-    lines.append(last)
-    return "".join(lines)
+    return padding + line_index.source[start:end]
 
 
 def _find_colon_tokens(code: str | list[str]) -> list[TokenInfo] | None:
     """Find and return colon tokens in the given code.
 
     This function tokenizes the provided code string
-    and collects all tokens that are colons.
+    and collects all tokens that are colons. If the code cannot be tokenized
+    to the end (e.g. it contains an unclosed triple quote), the colons found
+    before the error are returned.
 
     Args:
         code: The source code to be analyzed as a string.
@@ -168,37 +198,13 @@ def _find_colon_tokens(code: str | list[str]) -> list[TokenInfo] | None:
         code = "\n".join(code)
     colons = []
     tokens = tokenize.tokenize(BytesIO(code.encode("utf-8")).readline)
-    for token in tokens:
-        if token.type == tokenize.OP and token.exact_type == tokenize.COLON:
-            colons.append(token)
+    with contextlib.suppress(tokenize.TokenError, SyntaxError):
+        for token in tokens:
+            if token.type == tokenize.OP and token.exact_type == tokenize.COLON:
+                colons.append(token)
     return colons if colons else None
 
 
-def _splitlines_no_ff(source: str) -> list[str]:
-    """Split a string into lines ignoring form feed and other chars.
-
-    This mimics how the Python parser splits source code.
-    """
-    idx = 0
-    lines = []
-    next_line = ""
-    while idx < len(source):
-        c = source[idx]
-        next_line += c
-        idx += 1
-        # Keep \r\n together
-        if c == "\r" and idx < len(source) and source[idx] == "\n":
-            next_line += "\n"
-            idx += 1
-        if c in "\r\n":
-            lines.append(next_line)
-            next_line = ""
-
-    if next_line:
-        lines.append(next_line)
-    return lines
-
-
 def _pad_whitespace(source: str) -> str:
     r"""Replace all chars except '\f\t' in a line with spaces."""
     result = ""
@@ -328,19 +334,172 @@ class ASTContextResolver(ast.NodeVisitor):
         return self._node_stack[-1] if self._node_stack else None
 
 
+class ASTIntervalIndex:
+    """Sorted index of the line ranges of class and function definitions.
+
+    The line ranges of definitions are either nested or disjoint, so the lines of
+    a module can be split into segments, each covered by the same chain of
+    definitions (from the outermost to the innermost one). The innermost definition
+    under the cursor is found with two binary searches: one over the segments and
+    one over the column offsets of the chain.
+
+    Attributes:
+        module: The module node the index was built for, if any.
+        _segment_starts: The first line of each segment, in ascending order.
+        _segment_chains: The chain of definitions covering each segment.
+        _segment_columns: The column offsets of the definitions of each chain.
+    """
+
+    _indexes: weakref.WeakKeyDictionary[ast.AST, ASTIntervalIndex] = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __init__(self, ast_tree: ast.AST) -> None:
+        self.module = ast_tree if isinstance(ast_tree, ast.Module) else None
+        self._segment_starts: list[int] = []
+        self._segment_chains: list[tuple[NamedASTWithLocation, ...]] = []
+        self._segment_columns: list[list[int]] = []
+        self._build(_iter_named_nodes(ast_tree))
+
+    @classmethod
+    def for_tree(cls, ast_tree: ast.AST) -> ASTIntervalIndex:
+        """Returns the index of the given tree, building it only once per tree."""
+        if (index := cls._indexes.get(ast_tree)) is None:
+            index = cls._indexes[ast_tree] = cls(ast_tree)
+        return index
+
+    def _build(self, nodes: Iterable[NamedASTWithLocation]) -> None:
+        """Splits the lines into segments covered by the same chain of definitions."""
+        chain: list[NamedASTWithLocation] = []
+        for node in nodes:
+            self._close_nodes_before(chain, node.lineno)
+            chain.append(node)
+            self._add_segment(node.lineno, chain)
+        self._close_nodes_before(chain, None)
+
+    def _close_nodes_before(
+        self, chain: list[NamedASTWithLocation], line: int | None
+    ) -> None:
+        """Removes from the chain the definitions that end before the given line."""
+        while chain and (line is None or chain[-1].end_lineno < line):
+            node = chain.pop()
+            self._add_segment(node.end_lineno + 1, chain)
+
+    def _add_segment(self, start: int, chain: list[NamedASTWithLocation]) -> None:
+        """Adds a segment, replacing the previous one if it starts on the same line."""
+        if self._segment_starts and self._segment_starts[-1] == start:
+            self._segment_starts.pop()
+            self._segment_chains.pop()
+            self._segment_columns.pop()
+        self._segment_starts.append(start)
+        self._segment_chains.append(tuple(chain))
+        self._segment_columns.append([node.col_offset for node in chain])
+
+    def find_nodes(self, cursor: IPosition) -> tuple[NamedASTWithLocation, ...]:
+        """Returns the definitions under the cursor, from the outermost to innermost.
+
+        The same rules as in `is_cursor_within_node` are applied.
+        """
+        segment = bisect.bisect_right(self._segment_starts, cursor.line) - 1
+        if segment < 0:
+            return ()
+        # The column offsets of nested definitions strictly increase.
+        depth = bisect.bisect_left(self._segment_columns[segment], cursor.character)
+        return self._segment_chains[segment][:depth]
+
+
+def _iter_named_nodes(node: ast.AST) -> Iterator[NamedASTWithLocation]:
+    """Yields class and function definitions in the order they appear in the code.
+
+    Only statements are traversed, since definitions cannot be part of expressions.
+    """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield ensure_named_node_has_location(child)
+        if isinstance(child, STATEMENT_CONTAINERS):
+            yield from _iter_named_nodes(child)
+
+
+class ASTIntervalContextResolver:
+    """Resolver of the context based on the cursor position using `ASTIntervalIndex`.
+
+    Unlike `ASTContextResolver`, the tree is not traversed on every lookup:
+    the index is built once per tree, and the lookup takes logarithmic time
+    regardless of the size and the nesting of the code.
+
+    Attributes:
+        _module: The module node of the tree, if any.
+        _node_stack: Class and function nodes that the cursor is inside.
+    """
+
+    def __init__(self, cursor: IPosition, ast_tree: ast.AST) -> None:
+        index = ASTIntervalIndex.for_tree(ast_tree)
+        self._module = index.module
+        self._node_stack = index.find_nodes(cursor)
+
+    def _find_last_of_type(
+        self, node_type: type[TContextNode] | tuple[type[TContextNode], ...]
+    ) -> TContextNode | None:
+        """Find the innermost node of a given type under the cursor."""
+        return next(
+            (
+                node
+                for node in reversed(self._node_stack)
+                if isinstance(node, node_type)
+            ),
+            None,
+        )
+
+    def find_function_node(self) -> ast.FunctionDef | ast.AsyncFunctionDef | None:
+        """Finds the last function node under the cursor position."""
+        return self._find_last_of_type((ast.FunctionDef, ast.AsyncFunctionDef))
+
+    def find_class_node(self) -> ast.ClassDef | None:
+        """Finds the last class node under the cursor position."""
+        return self._find_last_of_type(ast.ClassDef)
+
+    def find_module_node(self) -> ast.Module | None:
+        """Finds the module node."""
+        return self._module
+
+    def get_current_context(self) -> ContextNodes | None:
+        """Get the innermost node under the cursor."""
+        if self._node_stack:
+            return cast(NamedNodes, self._node_stack[-1])
+        return self._module
+
+
 class AstEntity(CodeEntity):
-    """Represents a code entity of a source code analyzed with `ast`."""
+    """Represents a code entity of a source code analyzed with `ast`.
+
+    The line numbers of the node may be shifted relative to the source code
+    by `line_offset` lines (see `AstAnalyzer.with_changes`). The source code
+    is only referenced through the shared line index, and the properties
+    are computed on first access.
+    """
+
+    __slots__ = (
+        "_line_index",
+        "_node",
+        "_line_offset",
+        "_code",
+        "_code_lines",
+        "_docstring_range",
+    )
 
-    def __init__(self, source_code: str, node: ContextNodes) -> None:
-        self._document_source_code = source_code
+    def __init__(
+        self, line_index: LineIndex, node: ContextNodes, line_offset: int = 0
+    ) -> None:
+        self._line_index = line_index
         self._node = node
+        self._line_offset = line_offset
 
-    @property
+    @memoized_property
     def code_lines(self) -> list[str]:
         """Returns the source code of the code entity split into lines."""
         return self.code.splitlines()
 
-    @property
+    @memoized_property
     def docstring_range(self) -> DocumentRange | None:
         """Returns the start and end positions of the code entity docstring in code."""
         if not (self._node.body and isinstance(self._node.body[0], ast.Expr)):
@@ -350,45 +509,58 @@ class AstEntity(CodeEntity):
         if not (isinstance(node, ast.Constant) and isinstance(node.value, str)):
             return None
         return DocumentRange(
-            Position(node.lineno, node.col_offset),
-            Position(node.end_lineno, node.end_col_offset),
+            Position(node.lineno + self._line_offset, node.col_offset),
+            Position(node.end_lineno + self._line_offset, node.end_col_offset),
         )
 
 
 class AstNamedEntity(AstEntity, NamedCodeEntity):
     """Represents either a function or a class of a source code analyzed with `ast`."""
 
-    def __init__(self, source_code: str, node: NamedNodes) -> None:
-        super().__init__(source_code, node)
-        self._node = ensure_named_node_has_location(node)
+    __slots__ = ("_code_range", "_signature_end", "_fingerprint")
 
-    @property
+    _node: NamedASTWithLocation
+
+    def __init__(
+        self, line_index: LineIndex, node: NamedNodes, line_offset: int = 0
+    ) -> None:
+        ensure_named_node_has_location(node)
+        super().__init__(line_index, node, line_offset)
+
+    @memoized_property
     def code(self) -> str:
         """Returns the source code of the code entity as a string."""
-        return get_source_segment(self._document_source_code, self._node, padded=True)
+        return get_source_segment(
+            self._line_index,
+            self._node,
+            padded=True,
+            line_offset=self._line_offset,
+        )
 
     @property
     def name(self) -> str:
         """Returns the code entity name."""
         return self._node.name
 
-    @property
+    @memoized_property
     def code_range(self) -> DocumentRange:
         """Returns the start and end positions of the code entity in the source code."""
         return DocumentRange(
-            DocumentPosition(self._node.lineno, self._node.col_offset),
-            DocumentPosition(self._node.end_lineno, self._node.end_col_offset),
+            DocumentPosition(
+                self._node.lineno + self._line_offset, self._node.col_offset
+            ),
+            DocumentPosition(
+                self._node.end_lineno + self._line_offset, self._node.end_col_offset
+            ),
         )
 
-    @property
+    @memoized_property
     def signature_end(self) -> DocumentPosition:
         """Returns the end position of the code entity signature in the source code."""
         # Extract the starting position of the code entity body.
         entity_body = Position(self._node.body[0].lineno, self._node.body[0].col_offset)
         # Extract the code entity header lines up to the body.
-        entity_header = self.code_lines[
-            0 : entity_body.line - self.code_range.start.line + 1
-        ]
+        entity_header = self.code_lines[0 : entity_body.line - self._node.lineno + 1]
         # Trim the last header line to the position where the code entity body begins.
         entity_header[-1] = entity_header[-1][: entity_body.character]
 
@@ -419,31 +591,105 @@ class AstNamedEntity(AstEntity, NamedCodeEntity):
 class AstFunction(AstNamedEntity, BaseFunction):
     """Represents a function of a source code analyzed with `ast`."""
 
+    __slots__ = ()
+
 
 class AstClass(AstNamedEntity, BaseClass):
     """Represents a class of a source code analyzed with `ast`."""
 
+    __slots__ = ("_methods",)
+
+    @memoized_property
+    def methods(self) -> list[AstFunction]:
+        """Returns the methods defined in the class body, in the order they appear."""
+        return [
+            AstFunction(self._line_index, node, self._line_offset)
+            for node in self._node.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+
 
 class AstModule(AstEntity, BaseModule):
     """Represents a module of a source code analyzed with `ast`."""
 
+    __slots__ = ()
+
     @property
     def code(self) -> str:
         """Returns the source code of the module as a string."""
-        return self._document_source_code
+        return self._line_index.source
+
+
+class TopLevelBlock(NamedTuple):
+    """Top-level statements of a module, followed by blank lines and comments.
+
+    Attributes:
+        start: The first line of the block in the source code.
+        line_offset: The number of lines to add to the node line numbers
+            to get the line numbers in the source code.
+        tree: The module node containing the statements of the block,
+            or None if the block has been changed and must be parsed again.
+    """
+
+    start: int
+    line_offset: int
+    tree: ast.Module | None
+
+
+def _split_into_blocks(
+    tree: ast.Module, start: int = 1, line_offset: int = 0
+) -> list[TopLevelBlock]:
+    """Splits the statements of a module into top-level blocks.
+
+    Statements sharing a line (e.g. separated by `;`) are kept in the same block.
+    The first block always starts at the given line, so that the blocks cover
+    all lines of the parsed code.
+    """
+    blocks: list[TopLevelBlock] = []
+    statements: list[ast.stmt] = []
+    block_start = start
+    last_line = 0
+    for statement in tree.body:
+        first_line = min(
+            [statement.lineno]
+            + [d.lineno for d in getattr(statement, "decorator_list", ())]
+        )
+        if statements and first_line > last_line:
+            blocks.append(_create_block(block_start, line_offset, statements))
+            block_start = first_line + line_offset
+            statements = []
+        statements.append(statement)
+        last_line = max(last_line, ensure_node_has_location(statement).end_lineno)
+    blocks.append(_create_block(block_start, line_offset, statements))
+    return blocks
+
+
+def _create_block(
+    start: int, line_offset: int, statements: list[ast.stmt]
+) -> TopLevelBlock:
+    """Creates a parsed top-level block from the given statements."""
+    return TopLevelBlock(start, line_offset, ast.Module(statements, type_ignores=[]))
+
+
+def _count_line_breaks(text: str) -> int:
+    """Returns the number of line breaks in the text, as counted by LSP."""
+    return len(LINE_BREAK_RE.findall(text))
 
 
 @AnalyzerFactory.register_analyzer("ast")
 class AstAnalyzer(BaseAnalyzer):
-    """Analyzer that uses `ast` for analyzing Python code."""
+    """Analyzer that uses `ast` for analyzing Python code.
+
+    The module is split into top-level blocks, so that after a change of the
+    document only the changed blocks are parsed again (see `with_changes`).
+    """
 
     NODE_ENTITY_MAP = {
         ast.FunctionDef: AstFunction,
         ast.AsyncFunctionDef: AstFunction,
         ast.ClassDef: AstClass,
-        ast.Module: AstModule,
     }
-    context_resolver_cls = ASTContextResolver
+    context_resolver_cls: type[IASTContextResolver] = ASTIntervalContextResolver
 
     def __init__(
         self,
@@ -454,31 +700,295 @@ class AstAnalyzer(BaseAnalyzer):
         super().__init__(*args, **kwargs)
         if context_resolver_cls is not None:
             self.context_resolver_cls = context_resolver_cls
-        self._tree = ast.parse(self._source_code)
+        self._blocks = self._parse_blocks()
+
+    def _parse_blocks(self) -> list[TopLevelBlock]:
+        """Parses the whole source code into top-level blocks."""
+        return _split_into_blocks(ast.parse(self._source_code))
+
+    def with_changes(
+        self, code: str, changes: Sequence[lsp.TextDocumentContentChangeEvent]
+    ) -> AstAnalyzer:
+        """Returns an analyzer of the changed code reusing the analysis of this one.
+
+        Only the blocks affected by the changes are marked for parsing, the blocks
+        after them are shifted. Parsing is postponed until the analyzer is queried,
+        so consecutive changes are cheap.
+        """
+        analyzer = copy.copy(self)
+        analyzer._source_code = code
+        analyzer._line_index = None
+        blocks = self._blocks.copy()
+        for change in changes:
+            if not isinstance(change, lsp.TextDocumentContentChangeEvent_Type1):
+                # The whole document has been replaced.
+                blocks = [TopLevelBlock(1, 0, None)]
+                continue
+            blocks = self._apply_change(blocks, change)
+        analyzer._blocks = blocks
+        return analyzer
+
+    @staticmethod
+    def _apply_change(
+        blocks: list[TopLevelBlock], change: lsp.TextDocumentContentChangeEvent_Type1
+    ) -> list[TopLevelBlock]:
+        """Marks the blocks affected by the change for parsing and shifts the rest."""
+        start_line = change.range.start.line + 1
+        end_line = change.range.end.line + 1
+        delta = _count_line_breaks(change.text) - (end_line - start_line)
+        starts = [block.start for block in blocks]
+        first = max(bisect.bisect_right(starts, start_line) - 1, 0)
+        last = max(bisect.bisect_right(starts, end_line) - 1, 0)
+        changed_block = TopLevelBlock(blocks[first].start, 0, None)
+        shifted_blocks = [
+            TopLevelBlock(b.start + delta, b.line_offset + delta, b.tree)
+            for b in blocks[last + 1 :]
+        ]
+        return [*blocks[:first], changed_block, *shifted_blocks]
+
+    def _ensure_parsed(self) -> None:
+        """Parses the changed blocks.
+
+        If a changed block cannot be parsed on its own (e.g. its statement continues
+        in the next block), the whole module is parsed again.
+        """
+        if all(block.tree is not None for block in self._blocks):
+            return
+        line_starts = self.line_index.line_starts
+        ends = [block.start - 1 for block in self._blocks[1:]] + [len(line_starts)]
+        blocks: list[TopLevelBlock] = []
+        try:
+            for block, end in zip(self._blocks, ends):
+                if block.tree is not None:
+                    blocks.append(block)
+                    continue
+                if block.start > end:
+                    # The block has been removed by the changes.
+                    continue
+                code = self._source_code[
+                    line_starts[block.start - 1] : (
+                        line_starts[end] if end < len(line_starts) else None
+                    )
+                ]
+                blocks.extend(
+                    _split_into_blocks(ast.parse(code), block.start, block.start - 1)
+                )
+        except SyntaxError:
+            blocks = self._parse_blocks()
+        self._blocks = blocks
+
+    def _find_block(self, cursor: IPosition) -> TopLevelBlock:
+        """Returns the top-level block containing the cursor."""
+        self._ensure_parsed()
+        starts = [block.start for block in self._blocks]
+        return self._blocks[max(bisect.bisect_right(starts, cursor.line) - 1, 0)]
+
+    def _create_resolver(
+        self, cursor: IPosition
+    ) -> tuple[IASTContextResolver, TopLevelBlock]:
+        """Creates a context resolver for the top-level block containing the cursor."""
+        block = self._find_block(cursor)
+        block_cursor = Position(cursor.line - block.line_offset, cursor.character)
+        return self.context_resolver_cls(block_cursor, cast(ast.AST, block.tree)), block
+
+    def _create_module(self) -> AstModule:
+        """Creates the module entity.
+
+        The module docstring can only be in the first block, which is never shifted.
+        """
+        self._ensure_parsed()
+        return AstModule(self.line_index, cast(ast.Module, self._blocks[0].tree))
 
     def get_context(self, cursor: IPosition) -> AstEntity | None:
         """Returns the code entity under the cursor."""
-        resolver = self.context_resolver_cls(cursor, self._tree)
+        resolver, block = self._create_resolver(cursor)
         context_node = resolver.get_current_context()
+        if isinstance(context_node, ast.Module):
+            return self._create_module()
         for node_type, entity_cls in self.NODE_ENTITY_MAP.items():
             if isinstance(context_node, node_type):
-                return entity_cls(self._source_code, context_node)
+                return entity_cls(self.line_index, context_node, block.line_offset)
         return None
 
     def get_function(self, cursor: IPosition) -> AstFunction | None:
         """Returns the function entity under the cursor."""
-        resolver = self.context_resolver_cls(cursor, self._tree)
+        resolver, block = self._create_resolver(cursor)
         node = resolver.find_function_node()
-        return AstFunction(self._source_code, node) if node else None
+        return AstFunction(self.line_index, node, block.line_offset) if node else None
 
     def get_class(self, cursor: IPosition) -> AstClass | None:
         """Returns the class entity under the cursor."""
-        resolver = self.context_resolver_cls(cursor, self._tree)
+        resolver, block = self._create_resolver(cursor)
         node = resolver.find_class_node()
-        return AstClass(self._source_code, node) if node else None
+        return AstClass(self.line_index, node, block.line_offset) if node else None
 
     def get_module(self, cursor: IPosition) -> AstModule | None:
         """Returns the module entity under the cursor."""
-        resolver = self.context_resolver_cls(cursor, self._tree)
-        node = resolver.find_module_node()
-        return AstModule(self._source_code, node) if node else None
+        resolver, _ = self._create_resolver(cursor)
+        return self._create_module() if resolver.find_module_node() else None
+
+    def iter_entities(self) -> Iterator[AstNamedEntity]:
+        """Yields all function and class entities in the order they appear in the code.
+
+        The code is traversed once, nested definitions follow their parents.
+        """
+        self._ensure_parsed()
+        return self._iter_block_entities(self._blocks)
+
+    def entities_in_range(self, range_: IRange) -> Iterator[AstNamedEntity]:
+        """Yields the function and class entities starting within the range lines.
+
+        Only the top-level blocks overlapping the range are traversed.
+        """
+        self._ensure_parsed()
+        starts = [block.start for block in self._blocks]
+        first = max(bisect.bisect_right(starts, range_.start.line) - 1, 0)
+        last = bisect.bisect_right(starts, range_.end.line)
+        for entity in self._iter_block_entities(self._blocks[first:last]):
+            if range_.start.line <= entity.code_range.start.line <= range_.end.line:
+                yield entity
+
+    def _iter_block_entities(
+        self, blocks: Iterable[TopLevelBlock]
+    ) -> Iterator[AstNamedEntity]:
+        """Yields the function and class entities of the given top-level blocks."""
+        for block in blocks:
+            for node in _iter_named_nodes(cast(ast.AST, block.tree)):
+                entity_cls = self.NODE_ENTITY_MAP[type(node)]
+                yield entity_cls(self.line_index, node, block.line_offset)
+
+
+@AnalyzerFactory.register_analyzer("ast-tolerant")
+class AstTolerantAnalyzer(AstAnalyzer):
+    """Analyzer that uses `ast` and tolerates syntax errors in the code.
+
+    The source code is split with the tokenizer into chunks at the top-level
+    class and function definitions, and each chunk is parsed on its own, so the
+    code is parsed once and a syntax error only affects its enclosing definition.
+    Lines breaking the tokenizer or a chunk (e.g. an unclosed triple quote) are
+    blanked out, and a chunk that still cannot be parsed is analyzed as
+    a module-level code without definitions.
+    """
+
+    MAX_RECOVERY_ATTEMPTS = 3
+
+    def _parse_blocks(self) -> list[TopLevelBlock]:
+        """Parses the source code into top-level blocks, recovering syntax errors."""
+        # Lines are split as by the parser, e.g. not at form feeds.
+        lines = self.line_index.lines(0, len(self.line_index), keepends=True)
+        blocks: list[TopLevelBlock] = []
+        for start, end in self._split_into_chunks(lines):
+            tree = self._parse_chunk(lines[start - 1 : end - 1])
+            blocks.extend(_split_into_blocks(tree, start, start - 1))
+        return blocks
+
+    def _split_into_chunks(self, lines: list[str]) -> list[tuple[int, int]]:
+        """Splits the lines at the top-level definitions found by the tokenizer.
+
+        Returns the first line and the line following each chunk. Lines breaking
+        the tokenizer are blanked out in place, so that the rest of the code
+        is tokenized.
+        """
+        starts, broken_line = _find_top_level_definitions(lines)
+        for _ in range(self.MAX_RECOVERY_ATTEMPTS):
+            if broken_line is None:
+                break
+            _blank_line(lines, broken_line)
+            starts, broken_line = _find_top_level_definitions(lines)
+        bounds = [1, *(start for start in starts if start > 1), len(lines) + 1]
+        return [
+            (start, end) for start, end in zip(bounds, bounds[1:]) if start < end
+        ] or [(1, 1)]
+
+    def _parse_chunk(self, lines: list[str]) -> ast.Module:
+        """Parses a chunk of code, blanking out the lines that break it."""
+        for _ in range(self.MAX_RECOVERY_ATTEMPTS):
+            try:
+                return ast.parse("".join(lines))
+            except SyntaxError as error:
+                broken_line = _find_broken_line(lines, error)
+                if broken_line is None:
+                    break
+                _blank_line(lines, broken_line)
+        return ast.Module([], type_ignores=[])
+
+
+# Keywords starting top-level definitions, with the decorator operator.
+DEFINITION_TOKENS = {"def", "class", "async", "@"}
+
+# The lines starting top-level class and function definitions or their decorators.
+TOP_LEVEL_DEFINITION_RE = re.compile(r"^(?:@|(?:async\s+)?def\s|class\s)", re.M)
+
+
+def _find_top_level_definitions(lines: list[str]) -> tuple[list[int], int | None]:
+    """Returns the first lines of the top-level class and function definitions.
+
+    Definitions are tokens at the start of a line, so the words in strings
+    and comments are ignored. Decorators are kept with the decorated definition.
+    A definition is also found within an unclosed bracket, since a statement
+    cannot contain it.
+
+    The 0-based index of the line breaking the tokenizer is returned too, or None
+    if there is none or it cannot be recovered. An unterminated string is often
+    paired with the quotes of the following code, so the first string containing
+    a top-level definition is blamed instead of the string reported.
+    """
+    starts: list[int] = []
+    suspect_line: int | None = None
+    after_decorator = False
+    try:
+        for token in tokenize.generate_tokens(iter(lines).__next__):
+            if token.type == tokenize.STRING:
+                if suspect_line is None and TOP_LEVEL_DEFINITION_RE.search(
+                    token.string
+                ):
+                    suspect_line = token.start[0]
+                continue
+            if token.start[1] != 0 or token.type not in (tokenize.NAME, tokenize.OP):
+                continue
+            if token.string in DEFINITION_TOKENS:
+                if not after_decorator:
+                    starts.append(token.start[0])
+                after_decorator = token.string == "@"
+            else:
+                after_decorator = False
+    except tokenize.TokenError as error:
+        message, (line, _) = error.args
+        if "string" not in message:
+            return starts, None
+        broken_line = suspect_line or line
+    except SyntaxError as error:
+        broken_line = error.lineno
+    else:
+        return starts, None
+    if broken_line is None or not 1 <= broken_line <= len(lines):
+        return starts, None
+    return starts, broken_line - 1
+
+
+def _blank_line(lines: list[str], index: int) -> None:
+    """Keeps only the line break of the line, so that the line numbers do not change."""
+    line = lines[index]
+    lines[index] = line[len(line.rstrip("\r\n")) :]
+
+
+def _find_broken_line(lines: list[str], error: SyntaxError) -> int | None:
+    """Returns the 0-based index of the line breaking the code, if it can be found.
+
+    The parser may report an error far from its cause (e.g. an unclosed
+    triple quote is reported at the end of the code), so the tokenizer
+    is used first to find an unterminated string.
+    """
+    line = error.lineno
+    try:
+        for _ in tokenize.generate_tokens(iter(lines).__next__):
+            pass
+    except tokenize.TokenError as token_error:
+        message, (token_line, _) = token_error.args
+        if "string" in message:
+            line = token_line
+    except SyntaxError:
+        pass
+    if line is None or not 1 <= line <= len(lines):
+        return None
+    return line - 1
@@ -1,14 +1,58 @@
 from __future__ import annotations
 
+import functools
 import re
 from abc import ABC, abstractmethod
-from typing import Literal, NamedTuple, Protocol, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterator,
+    Literal,
+    NamedTuple,
+    Protocol,
+    Sequence,
+    TypeVar,
+)
 
 import lsprotocol.types as lsp
 
-from ..code_cleaners import CodeCleaner, ModuleCleaner, NamedEntitiesCleaner
+from ..code_cleaners import (
+    ClassSummaryCleaner,
+    CodeCleaner,
+    ModuleCleaner,
+    NamedEntitiesCleaner,
+)
+from .fingerprint import get_fingerprint
+from .line_index import LineIndex
 
 TCodeEntity = TypeVar("TCodeEntity", bound="CodeEntity")
+T = TypeVar("T")
+
+_UNSET: Any = object()
+
+
+class memoized_property(property, Generic[T]):
+    """Turns a method into a property computed only once per instance.
+
+    The value is stored in the `_<method name>` attribute, which classes
+    with `__slots__` must declare. Unlike `functools.cached_property`,
+    it does not require an instance `__dict__`, and it is still a property,
+    so it can override the properties declared by the base classes.
+    """
+
+    def __init__(self, method: Callable[[Any], T]) -> None:
+        attr = f"_{method.__name__}"
+
+        @functools.wraps(method)
+        def getter(instance: Any) -> T:
+            value = getattr(instance, attr, _UNSET)
+            if value is _UNSET:
+                value = method(instance)
+                setattr(instance, attr, value)
+            return value
+
+        super().__init__(getter)
 
 
 class IPosition(Protocol):
@@ -100,10 +144,34 @@ class DocumentRange(Range):
 
 
 class BaseAnalyzer(ABC):
-    """Base class for analyzing Python code."""
+    """Base class for analyzing Python code.
 
-    def __init__(self, code: str) -> None:
+    Attributes:
+        _source_code: The source code to analyze.
+        _path: The path of the file containing the source code, if any.
+        _line_index: The line index of the source code, built on first use.
+    """
+
+    def __init__(self, code: str, path: str | None = None) -> None:
         self._source_code = code
+        self._path = path
+        self._line_index: LineIndex | None = None
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Returns the line index of the source code shared by its code entities."""
+        if self._line_index is None:
+            self._line_index = LineIndex(self._source_code)
+        return self._line_index
+
+    def with_changes(
+        self, code: str, changes: Sequence[lsp.TextDocumentContentChangeEvent]
+    ) -> BaseAnalyzer | None:
+        """Returns an analyzer of the changed code reusing the analysis of this one.
+
+        Returns None if the analyzer does not support incremental analysis.
+        """
+        return None
 
     @abstractmethod
     def get_context(self, cursor: IPosition) -> CodeEntity:
@@ -121,9 +189,29 @@ class BaseAnalyzer(ABC):
     def get_module(self, cursor: IPosition) -> BaseModule:
         """Returns the module entity under the cursor."""
 
+    @abstractmethod
+    def iter_entities(self) -> Iterator[NamedCodeEntity]:
+        """Yields all function and class entities in the order they appear in the code.
+
+        The code is traversed once, nested definitions follow their parents.
+        """
+
+    def entities_in_range(self, range_: IRange) -> Iterator[NamedCodeEntity]:
+        """Yields the function and class entities starting within the range lines."""
+        for entity in self.iter_entities():
+            if range_.start.line <= entity.code_range.start.line <= range_.end.line:
+                yield entity
+
 
 class CodeEntity(ABC):
-    """A base class representing either a function, class, or module of a source code."""
+    """A base class representing either a function, class, or module of a source code.
+
+    Code entities are immutable snapshots of the analyzed source code, so their
+    properties may be memoized (see `memoized_property`). Base classes declare
+    empty `__slots__`, leaving the storage to the analyzer-specific entities.
+    """
+
+    __slots__ = ()
 
     entity_name: Literal["module", "class", "function"]
     default_cleaner: CodeCleaner = CodeCleaner()
@@ -143,6 +231,11 @@ class CodeEntity(ABC):
     def docstring_range(self) -> IRange | None:
         """Returns the start and end positions of the code entity's docstring in code."""
 
+    @property
+    def has_docstring(self) -> bool:
+        """Returns True if the code entity has a docstring."""
+        return self.docstring_range is not None
+
     @abstractmethod
     def to_relative_position(self, position: IPosition) -> IPosition:
         """Converts an absolute position to a relative position within the code entity.
@@ -160,6 +253,8 @@ class CodeEntity(ABC):
 class NamedCodeEntity(CodeEntity):
     """A base class representing either a function or a class of a source code."""
 
+    __slots__ = ()
+
     default_cleaner = NamedEntitiesCleaner()
 
     @property
@@ -177,6 +272,16 @@ class NamedCodeEntity(CodeEntity):
     def signature_end(self) -> DocumentPosition:
         """Returns the end position of the code entity signature in the source code."""
 
+    @memoized_property
+    def fingerprint(self) -> str:
+        """Returns a hash of the structure of the code entity.
+
+        Unlike the code, the hash does not change after reformatting, editing
+        comments or the docstring, or moving the code entity to another
+        indentation level, so it can be used as a cache key.
+        """
+        return get_fingerprint(self.code)
+
     @property
     def indent_level(self) -> int:
         """Returns the indentation level of the source code."""
@@ -197,18 +302,30 @@ class NamedCodeEntity(CodeEntity):
 class BaseFunction(NamedCodeEntity):
     """Represents a function of a source code.."""
 
+    __slots__ = ()
+
     entity_name = "function"
 
 
 class BaseClass(NamedCodeEntity):
     """Represents a class of a source code."""
 
+    __slots__ = ()
+
     entity_name = "class"
+    default_cleaner = ClassSummaryCleaner()
+
+    @property
+    @abstractmethod
+    def methods(self) -> Sequence[BaseFunction]:
+        """Returns the methods defined in the class body, in the order they appear."""
 
 
 class BaseModule(CodeEntity):
     """Represents a module of a source code."""
 
+    __slots__ = ()
+
     entity_name = "module"
     default_cleaner = ModuleCleaner()
 
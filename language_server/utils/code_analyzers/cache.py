@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Sequence
+
+import lsprotocol.types as lsp
+from pygls.workspace import TextDocument
+
+from .base import BaseAnalyzer
+from .factory import AnalyzerFactory
+
+AnalyzerKey = tuple[str, int, str]
+
+
+class AnalyzerCache:
+    """A bounded LRU cache of analyzers.
+
+    Analyzers are keyed by the document URI, the document version and the analyzer
+    name, so the source code of an unchanged document is analyzed only once.
+    Only the latest version of a document is kept for each analyzer.
+
+    The cache is shared by the event loop and the analysis executor, so access
+    to the cached analyzers is serialized by a lock. Analyzers are created
+    outside the lock, so the event loop never waits for the analysis.
+
+    Attributes:
+        _maxsize: The maximum number of analyzers kept in the cache.
+        _analyzers: The cached analyzers, ordered from least to most recently used.
+        _lock: The lock guarding the cached analyzers.
+    """
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self._maxsize = maxsize
+        self._analyzers: OrderedDict[AnalyzerKey, BaseAnalyzer] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._analyzers)
+
+    def get_analyzer(self, name: str, document: TextDocument) -> BaseAnalyzer:
+        """Returns the analyzer for the given document, creating it if necessary.
+
+        Documents without a version (e.g. files that are not opened in the editor)
+        are never cached, because their content may change without notice.
+        """
+        path = document.path if document.uri.startswith("file:") else None
+        if document.version is None:
+            return AnalyzerFactory.create_analyzer(name, document.source, path)
+
+        key = (document.uri, document.version, name)
+        with self._lock:
+            if analyzer := self._analyzers.get(key):
+                self._analyzers.move_to_end(key)
+                return analyzer
+
+        analyzer = AnalyzerFactory.create_analyzer(name, document.source, path)
+        with self._lock:
+            if not self._is_outdated(key):
+                self._discard_outdated(key)
+                self._analyzers[key] = analyzer
+                if len(self._analyzers) > self._maxsize:
+                    self._analyzers.popitem(last=False)
+        return analyzer
+
+    def update(
+        self,
+        document: TextDocument,
+        changes: Sequence[lsp.TextDocumentContentChangeEvent],
+    ) -> None:
+        """Moves the analyzers of the document to its new version.
+
+        Analyzers that support incremental analysis reuse the analysis
+        of the previous version, other analyzers are removed from the cache.
+        """
+        with self._lock:
+            for key in [key for key in self._analyzers if key[0] == document.uri]:
+                analyzer = self._analyzers.pop(key)
+                if document.version is None:
+                    continue
+                updated = analyzer.with_changes(document.source, changes)
+                if updated is not None:
+                    self._analyzers[(document.uri, document.version, key[2])] = updated
+
+    def invalidate(self, uri: str) -> None:
+        """Removes all analyzers of the given document from the cache."""
+        with self._lock:
+            for key in [key for key in self._analyzers if key[0] == uri]:
+                del self._analyzers[key]
+
+    def clear(self) -> None:
+        """Removes all analyzers from the cache."""
+        with self._lock:
+            self._analyzers.clear()
+
+    def _is_outdated(self, key: AnalyzerKey) -> bool:
+        """Checks if a newer version of the same document is already cached."""
+        uri, version, name = key
+        return any(
+            k[0] == uri and k[2] == name and k[1] > version for k in self._analyzers
+        )
+
+    def _discard_outdated(self, key: AnalyzerKey) -> None:
+        """Removes analyzers of older versions of the same document."""
+        uri, _, name = key
+        for cached_key in [k for k in self._analyzers if k[0] == uri and k[2] == name]:
+            del self._analyzers[cached_key]
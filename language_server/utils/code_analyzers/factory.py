@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from typing import Callable
 
 from .base import BaseAnalyzer
@@ -18,11 +20,13 @@ class AnalyzerFactory:
         return list(cls._analyzers.keys())
 
     @classmethod
-    def create_analyzer(cls, name: str, source_code: str) -> BaseAnalyzer:
+    def create_analyzer(
+        cls, name: str, source_code: str, path: str | None = None
+    ) -> BaseAnalyzer:
         """Returns an analyzer instance based on the given name and source code."""
         if not (analyzer := cls._analyzers.get(name)):
             raise UnsupportedAnalyzer(f'"{name}" analyzer is not supported.')
-        return analyzer(source_code)
+        return analyzer(source_code, path)
 
     @classmethod
     def register_analyzer(cls, name: str) -> Callable:
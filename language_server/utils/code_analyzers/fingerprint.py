@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import ast
+import contextlib
+import hashlib
+import textwrap
+import tokenize
+from io import StringIO
+
+# Tokens that do not change the meaning of the code.
+IGNORED_TOKENS = {
+    tokenize.COMMENT,
+    tokenize.NL,
+    tokenize.NEWLINE,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENDMARKER,
+}
+
+
+def get_fingerprint(code: str) -> str:
+    """Returns a hash of the structure of a class or function definition.
+
+    The hash is computed from the syntax tree of the code, so it does not
+    depend on the formatting, the comments, the indentation level and
+    the docstring of the definition. If the code cannot be parsed, the hash
+    is computed from its tokens, ignoring comments and whitespace.
+    """
+    code = textwrap.dedent(code)
+    try:
+        normalized = _dump_tree(ast.parse(code))
+    except SyntaxError:
+        normalized = _dump_tokens(code)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _dump_tree(tree: ast.Module) -> str:
+    """Returns the tree without positions, with the docstring removed."""
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if (
+                body
+                and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)
+            ):
+                node.body = body[1:]
+    return ast.dump(tree, include_attributes=False)
+
+
+def _dump_tokens(code: str) -> str:
+    """Returns the tokens of the code separated by spaces, ignoring comments.
+
+    The tokens found before a tokenization error are returned.
+    """
+    tokens = []
+    with contextlib.suppress(tokenize.TokenError, SyntaxError):
+        for token in tokenize.generate_tokens(StringIO(code).readline):
+            if token.type not in IGNORED_TOKENS:
+                tokens.append(token.string)
+    return " ".join(tokens)
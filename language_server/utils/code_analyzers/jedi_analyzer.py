@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Literal
+from typing import Iterator, Literal
 
 import jedi
 from jedi.api.classes import Name as JediName
+from parso.python.tree import ClassOrFunc, Scope
+from parso.tree import BaseNode
 
 from .base import (
     BaseAnalyzer,
@@ -16,29 +18,70 @@ from .base import (
     IPosition,
     NamedCodeEntity,
     TCodeEntity,
+    memoized_property,
 )
 from .factory import AnalyzerFactory
+from .line_index import LineIndex
+
+# Parso nodes that can contain function and class definitions.
+DEFINITION_CONTAINERS = {
+    "file_input",
+    "suite",
+    "classdef",
+    "funcdef",
+    "decorated",
+    "async_stmt",
+    "async_funcdef",
+    "if_stmt",
+    "for_stmt",
+    "while_stmt",
+    "try_stmt",
+    "with_stmt",
+    "match_stmt",
+    "case_block",
+}
+
+
+def _iter_definition_nodes(node: BaseNode) -> Iterator[ClassOrFunc]:
+    """Yields function and class definitions in the order they appear in the code.
+
+    Only statements are traversed, since definitions cannot be part of expressions.
+    """
+    for child in node.children:
+        if isinstance(child, ClassOrFunc):
+            yield child
+        if child.type in DEFINITION_CONTAINERS:
+            yield from _iter_definition_nodes(child)
 
 
 class JediEntity(CodeEntity):
-    """Represents a code entity of a source code analyzed with Jedi."""
+    """Represents a code entity of a source code analyzed with Jedi.
 
-    def __init__(self, source_code: str, context: JediName) -> None:
-        self._document_source_code = source_code
-        self._context = context
-        self._tree_node = context._name._value.tree_node
+    The entity is created from a parso tree node, the source code is referenced
+    through the shared line index. The properties are computed on first access.
+    """
+
+    __slots__ = ("_line_index", "_tree_node", "_code_lines", "_docstring_range")
+
+    def __init__(self, line_index: LineIndex, tree_node: Scope) -> None:
+        self._line_index = line_index
+        self._tree_node = tree_node
 
     @property
     def code(self) -> str:
         """Returns the source code of the code entity as a string."""
         return "\n".join(self.code_lines)
 
-    @property
+    @memoized_property
     def code_lines(self) -> list[str]:
         """Returns the source code of the code entity split into lines."""
-        return self._document_source_code.splitlines()
+        line_count = len(self._line_index)
+        # The empty line after the last line break is not a line of the code.
+        if not self._line_index.line(line_count - 1):
+            line_count -= 1
+        return self._line_index.lines(0, line_count)
 
-    @property
+    @memoized_property
     def docstring_range(self) -> DocumentRange | None:
         """Returns the start and end positions of the code entity docstring in code."""
         if doc_node := self._tree_node.get_doc_node():
@@ -53,61 +96,104 @@ class JediEntity(CodeEntity):
 class JediNamedCodeEntity(JediEntity, NamedCodeEntity):
     """Represents either a function or a class of a source code analyzed with Jedi."""
 
+    __slots__ = ("_code", "_code_range", "_signature_end", "_fingerprint")
+
+    _tree_node: ClassOrFunc
+
     @property
     def name(self) -> str:
         """Returns the code entity name."""
         return self._tree_node.name.value
 
-    @property
+    @memoized_property
+    def code(self) -> str:
+        """Returns the source code of the code entity as a string."""
+        return "\n".join(self.code_lines)
+
+    @memoized_property
     def signature_end(self) -> DocumentPosition:
         """Returns the end position of the code entity signature in the source code."""
         return DocumentPosition(*self._tree_node.get_suite().start_pos)
 
-    @property
+    @memoized_property
     def code_lines(self) -> list[str]:
         """Returns the source code of the code entity split into lines."""
-        source_lines = super().code_lines
-        return source_lines[self.code_range.start.line - 1 : self.code_range.end.line]
+        code_range = self.code_range
+        return self._line_index.lines(code_range.start.line - 1, code_range.end.line)
 
-    @property
+    @memoized_property
     def code_range(self) -> DocumentRange:
-        """Returns the start and end positions of the code entity in the source code."""
+        """Returns the start and end positions of the code entity in the source code.
+
+        The range is the same as the definition range of the Jedi name,
+        i.e. it does not include the trailing line break.
+        """
+        last_leaf = self._tree_node.get_last_leaf()
+        if last_leaf.type == "newline":
+            last_leaf = last_leaf.get_previous_leaf()
         return DocumentRange(
-            DocumentPosition(*self._context.get_definition_start_position()),
-            DocumentPosition(*self._context.get_definition_end_position()),
+            DocumentPosition(*self._tree_node.start_pos),
+            DocumentPosition(*last_leaf.end_pos),
         )
 
 
 class JediFunction(JediNamedCodeEntity, BaseFunction):
     """Represents a function of a source code analyzed with Jedi."""
 
+    __slots__ = ()
+
 
 class JediClass(JediNamedCodeEntity, BaseClass):
     """Represents a class of a source code analyzed with Jedi."""
 
+    __slots__ = ("_methods",)
+
+    @memoized_property
+    def methods(self) -> list[JediFunction]:
+        """Returns the methods defined in the class body, in the order they appear."""
+        return [
+            JediFunction(self._line_index, node)
+            for node in self._tree_node.iter_funcdefs()
+        ]
+
 
 class JediModule(JediEntity, BaseModule):
     """Represents a module of a source code analyzed with Jedi."""
 
+    __slots__ = ()
+
 
 @AnalyzerFactory.register_analyzer("jedi")
 class JediAnalyzer(BaseAnalyzer):
-    """Analyzer that uses Jedi for analyzing Python code."""
+    """Analyzer that uses Jedi for analyzing Python code.
+
+    The environment is shared by all analyzers. If the path of the source code
+    is known, parso caches the syntax tree of the file, and the next version of
+    the file is parsed incrementally by the parso diff parser.
+    """
 
     ENTITY_MAP = {"function": JediFunction, "class": JediClass, "module": JediModule}
+    _environment: jedi.InterpreterEnvironment | None = None
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self._script = jedi.Script(
-            self._source_code, environment=jedi.InterpreterEnvironment()
+            self._source_code, path=self._path, environment=self.get_environment()
         )
 
+    @classmethod
+    def get_environment(cls) -> jedi.InterpreterEnvironment:
+        """Returns the Jedi environment shared by all analyzers."""
+        if cls._environment is None:
+            cls._environment = jedi.InterpreterEnvironment()
+        return cls._environment
+
     def get_context(self, cursor: IPosition) -> JediEntity | None:
         """Returns the code entity under the cursor."""
         context = self._script.get_context(cursor.line, cursor.character)
         if context and context.type in self.ENTITY_MAP:
             entity_cls = self.ENTITY_MAP[context.type]
-            return entity_cls(self._source_code, context)
+            return entity_cls(self.line_index, _get_tree_node(context))
         return None
 
     def get_function(self, cursor: IPosition) -> JediFunction | None:
@@ -133,7 +219,22 @@ class JediAnalyzer(BaseAnalyzer):
 
         while context:
             if context.type == entity_type:
-                return entity_class(self._source_code, context)
+                return entity_class(self.line_index, _get_tree_node(context))
             context = context.parent()
 
         return None
+
+    def iter_entities(self) -> Iterator[JediNamedCodeEntity]:
+        """Yields all function and class entities in the order they appear in the code.
+
+        The syntax tree is traversed once, without inferring Jedi names.
+        """
+        module_node = self._script._module_node
+        for node in _iter_definition_nodes(module_node):
+            entity_cls = JediFunction if node.type == "funcdef" else JediClass
+            yield entity_cls(self.line_index, node)
+
+
+def _get_tree_node(context: JediName) -> Scope:
+    """Returns the parso tree node of the definition of the Jedi name."""
+    return context._name._value.tree_node
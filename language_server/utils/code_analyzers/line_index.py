@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import bisect
+import re
+
+# Line breaks recognized by both the Python parser and LSP.
+LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+
+class LineIndex:
+    """The offsets of the line starts in a source code.
+
+    The index is built once per source code (i.e. per document version) and shared
+    by everything that slices the source code, so extracting a part of the source
+    code costs time proportional to the part, not to the whole source code.
+
+    Lines are split at the line breaks recognized by the Python parser and LSP,
+    so e.g. form feeds do not break lines. Lines are 0-based, columns are either
+    character offsets or UTF-8 byte offsets (as used by `ast` nodes).
+
+    Attributes:
+        source: The indexed source code.
+        line_starts: The offsets of the line starts in the source code.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.line_starts = [0] + [m.end() for m in LINE_BREAK_RE.finditer(source)]
+        self._is_ascii = source.isascii()
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def line_of(self, offset: int) -> int:
+        """Returns the line containing the given offset."""
+        return bisect.bisect_right(self.line_starts, offset) - 1
+
+    def line_end(self, line: int, keepends: bool = False) -> int:
+        """Returns the offset of the end of the line."""
+        if line + 1 >= len(self.line_starts):
+            return len(self.source)
+        end = self.line_starts[line + 1]
+        if not keepends:
+            end -= 2 if self.source.startswith("\r\n", end - 2) else 1
+        return end
+
+    def line(self, line: int, keepends: bool = False) -> str:
+        """Returns the line of the source code."""
+        return self.source[self.line_starts[line] : self.line_end(line, keepends)]
+
+    def lines(self, start: int, end: int, keepends: bool = False) -> list[str]:
+        """Returns the lines of the source code from `start` up to `end`."""
+        return [self.line(line, keepends) for line in range(start, end)]
+
+    def offset(self, line: int, column: int, utf8: bool = False) -> int:
+        """Returns the offset of the position in the source code.
+
+        Args:
+            line: The line of the position.
+            column: The column of the position, clipped to the line end.
+            utf8: If True, the column is a UTF-8 byte offset, otherwise
+                a character offset.
+        """
+        start = self.line_starts[line]
+        end = self.line_end(line, keepends=True)
+        if not utf8 or self._is_ascii:
+            return min(start + column, end)
+        # Count the bytes of the characters instead of encoding the line.
+        offset, size = start, 0
+        while offset < end:
+            code_point = ord(self.source[offset])
+            if code_point < 0x80:
+                size += 1
+            elif code_point < 0x800:
+                size += 2
+            elif code_point < 0x10000:
+                size += 3
+            else:
+                size += 4
+            if size > column:
+                break
+            offset += 1
+        return offset
+
+    def segment(
+        self,
+        start_line: int,
+        start_column: int,
+        end_line: int,
+        end_column: int,
+        utf8: bool = False,
+    ) -> str:
+        """Returns the source code between the given positions."""
+        return self.source[
+            self.offset(start_line, start_column, utf8) : self.offset(
+                end_line, end_column, utf8
+            )
+        ]
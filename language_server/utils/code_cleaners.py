@@ -1,27 +1,35 @@
 from __future__ import annotations
 
-from typing import Callable, Iterable
+from typing import Callable, Generic, Iterable, TypeVar
 
 from .code_analyzers import base
 
+# The type of the code entities cleaned by a cleaner.
+TEntity = TypeVar("TEntity", bound="base.CodeEntity")
+TNamedEntity = TypeVar("TNamedEntity", bound="base.NamedCodeEntity")
 
-class CodeCleaner:
+
+class CodeCleaner(Generic[TEntity]):
     """A class responsible for cleaning code by applying various cleaning methods.
 
     This class provides functionality to clean source code by removing docstrings,
-    comments, blank lines, etc.
+    comments, blank lines, etc. Subclasses narrow the type of the code entities
+    they clean with the type parameter.
 
     Attributes:
         _code_entity: The code entity (class, function, or module) to clean.
         _cleaned_code_lines: A list of the cleaned source code lines.
     """
 
-    _code_entity: "base.CodeEntity"
+    _code_entity: TEntity
     _cleaned_code_lines: list[str]
 
-    def clean(
-        self, code_entity: "base.CodeEntity", *, skip: Iterable[str] | None = None
-    ) -> str:
+    # Cleaning methods that locate the lines by their position in the code entity,
+    # from the bottom to the top. They are applied before the other methods,
+    # which change the line positions.
+    positional_cleaning_methods: tuple[str, ...] = ("docstring",)
+
+    def clean(self, code_entity: TEntity, *, skip: Iterable[str] | None = None) -> str:
         """Applies all cleaning methods to the code, except the ones specified in `skip`.
 
         Args:
@@ -41,7 +49,14 @@ class CodeCleaner:
                 )
             available_cleaners -= set(skip)
 
-        for cleaner in available_cleaners:
+        positional_cleaners = [
+            cleaner
+            for cleaner in self.positional_cleaning_methods
+            if cleaner in available_cleaners
+        ]
+        for cleaner in positional_cleaners + sorted(
+            available_cleaners - set(positional_cleaners)
+        ):
             self.supported_cleaning_methods[cleaner]()
 
         return "\n".join(self._cleaned_code_lines)
@@ -83,14 +98,12 @@ class CodeCleaner:
         ]
 
 
-class NamedEntitiesCleaner(CodeCleaner):
+class NamedEntitiesCleaner(CodeCleaner[TNamedEntity]):
     """A class for cleaning code specific to class and function entities.
 
     Adds functionality for removing indentation.
     """
 
-    _code_entity: "base.NamedCodeEntity"
-
     def _remove_indentation(self) -> None:
         """Removes indentation from the source code."""
         indent_level = self._code_entity.indent_level
@@ -100,7 +113,31 @@ class NamedEntitiesCleaner(CodeCleaner):
             ]
 
 
-class ModuleCleaner(CodeCleaner):
-    """A class for cleaning module-level code."""
+class ClassSummaryCleaner(NamedEntitiesCleaner["base.BaseClass"]):
+    """A class for cleaning the code of classes down to a summary.
+
+    Adds functionality for removing the bodies of the methods, so that only
+    the class header, the class attributes, the method signatures and
+    the method docstrings are left.
+    """
 
-    _code_entity: "base.BaseModule"
+    positional_cleaning_methods = ("method_bodies", "docstring")
+
+    def _remove_method_bodies(self) -> None:
+        """Replaces the bodies of the methods with `...`, keeping their docstrings."""
+        to_relative_line = self._code_entity.to_relative_position
+        for method in reversed(self._code_entity.methods):
+            body_start = to_relative_line(method.signature_end).line + 1
+            body_end = to_relative_line(method.code_range.end).line
+            if body_start > body_end:
+                continue
+            body = [f"{' ' * 4 * (method.indent_level + 1)}..."]
+            if docstring_range := method.docstring_range:
+                docstring_start = to_relative_line(docstring_range.start).line
+                docstring_end = to_relative_line(docstring_range.end).line
+                body[:0] = self._cleaned_code_lines[docstring_start : docstring_end + 1]
+            self._cleaned_code_lines[body_start : body_end + 1] = body
+
+
+class ModuleCleaner(CodeCleaner["base.BaseModule"]):
+    """A class for cleaning module-level code."""
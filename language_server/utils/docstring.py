@@ -1,42 +1,56 @@
 from __future__ import annotations
 
+import json
 import re
+from typing import AsyncGenerator, Callable, Sequence
 
 from openai import AsyncOpenAI, OpenAIError
 
-from . import create_httpx_client, stub_for_tests
-from .proxy import Proxy
+from . import stub_for_tests
+
+SYSTEM_MESSAGE = (
+    "When you generate a docstring, just give me the string without the code."
+)
+
+PACKED_SYSTEM_MESSAGE = (
+    "You will be given several numbered requests for docstrings. "
+    "Respond only with a JSON object mapping each request number "
+    "to the requested docstring, without the code and without triple quotes."
+)
+
+# A docstring enclosed in triple quotes, as extracted by `parse_docstring`.
+QUOTED_DOCSTRING_RE = re.compile('"""(.+?)"""', re.DOTALL)
+
+# A JSON object in the response to a packed prompt, possibly in a code block.
+JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class PackedResponseError(ValueError):
+    """Raised when a response cannot be split into the responses to each prompt."""
 
 
 @stub_for_tests(return_value='"""docstring"""')
 async def generate_docstring(
     *,
-    api_key: str,
+    client: AsyncOpenAI,
     model: str,
     prompt: str,
-    base_url: str | None = None,
-    proxy: Proxy | None = None,
+    on_usage: Callable[[int], None] | None = None,
+    system_message: str = SYSTEM_MESSAGE,
 ) -> str:
-    """Generates a docstring using the OpenAI API."""
-    client = AsyncOpenAI(
-        api_key=api_key,
-        base_url=base_url,
-        http_client=create_httpx_client(proxy),
-    )
-
-    system_message = (
-        "When you generate a docstring, just give me the string without the code."
-    )
-    messages = [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": prompt},
-    ]
+    """Generates a docstring using the OpenAI API.
 
+    The client is expected to be taken from `utils.client_pool.ClientPool`,
+    so that its connections are reused by the following requests.
+    If provided, `on_usage` is called with the number of tokens used.
+    """
     response = await client.chat.completions.create(
         model=model,
-        messages=messages,  # type: ignore
+        messages=_create_messages(prompt, system_message),  # type: ignore
         temperature=0,
     )
+    if on_usage and (usage := getattr(response, "usage", None)):
+        on_usage(usage.total_tokens)
 
     if response.choices and (docstring := response.choices[0].message.content):
         return docstring
@@ -46,10 +60,91 @@ async def generate_docstring(
         raise OpenAIError("Invalid response from API.")
 
 
+@stub_for_tests(return_value='"""docstring"""')
+async def stream_docstring(
+    *, client: AsyncOpenAI, model: str, prompt: str
+) -> AsyncGenerator[str, None]:
+    """Generates a docstring using the OpenAI API, yielding the response as it grows.
+
+    Each yielded value is the whole response received so far. The stream is closed
+    as soon as the response contains a docstring enclosed in triple quotes,
+    so the tokens following it are not generated.
+    """
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=_create_messages(prompt),  # type: ignore
+        temperature=0,
+        stream=True,
+    )
+    response = ""
+    async with stream:
+        async for chunk in stream:
+            if not (chunk.choices and (content := chunk.choices[0].delta.content)):
+                continue
+            response += content
+            yield response
+            if is_docstring_complete(response):
+                break
+    if not response:
+        raise OpenAIError("Invalid response from API.")
+
+
+def is_docstring_complete(response: str) -> bool:
+    """Checks if the response contains a docstring enclosed in triple quotes."""
+    return QUOTED_DOCSTRING_RE.search(response) is not None
+
+
+def _create_messages(
+    prompt: str, system_message: str = SYSTEM_MESSAGE
+) -> list[dict[str, str]]:
+    """Creates the chat messages requesting a docstring."""
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def pack_prompts(prompts: Sequence[str]) -> str:
+    """Combines the prompts for several docstrings into one numbered prompt.
+
+    The prompt is to be sent with `PACKED_SYSTEM_MESSAGE`, and the response
+    split by `unpack_response`.
+    """
+    return "\n\n".join(
+        f"### Request {number}\n{prompt}" for number, prompt in enumerate(prompts, 1)
+    )
+
+
+def unpack_response(response: str, count: int) -> list[str]:
+    """Splits the response to a packed prompt into the responses to each prompt.
+
+    Raises:
+        PackedResponseError: If the response does not contain a docstring
+            for each of the `count` prompts.
+    """
+    match = JSON_OBJECT_RE.search(response)
+    if not match:
+        raise PackedResponseError("no JSON object in the response")
+    try:
+        docstrings = json.loads(match.group(0))
+    except ValueError as e:
+        raise PackedResponseError(f"invalid JSON in the response: {e}") from e
+    if not isinstance(docstrings, dict):
+        raise PackedResponseError("no JSON object in the response")
+
+    responses = []
+    for number in range(1, count + 1):
+        docstring = docstrings.get(str(number))
+        if not isinstance(docstring, str) or not parse_docstring(docstring):
+            raise PackedResponseError(f"no docstring for the request {number}")
+        responses.append(docstring)
+    return responses
+
+
 def parse_docstring(docstring: str) -> str:
     """Extract and clean a docstring by removing quotes, blank lines, and indentation."""
     # Extract docstring from triple quotes
-    match = re.search('"""(.+?)"""', docstring, re.DOTALL)
+    match = QUOTED_DOCSTRING_RE.search(docstring)
     docstring = match.group(1) if match else docstring
 
     # Remove leading/trailing quotes and blank lines
@@ -58,7 +153,7 @@ def parse_docstring(docstring: str) -> str:
 
     # Remove indentation
     lines = docstring.splitlines(True)
-    indent = len(lines[0]) - len(lines[0].lstrip(" "))
+    indent = len(lines[0]) - len(lines[0].lstrip(" ")) if lines else 0
     if indent:
         lines = [
             line[indent:] if line.startswith(" " * indent) else line for line in lines
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class DocstringCache:
+    """A content-addressed cache of AI responses with generated docstrings.
+
+    Responses are keyed by a hash of everything the response depends on
+    (see `make_key`), so the same code is documented only once, no matter
+    which document or version it comes from. The cache has two tiers:
+    a bounded LRU cache in memory and an optional SQLite database on disk,
+    which is kept across restarts of the server. The least recently used
+    responses are evicted from the database when it exceeds its size.
+
+    Attributes:
+        _maxsize: The maximum number of responses kept in memory.
+        _max_disk_size: The maximum total size of the responses kept on disk.
+        _responses: The responses kept in memory, from least to most recently used.
+        _connection: The connection to the database, or None if not persisted.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        maxsize: int = 256,
+        max_disk_size: int = 10 * 1024 * 1024,
+    ) -> None:
+        self._maxsize = maxsize
+        self._max_disk_size = max_disk_size
+        self._responses: OrderedDict[str, str] = OrderedDict()
+        self._connection: sqlite3.Connection | None = None
+        if path is not None:
+            self._connection = self._connect(path)
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    @staticmethod
+    def make_key(
+        *,
+        fingerprint: str,
+        model: str,
+        docstring_style: str,
+        prompt_pattern: str,
+        base_url: str | None,
+        summarize_classes: bool,
+        token_budget: int,
+    ) -> str:
+        """Returns the key of the response for a code entity.
+
+        The code entity is identified by its fingerprint, so the response
+        is reused after cosmetic edits of the code. The settings changing
+        the code sent in the prompt are part of the key.
+        """
+        data = json.dumps(
+            [
+                fingerprint,
+                model,
+                docstring_style,
+                prompt_pattern,
+                base_url,
+                summarize_classes,
+                token_budget,
+            ]
+        )
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response, or None if it is not cached."""
+        if (response := self._responses.get(key)) is not None:
+            self._responses.move_to_end(key)
+            return response
+        if (response := self._load(key)) is not None:
+            self._remember(key, response)
+        return response
+
+    def set(self, key: str, response: str) -> None:  # noqa: A003
+        """Caches the response in memory and on disk."""
+        self._remember(key, response)
+        self._store(key, response)
+
+    def close(self) -> None:
+        """Closes the database; the responses in memory are still available."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _remember(self, key: str, response: str) -> None:
+        """Caches the response in memory, evicting the least recently used one."""
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        if len(self._responses) > self._maxsize:
+            self._responses.popitem(last=False)
+
+    def _connect(self, path: str) -> sqlite3.Connection | None:
+        """Opens the database, creating it if necessary.
+
+        Returns None if the database cannot be opened, so that the cache
+        still works in memory.
+        """
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            connection = sqlite3.connect(path, isolation_level=None)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_used REAL)"
+            )
+        except (OSError, sqlite3.Error):
+            return None
+        return connection
+
+    def _load(self, key: str) -> str | None:
+        """Returns the response stored on disk, or None if it is not stored."""
+        if self._connection is None:
+            return None
+        with contextlib.suppress(sqlite3.Error):
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                return row[0]
+        return None
+
+    def _store(self, key: str, response: str) -> None:
+        """Stores the response on disk, evicting the least recently used ones."""
+        if self._connection is None:
+            return
+        with contextlib.suppress(sqlite3.Error):
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, len(response.encode()), time.time()),
+            )
+            self._evict(self._connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Removes the least recently used responses exceeding the disk size."""
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self._max_disk_size:
+            return
+        evicted = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        ).fetchall():
+            if total <= self._max_disk_size:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import ast
+import json
+import textwrap
+from typing import NamedTuple
+
+from .docstring import JSON_OBJECT_RE
+
+SECTIONS_SYSTEM_MESSAGE = (
+    "Describe the given Python code for its docstring, but do not write "
+    "the docstring. Respond only with a JSON object with the keys: "
+    '"summary" (a one-line summary), '
+    '"description" (further details, or an empty string), '
+    '"params" (an object mapping each parameter name to a short description), '
+    '"returns" (a short description of the returned or yielded value, '
+    "or an empty string) and "
+    '"raises" (an object mapping each raised exception to a short description).'
+)
+SECTIONS_PROMPT_PATTERN = "Describe the following Python {entity} code:\n{code}"
+
+
+class Parameter(NamedTuple):
+    """Represents a parameter of a function signature."""
+
+    name: str
+    annotation: str | None
+    default: str | None
+
+
+class Signature(NamedTuple):
+    """Represents what a docstring documents about a function or class."""
+
+    parameters: list[Parameter]
+    returns: str | None
+    returns_value: bool
+    yields: bool
+    raises: list[str]
+
+
+class DocstringSections(NamedTuple):
+    """Represents the parts of a docstring described by the AI."""
+
+    summary: str
+    description: str
+    params: dict[str, str]
+    returns: str
+    raises: dict[str, str]
+
+
+def get_signature(code: str) -> Signature | None:
+    """Extracts the signature of a function, or of the `__init__` of a class.
+
+    Returns None if the code cannot be parsed.
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(code))
+    except SyntaxError:
+        return None
+    if not tree.body:
+        return None
+    node = tree.body[0]
+    if isinstance(node, ast.ClassDef):
+        init = next(
+            (
+                child
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and child.name == "__init__"
+            ),
+            None,
+        )
+        parameters = _get_parameters(init.args, skip_first=True) if init else []
+        return Signature(parameters, None, False, False, [])
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return None
+
+    arguments = node.args.posonlyargs + node.args.args
+    skip_first = bool(arguments) and arguments[0].arg in ("self", "cls")
+    returns = ast.unparse(node.returns) if node.returns else None
+    body = list(_walk_body(node))
+    return Signature(
+        parameters=_get_parameters(node.args, skip_first),
+        returns=returns,
+        returns_value=any(
+            isinstance(child, ast.Return)
+            and child.value is not None
+            and not (
+                isinstance(child.value, ast.Constant) and child.value.value is None
+            )
+            for child in body
+        ),
+        yields=any(isinstance(child, (ast.Yield, ast.YieldFrom)) for child in body),
+        raises=list(
+            dict.fromkeys(
+                _get_exception_name(child.exc)
+                for child in body
+                if isinstance(child, ast.Raise) and child.exc is not None
+            )
+        ),
+    )
+
+
+def _get_parameters(arguments: ast.arguments, skip_first: bool) -> list[Parameter]:
+    """Returns the documented parameters of the arguments of a function."""
+    positional = arguments.posonlyargs + arguments.args
+    defaults = [None] * (len(positional) - len(arguments.defaults)) + list(
+        arguments.defaults
+    )
+    parameters = [
+        _create_parameter(argument, default)
+        for argument, default in zip(positional, defaults)
+    ][1 if skip_first else 0 :]
+    if arguments.vararg:
+        parameters.append(_create_parameter(arguments.vararg, prefix="*"))
+    parameters.extend(
+        _create_parameter(argument, default)
+        for argument, default in zip(arguments.kwonlyargs, arguments.kw_defaults)
+    )
+    if arguments.kwarg:
+        parameters.append(_create_parameter(arguments.kwarg, prefix="**"))
+    return parameters
+
+
+def _create_parameter(
+    argument: ast.arg, default: ast.expr | None = None, prefix: str = ""
+) -> Parameter:
+    """Creates a parameter from the argument of a function."""
+    return Parameter(
+        name=f"{prefix}{argument.arg}",
+        annotation=ast.unparse(argument.annotation) if argument.annotation else None,
+        default=ast.unparse(default) if default else None,
+    )
+
+
+def _walk_body(node: ast.AST) -> list[ast.AST]:
+    """Returns the nodes of the function body, except the ones of nested scopes."""
+    nodes = []
+    for child in ast.iter_child_nodes(node):
+        if isinstance(
+            child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+        ):
+            continue
+        nodes.append(child)
+        nodes.extend(_walk_body(child))
+    return nodes
+
+
+def _get_exception_name(node: ast.expr) -> str:
+    """Returns the name of the raised exception."""
+    if isinstance(node, ast.Call):
+        node = node.func
+    return ast.unparse(node)
+
+
+def parse_sections(response: str) -> DocstringSections | None:
+    """Parses the AI response describing a docstring.
+
+    Returns None if the response is not a JSON object with a summary.
+    """
+    match = JSON_OBJECT_RE.search(response)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("summary"), str):
+        return None
+
+    def get_text(key: str) -> str:
+        value = data.get(key)
+        return value.strip() if isinstance(value, str) else ""
+
+    def get_mapping(key: str) -> dict[str, str]:
+        value = data.get(key)
+        if not isinstance(value, dict):
+            return {}
+        return {
+            str(name).lstrip("*"): description.strip()
+            for name, description in value.items()
+            if isinstance(description, str)
+        }
+
+    return DocstringSections(
+        summary=get_text("summary"),
+        description=get_text("description"),
+        params=get_mapping("params"),
+        returns=get_text("returns"),
+        raises=get_mapping("raises"),
+    )
+
+
+def render_docstring(
+    sections: DocstringSections, signature: Signature | None, style: str
+) -> str:
+    """Renders the docstring in the given style, without quotes and indentation.
+
+    The parameters, the returned value and the exceptions are taken from
+    the signature, and described with the AI descriptions.
+    """
+    paragraphs = [sections.summary]
+    if sections.description:
+        paragraphs.append(sections.description)
+    if signature:
+        render = STYLE_RENDERERS.get(style, _render_google)
+        paragraphs.extend(render(sections, signature))
+    return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def _describe_parameter(sections: DocstringSections, parameter: Parameter) -> str:
+    """Returns the AI description of the parameter."""
+    return sections.params.get(parameter.name.lstrip("*"), "")
+
+
+def _has_returns(signature: Signature) -> bool:
+    """Checks if the returned value is documented."""
+    return (
+        signature.yields
+        or signature.returns_value
+        or (signature.returns not in (None, "None", "NoReturn"))
+    )
+
+
+def _render_google(sections: DocstringSections, signature: Signature) -> list[str]:
+    """Renders the sections in the Google style."""
+    paragraphs = []
+    if signature.parameters:
+        lines = ["Args:"]
+        for parameter in signature.parameters:
+            types = [parameter.annotation] if parameter.annotation else []
+            if parameter.default is not None:
+                types.append("optional")
+            name = f"{parameter.name} ({', '.join(types)})" if types else parameter.name
+            description = _describe_parameter(sections, parameter)
+            if parameter.default is not None:
+                description = f"{description} Defaults to {parameter.default}.".strip()
+            lines.append(f"    {name}: {description}".rstrip())
+        paragraphs.append("\n".join(lines))
+    if _has_returns(signature):
+        title = "Yields:" if signature.yields else "Returns:"
+        returns = sections.returns
+        if signature.returns and not signature.yields:
+            returns = f"{signature.returns}: {returns}".rstrip()
+        paragraphs.append(f"{title}\n    {returns}".rstrip())
+    if signature.raises:
+        lines = ["Raises:"]
+        for exception in signature.raises:
+            description = sections.raises.get(exception, "")
+            lines.append(f"    {exception}: {description}".rstrip())
+        paragraphs.append("\n".join(lines))
+    return paragraphs
+
+
+def _render_numpy(sections: DocstringSections, signature: Signature) -> list[str]:
+    """Renders the sections in the NumPy style."""
+    paragraphs = []
+    if signature.parameters:
+        lines = ["Parameters", "----------"]
+        for parameter in signature.parameters:
+            types = [parameter.annotation] if parameter.annotation else []
+            if parameter.default is not None:
+                types.append("optional")
+            name = f"{parameter.name} : {', '.join(types)}" if types else parameter.name
+            lines.append(name)
+            description = _describe_parameter(sections, parameter)
+            if parameter.default is not None:
+                description = f"{description} Default is {parameter.default}.".strip()
+            if description:
+                lines.append(f"    {description}")
+        paragraphs.append("\n".join(lines))
+    if _has_returns(signature):
+        title = "Yields" if signature.yields else "Returns"
+        lines = [title, "-" * len(title)]
+        if signature.returns and not signature.yields:
+            lines.append(signature.returns)
+        if sections.returns:
+            lines.append(
+                f"    {sections.returns}" if len(lines) > 2 else sections.returns
+            )
+        paragraphs.append("\n".join(lines))
+    if signature.raises:
+        lines = ["Raises", "------"]
+        for exception in signature.raises:
+            lines.append(exception)
+            if description := sections.raises.get(exception):
+                lines.append(f"    {description}")
+        paragraphs.append("\n".join(lines))
+    return paragraphs
+
+
+def _render_sphinx(sections: DocstringSections, signature: Signature) -> list[str]:
+    """Renders the sections in the Sphinx style."""
+    lines = []
+    for parameter in signature.parameters:
+        name = parameter.name.lstrip("*")
+        description = _describe_parameter(sections, parameter)
+        if parameter.default is not None:
+            description = f"{description} Defaults to {parameter.default}.".strip()
+        lines.append(f":param {name}: {description}".rstrip())
+        if parameter.annotation:
+            lines.append(f":type {name}: {parameter.annotation}")
+    if _has_returns(signature):
+        title = "yield" if signature.yields else "return"
+        lines.append(f":{title}: {sections.returns}".rstrip())
+        if signature.returns and not signature.yields:
+            lines.append(f":rtype: {signature.returns}")
+    for exception in signature.raises:
+        description = sections.raises.get(exception, "")
+        lines.append(f":raises {exception}: {description}".rstrip())
+    return ["\n".join(lines)] if lines else []
+
+
+STYLE_RENDERERS = {
+    "google": _render_google,
+    "numpy": _render_numpy,
+    "sphinx": _render_sphinx,
+}
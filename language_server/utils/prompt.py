@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import ast
+import re
+from typing import Callable, Iterable, Iterator
+
+# Default token budgets of the prompts, by the prefix of the model name.
+MODEL_TOKEN_BUDGETS = {
+    "gpt-3.5-turbo": 3000,
+    "gpt-4": 4000,
+    "gpt-4-turbo": 8000,
+    "gpt-4o": 8000,
+    "gpt-4.1": 8000,
+    "o1": 8000,
+    "o3": 8000,
+    "o4": 8000,
+}
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Approximates the tokens of a BPE tokenizer: words, digit groups, runs
+# of spaces and single punctuation characters.
+TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}| {2,}|[^\sA-Za-z\d]|\n")
+
+# Literals longer than these limits are elided.
+MAX_STRING_LENGTH = 80
+MAX_COLLECTION_LENGTH = 8
+
+# Runs of statements of the same structure longer than this are elided.
+MAX_REPEATED_STATEMENTS = 2
+
+ScopeNode = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+# Nodes with a block of statements that are not statements themselves
+# (match statements are available since Python 3.10).
+BlockNode = (ast.excepthandler, *filter(None, [getattr(ast, "match_case", None)]))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens of the text without a tokenizer.
+
+    Long words are counted as one token per four characters.
+    """
+    return sum(1 + (len(token) - 1) // 4 for token in TOKEN_RE.findall(text))
+
+
+def get_token_budget(model: str) -> int:
+    """Returns the default token budget of the prompts for the model."""
+    prefixes = [prefix for prefix in MODEL_TOKEN_BUDGETS if model.startswith(prefix)]
+    if not prefixes:
+        return DEFAULT_TOKEN_BUDGET
+    return MODEL_TOKEN_BUDGETS[max(prefixes, key=len)]
+
+
+def build_prompt(
+    prompt_pattern: str,
+    *,
+    docstring_style: str,
+    entity: str,
+    code: str,
+    max_tokens: int,
+) -> tuple[str, int]:
+    """Builds the prompt, eliding the code to fit in the token budget.
+
+    Returns:
+        The prompt and the estimated number of tokens saved by the elision.
+    """
+    scaffolding = prompt_pattern.format(
+        docstring_style=docstring_style, entity=entity, code=""
+    )
+    code_budget = max(max_tokens - estimate_tokens(scaffolding), 0)
+    elided_code = elide_code(code, code_budget)
+    prompt = prompt_pattern.format(
+        docstring_style=docstring_style, entity=entity, code=elided_code
+    )
+    return prompt, estimate_tokens(code) - estimate_tokens(elided_code)
+
+
+def elide_code(code: str, max_tokens: int) -> str:
+    """Shortens the code of a class or function to fit in the token budget.
+
+    The code is elided step by step until it fits: long literals are replaced
+    with `...`, then runs of similar statements, then the bodies of nested
+    functions and finally the body of the entity itself. Signatures,
+    decorators, docstrings, return and raise statements are kept.
+    The code that cannot be parsed, or still does not fit, is truncated.
+    """
+    if estimate_tokens(code) <= max_tokens:
+        return code
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return _truncate(code, max_tokens)
+
+    elided_code = code
+    for elide in ELISION_STEPS:
+        elide(tree)
+        elided_code = ast.unparse(tree)
+        if estimate_tokens(elided_code) <= max_tokens:
+            return elided_code
+    return _truncate(elided_code, max_tokens)
+
+
+def _truncate(code: str, max_tokens: int) -> str:
+    """Keeps the first lines of the code that fit in the token budget."""
+    lines = []
+    tokens = estimate_tokens("...")
+    for line in code.splitlines():
+        tokens += estimate_tokens(line) + 1
+        if tokens > max_tokens and lines:
+            break
+        lines.append(line)
+    lines.append("...")
+    return "\n".join(lines)
+
+
+def _ellipsis() -> ast.Expr:
+    """Returns a statement consisting of `...`."""
+    return ast.Expr(ast.Constant(...))
+
+
+class LiteralElider(ast.NodeTransformer):
+    """Replaces long strings with `...` and shortens long collections.
+
+    Docstrings are kept.
+    """
+
+    def visit_Module(self, node: ast.Module) -> ast.AST:
+        """Elides the literals of the module, except its docstring."""
+        return self._visit_scope(node)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        """Elides the literals of the class, except its docstring."""
+        return self._visit_scope(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        """Elides the literals of the function, except its docstring."""
+        return self._visit_scope(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> ast.AST:
+        """Elides the literals of the function, except its docstring."""
+        return self._visit_scope(node)
+
+    def visit_JoinedStr(self, node: ast.JoinedStr) -> ast.AST:
+        """Replaces a long f-string with `...`."""
+        if len(ast.unparse(node)) > MAX_STRING_LENGTH:
+            return ast.Constant(...)
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        """Replaces a long string with `...`."""
+        if isinstance(node.value, (str, bytes)) and len(node.value) > MAX_STRING_LENGTH:
+            return ast.Constant(...)
+        return node
+
+    def visit_List(self, node: ast.List) -> ast.AST:
+        """Keeps the first elements of a long list."""
+        return self._shorten(node)
+
+    def visit_Tuple(self, node: ast.Tuple) -> ast.AST:
+        """Keeps the first elements of a long tuple."""
+        return self._shorten(node)
+
+    def visit_Set(self, node: ast.Set) -> ast.AST:
+        """Keeps the first elements of a long set."""
+        return self._shorten(node)
+
+    def visit_Dict(self, node: ast.Dict) -> ast.AST:
+        """Replaces a long dictionary with `{...}`."""
+        if len(node.keys) > MAX_COLLECTION_LENGTH:
+            return ast.Set([ast.Constant(...)])
+        return self.generic_visit(node)
+
+    def _visit_scope(
+        self, node: ast.Module | ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef
+    ) -> ast.AST:
+        """Elides the literals of the node, keeping its docstring aside."""
+        if ast.get_docstring(node, clean=False) is None:
+            return self.generic_visit(node)
+        docstring, *node.body = node.body
+        self.generic_visit(node)
+        node.body.insert(0, docstring)
+        return node
+
+    def _shorten(self, node: ast.List | ast.Tuple | ast.Set) -> ast.AST:
+        """Keeps the first elements of a long collection, followed by `...`."""
+        if len(node.elts) > MAX_COLLECTION_LENGTH and not isinstance(
+            getattr(node, "ctx", None), ast.Store
+        ):
+            node.elts = node.elts[:3] + [ast.Constant(...)]
+        return self.generic_visit(node)
+
+
+class RepetitionElider(ast.NodeTransformer):
+    """Replaces runs of statements with the same structure with `...`."""
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        """Elides the repeated statements of each block of the node."""
+        super().generic_visit(node)
+        for name in ("body", "orelse", "finalbody"):
+            statements = getattr(node, name, None)
+            if isinstance(statements, list) and statements:
+                setattr(node, name, self._elide_runs(statements))
+        return node
+
+    def _elide_runs(self, statements: list[ast.stmt]) -> list[ast.stmt]:
+        """Keeps the first statement of each run of similar statements."""
+        result: list[ast.stmt] = []
+        run_shape = None
+        run_length = 0
+        for statement in statements:
+            shape = _get_shape(statement)
+            if shape == run_shape and not isinstance(
+                statement, (ast.Return, ast.Raise)
+            ):
+                run_length += 1
+                if run_length == MAX_REPEATED_STATEMENTS:
+                    result.append(_ellipsis())
+                if run_length >= MAX_REPEATED_STATEMENTS:
+                    continue
+            else:
+                run_shape = shape
+                run_length = 0
+            result.append(statement)
+        return result
+
+
+class BodyElider(ast.NodeTransformer):
+    """Replaces the bodies of functions with their returns and raises.
+
+    Attributes:
+        nested_only: Whether the bodies of the top-level functions are kept.
+    """
+
+    def __init__(self, nested_only: bool) -> None:
+        self.nested_only = nested_only
+        self._depth = 0
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        """Elides the body of the function."""
+        return self._elide_body(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> ast.AST:
+        """Elides the body of the async function."""
+        return self._elide_body(node)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        """Elides the bodies of the methods of the class."""
+        self._depth += 1
+        self.generic_visit(node)
+        self._depth -= 1
+        return node
+
+    def _elide_body(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> ast.AST:
+        """Keeps the docstring, the returns and the raises of the function."""
+        if self.nested_only and not self._depth:
+            self._depth += 1
+            self.generic_visit(node)
+            self._depth -= 1
+            return node
+
+        body: list[ast.stmt] = []
+        if ast.get_docstring(node, clean=False) is not None:
+            body.append(node.body[0])
+        body.append(_ellipsis())
+        exits = {}
+        for statement in _find_exits(node.body):
+            exits.setdefault(ast.unparse(statement), statement)
+        body.extend(exits.values())
+        node.body = body
+        return node
+
+
+ELISION_STEPS: list[Callable[[ast.Module], object]] = [
+    LiteralElider().visit,
+    RepetitionElider().visit,
+    BodyElider(nested_only=True).visit,
+    BodyElider(nested_only=False).visit,
+]
+
+
+def _get_shape(node: ast.AST) -> tuple[str, ...]:
+    """Returns the structure of the node, regardless of names and values."""
+    return tuple(type(child).__name__ for child in ast.walk(node))
+
+
+def _find_exits(nodes: Iterable[ast.AST]) -> Iterator[ast.stmt]:
+    """Yields the return and raise statements, except the ones of nested scopes."""
+    for node in nodes:
+        if isinstance(node, (ast.Return, ast.Raise)):
+            yield node
+        elif isinstance(node, (ast.stmt, *BlockNode)) and not isinstance(
+            node, ScopeNode
+        ):
+            yield from _find_exits(ast.iter_child_nodes(node))
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Mapping, Optional, Tuple
+
+import httpx
+
+from .prompt import estimate_tokens
+
+# Tokens expected in a completion, counted before the request is sent
+# if the request does not limit them.
+DEFAULT_COMPLETION_TOKENS = 300
+
+# The longest time waited at once, so that changed limits are noticed.
+MAX_DELAY = 60.0
+
+# A duration of a rate limit reset, such as "1s", "6m0s" or "20ms".
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# The base URL of the API and the model.
+RateLimitKey = Tuple[Optional[str], str]
+
+
+def parse_duration(value: str) -> float:
+    """Returns the number of seconds of a rate limit reset duration."""
+    return sum(
+        float(number) * DURATION_UNITS[unit]
+        for number, unit in DURATION_RE.findall(value)
+    )
+
+
+@dataclass
+class TokenBucket:
+    """Represents a rate limit as a bucket refilled at a constant rate.
+
+    Attributes:
+        capacity: The maximum level of the bucket.
+        rate: The refill rate, per second.
+        level: The amount available now; negative when overdrawn.
+        updated: The time the level was last refilled.
+    """
+
+    capacity: float
+    rate: float
+    level: float
+    updated: float = field(default_factory=time.monotonic)
+
+    def delay(self, amount: float) -> float:
+        """Returns the time to wait until the amount is available."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return MAX_DELAY
+        return min((amount - self.level) / self.rate, MAX_DELAY)
+
+    def take(self, amount: float) -> None:
+        """Takes the amount from the bucket."""
+        self._refill()
+        self.level -= amount
+
+    def sync(self, limit: float, remaining: float, reset: float) -> None:
+        """Adjusts the bucket to the limit reported by the API.
+
+        The refill rate is derived from the time until the limit is reset;
+        the level never exceeds the amount remaining at the API.
+        """
+        self._refill()
+        self.capacity = limit
+        if remaining < limit and reset > 0:
+            self.rate = (limit - remaining) / reset
+        else:
+            self.rate = limit / 60
+        self.level = min(self.level, remaining)
+
+    def _refill(self) -> None:
+        """Refills the bucket for the time elapsed since the last refill."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+@dataclass
+class RateLimits:
+    """Represents the requests and tokens per minute limits of a model."""
+
+    requests: TokenBucket | None = None
+    tokens: TokenBucket | None = None
+
+
+class RateLimiter:
+    """Paces the requests to stay within the rate limits of the API.
+
+    The limits of each API endpoint and model are learned from the
+    `x-ratelimit-*` headers of its responses, including the rejected ones,
+    so the requests are delayed before they would be rejected. Requests are
+    not delayed until the limits are known.
+    """
+
+    def __init__(self) -> None:
+        self._limits: dict[RateLimitKey, RateLimits] = {}
+
+    async def acquire(self, key: RateLimitKey, tokens: int) -> None:
+        """Waits until a request using the tokens can be sent within the limits."""
+        await self.wait(key, tokens)
+        for bucket, amount in self._buckets(key, tokens):
+            bucket.take(amount)
+
+    async def wait(
+        self, key: RateLimitKey, tokens: int = DEFAULT_COMPLETION_TOKENS
+    ) -> None:
+        """Waits until a request using the tokens could be sent, without taking them.
+
+        Lets the caller wait for the limits before it starts timing the request.
+        """
+        while buckets := self._buckets(key, tokens):
+            delay = max(bucket.delay(amount) for bucket, amount in buckets)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _buckets(
+        self, key: RateLimitKey, tokens: int
+    ) -> list[tuple[TokenBucket, float]]:
+        """Returns the known limits of the key, with the amount a request takes."""
+        limits = self._limits.get(key)
+        if limits is None:
+            return []
+        return [
+            (bucket, amount)
+            for bucket, amount in [(limits.requests, 1), (limits.tokens, tokens)]
+            if bucket is not None
+        ]
+
+    def update(self, key: RateLimitKey, headers: Mapping[str, str]) -> None:
+        """Learns the limits from the headers of a response."""
+        limits = self._limits.setdefault(key, RateLimits())
+        limits.requests = self._sync(limits.requests, headers, "requests")
+        limits.tokens = self._sync(limits.tokens, headers, "tokens")
+        if limits.requests is None and limits.tokens is None:
+            del self._limits[key]
+
+    @staticmethod
+    def _sync(
+        bucket: TokenBucket | None, headers: Mapping[str, str], name: str
+    ) -> TokenBucket | None:
+        """Creates or adjusts the bucket of a limit reported by the headers."""
+        try:
+            limit = float(headers[f"x-ratelimit-limit-{name}"])
+            remaining = float(headers[f"x-ratelimit-remaining-{name}"])
+        except (KeyError, ValueError):
+            return bucket
+        reset = parse_duration(headers.get(f"x-ratelimit-reset-{name}", ""))
+        if bucket is None:
+            bucket = TokenBucket(capacity=limit, rate=limit / 60, level=remaining)
+        bucket.sync(limit, remaining, reset)
+        return bucket
+
+    def event_hooks(
+        self, base_url: str | None
+    ) -> dict[str, list[Callable[..., Awaitable[None]]]]:
+        """Returns the hooks of an HTTP client pacing its chat completions."""
+
+        async def on_request(request: httpx.Request) -> None:
+            if (body := _parse_chat_request(request)) is not None:
+                await self.acquire((base_url, body["model"]), _estimate_tokens(body))
+
+        async def on_response(response: httpx.Response) -> None:
+            if (body := _parse_chat_request(response.request)) is not None:
+                self.update((base_url, body["model"]), response.headers)
+
+        return {"request": [on_request], "response": [on_response]}
+
+
+def _parse_chat_request(request: httpx.Request) -> dict | None:
+    """Returns the body of a chat completion request, or None for other requests."""
+    if not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        body = json.loads(request.content)
+    except (ValueError, httpx.RequestNotRead):
+        return None
+    if not isinstance(body, dict) or not isinstance(body.get("model"), str):
+        return None
+    return body
+
+
+def _estimate_tokens(body: dict) -> int:
+    """Estimates the tokens counted by the API for a chat completion request."""
+    prompt_tokens = sum(
+        estimate_tokens(message.get("content") or "")
+        for message in body.get("messages", [])
+        if isinstance(message, dict) and isinstance(message.get("content"), str)
+    )
+    completion_tokens = (
+        body.get("max_completion_tokens")
+        or body.get("max_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    return prompt_tokens + completion_tokens
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Number of the most recent latencies kept for each endpoint.
+LATENCY_SAMPLES = 50
+
+# Latencies needed before the p90 of an endpoint is trusted.
+MIN_LATENCY_SAMPLES = 5
+
+# Time in seconds before a request is hedged, while the p90 is not known.
+DEFAULT_HEDGE_DELAY = 3.0
+
+
+class Endpoint(NamedTuple):
+    """Represents an OpenAI-compatible API endpoint and the model used there."""
+
+    base_url: str | None
+    model: str
+    api_key: str
+
+
+class EndpointRouter:
+    """Routes the requests to the endpoints by their recent latencies.
+
+    Requests are either sent to an endpoint picked at random, weighted by
+    the inverse of its mean latency, or hedged: sent to the first endpoint,
+    and duplicated to the second one if the first has not answered within
+    its p90 latency, the first answer winning.
+
+    The latency of a streamed request is the time to its first token, and it is
+    kept apart from the latency of the complete responses. Only the requests
+    for complete responses are hedged.
+    """
+
+    def __init__(self) -> None:
+        self._latencies: dict[tuple[str | None, str, bool], deque[float]] = {}
+
+    def choose(self, endpoints: Sequence[Endpoint], streamed: bool = False) -> Endpoint:
+        """Picks an endpoint, preferring the faster ones.
+
+        Endpoints without known latencies are tried first.
+        """
+        samples = [self._samples(endpoint, streamed) for endpoint in endpoints]
+        for endpoint, latencies in zip(endpoints, samples):
+            if not latencies:
+                return endpoint
+        weights = [len(latencies) / max(sum(latencies), 1e-3) for latencies in samples]
+        return random.choices(endpoints, weights)[0]
+
+    def p90(self, endpoint: Endpoint, streamed: bool = False) -> float | None:
+        """Returns the p90 latency of the endpoint, or None if not known yet."""
+        samples = sorted(self._samples(endpoint, streamed))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[round(0.9 * (len(samples) - 1))]
+
+    def record(
+        self, endpoint: Endpoint, latency: float, streamed: bool = False
+    ) -> None:
+        """Records the latency of a request answered by the endpoint."""
+        samples = self._latencies.setdefault(
+            (endpoint.base_url, endpoint.model, streamed),
+            deque(maxlen=LATENCY_SAMPLES),
+        )
+        samples.append(latency)
+
+    async def hedge(
+        self,
+        primary: Endpoint,
+        secondary: Endpoint,
+        request: Callable[[Endpoint], Awaitable[T]],
+    ) -> T:
+        """Sends the request to the primary endpoint, hedged with the secondary one.
+
+        The request is also sent to the secondary endpoint if the primary has
+        not answered within its p90 latency, or has failed. The first answer
+        wins and the other request is cancelled. If both requests fail, the
+        error of the primary one is raised. The latencies are recorded by
+        the requests themselves.
+        """
+        tasks = [asyncio.ensure_future(request(primary))]
+        try:
+            delay = self.p90(primary)
+            done, _ = await asyncio.wait(
+                tasks, timeout=DEFAULT_HEDGE_DELAY if delay is None else delay
+            )
+            if not done or tasks[0].exception():
+                tasks.append(asyncio.ensure_future(request(secondary)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.exception():
+                        return task.result()
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _samples(self, endpoint: Endpoint, streamed: bool = False) -> deque[float]:
+        """Returns the recent latencies of the endpoint."""
+        return self._latencies.get(
+            (endpoint.base_url, endpoint.model, streamed), deque()
+        )
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import enum
+import itertools
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, NamedTuple
+
+# Slots reserved for interactive requests above the concurrency limit,
+# so that they do not wait for background requests to finish.
+RESERVED_INTERACTIVE_SLOTS = 1
+
+# Number of the most recent wait times kept for the metrics.
+WAIT_TIME_SAMPLES = 200
+
+
+@enum.unique
+class Priority(enum.IntEnum):
+    """Represents the priority class of a generation request."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+    SPECULATIVE = 2
+
+
+@dataclass
+class Waiter:
+    """Represents a request waiting for a slot."""
+
+    priority: Priority
+    folder: str | None
+    sequence: int
+    future: asyncio.Future[None] = field(repr=False)
+
+
+@dataclass
+class EndpointQueue:
+    """Represents the requests to an API endpoint.
+
+    Attributes:
+        max_concurrent: The maximum number of requests sent at the same time.
+        running: The number of requests sent.
+        running_by_folder: The number of requests sent, by workspace folder.
+        waiters: The requests waiting for a slot.
+        next_start: The time the next paced request can be started.
+    """
+
+    max_concurrent: int
+    running: int = 0
+    running_by_folder: Counter[str | None] = field(default_factory=Counter)
+    waiters: list[Waiter] = field(default_factory=list)
+    next_start: float = 0.0
+
+
+class PriorityMetrics(NamedTuple):
+    """Represents the metrics of the requests of a priority class."""
+
+    queued: int
+    running: int
+    p50_wait: float
+    p95_wait: float
+
+
+class GenerationScheduler:
+    """Admits the generation requests of the server to each API endpoint.
+
+    Requests to an endpoint are sent up to its concurrency limit, the others
+    wait for a slot. Waiting requests are admitted by priority class, then
+    from the workspace folder with the fewest requests sent, then in order
+    of arrival. Interactive requests may use reserved slots above the limit.
+    Requests to different endpoints do not wait for each other.
+    """
+
+    def __init__(self) -> None:
+        self._endpoints: dict[str | None, EndpointQueue] = {}
+        self._sequence = itertools.count()
+        self._running: Counter[Priority] = Counter()
+        self._wait_times = {
+            priority: deque(maxlen=WAIT_TIME_SAMPLES) for priority in Priority
+        }
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self,
+        endpoint: str | None,
+        *,
+        priority: Priority,
+        max_concurrent: int,
+        folder: str | None = None,
+        requests_per_minute: int = 0,
+    ) -> AsyncIterator[None]:
+        """Waits until a request to the endpoint can be sent.
+
+        Args:
+            endpoint: The base URL of the API.
+            priority: The priority class of the request.
+            max_concurrent: The maximum number of requests sent at the same time;
+                the limit of the latest request applies.
+            folder: The workspace folder the request is made for.
+            requests_per_minute: The maximum number of requests of this kind
+                started per minute, or 0 for no limit.
+        """
+        queue = self._endpoints.get(endpoint)
+        if queue is None:
+            queue = self._endpoints[endpoint] = EndpointQueue(max_concurrent)
+        queue.max_concurrent = max_concurrent
+
+        start = time.monotonic()
+        waiter = Waiter(
+            priority,
+            folder,
+            next(self._sequence),
+            asyncio.get_running_loop().create_future(),
+        )
+        queue.waiters.append(waiter)
+        self._dispatch(queue)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if not waiter.future.cancelled():
+                # The slot was granted before the request was cancelled.
+                self._release(queue, waiter)
+            elif waiter in queue.waiters:
+                queue.waiters.remove(waiter)
+            raise
+        self._wait_times[priority].append(time.monotonic() - start)
+
+        try:
+            if requests_per_minute > 0:
+                now = time.monotonic()
+                delay = queue.next_start - now
+                queue.next_start = max(now, queue.next_start) + 60 / requests_per_minute
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield
+        finally:
+            self._release(queue, waiter)
+
+    def metrics(self) -> dict[Priority, PriorityMetrics]:
+        """Returns the queue depth and the wait times of each priority class."""
+        queued = Counter(
+            waiter.priority
+            for queue in self._endpoints.values()
+            for waiter in queue.waiters
+        )
+        metrics = {}
+        for priority in Priority:
+            wait_times = sorted(self._wait_times[priority])
+            metrics[priority] = PriorityMetrics(
+                queued=queued[priority],
+                running=self._running[priority],
+                p50_wait=_percentile(wait_times, 0.5),
+                p95_wait=_percentile(wait_times, 0.95),
+            )
+        return metrics
+
+    def describe_metrics(self) -> str:
+        """Returns the metrics as a line of text."""
+        return "; ".join(
+            f"{priority.name.lower()}: {metrics.queued} queued, "
+            f"{metrics.running} running, wait p50 {metrics.p50_wait:.2f} s, "
+            f"p95 {metrics.p95_wait:.2f} s"
+            for priority, metrics in self.metrics().items()
+        )
+
+    def _dispatch(self, queue: EndpointQueue) -> None:
+        """Admits the waiting requests while there are free slots.
+
+        Cancelled requests still in the queue are dropped.
+        """
+        queue.waiters = [waiter for waiter in queue.waiters if not waiter.future.done()]
+        while queue.waiters:
+            waiter = min(
+                queue.waiters,
+                key=lambda waiter: (
+                    waiter.priority,
+                    queue.running_by_folder[waiter.folder],
+                    waiter.sequence,
+                ),
+            )
+            limit = queue.max_concurrent
+            if waiter.priority == Priority.INTERACTIVE:
+                limit += RESERVED_INTERACTIVE_SLOTS
+            if queue.running >= limit:
+                return
+            queue.waiters.remove(waiter)
+            queue.running += 1
+            queue.running_by_folder[waiter.folder] += 1
+            self._running[waiter.priority] += 1
+            waiter.future.set_result(None)
+
+    def _release(self, queue: EndpointQueue, waiter: Waiter) -> None:
+        """Frees the slot of the finished request."""
+        queue.running -= 1
+        queue.running_by_folder[waiter.folder] -= 1
+        if not queue.running_by_folder[waiter.folder]:
+            del queue.running_by_folder[waiter.folder]
+        self._running[waiter.priority] -= 1
+        self._dispatch(queue)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Returns the percentile of the sorted values, or 0 if there are none."""
+    if not values:
+        return 0.0
+    return values[round(fraction * (len(values) - 1))]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Flight(Generic[T]):
+    """Represents a call shared by concurrent callers.
+
+    Attributes:
+        task: The task running the call.
+        subscribers: The number of callers awaiting the result.
+    """
+
+    task: asyncio.Future[T] = field(repr=False)
+    subscribers: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """Shares one in-flight call among the concurrent callers with the same key.
+
+    The first caller starts the call, the following ones await its result
+    until it is finished. A cancelled caller stops waiting, but the call is
+    cancelled only when no other caller awaits it anymore.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, Flight[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def is_running(self, key: str) -> bool:
+        """Checks if a call with the key is in flight."""
+        return key in self._flights
+
+    async def run(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        """Returns the result of the call in flight with the key.
+
+        The call is made by the function if there is no call with the key.
+
+        Example:
+            response = await flights.run(cache_key, lambda: request(prompt))
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(asyncio.ensure_future(function()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+
+        flight.subscribers += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.task.done():
+                flight.task.cancel()
+                self._land(key, flight)
+
+    def _land(self, key: str, flight: Flight[T]) -> None:
+        """Forgets the finished or cancelled call."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Coroutine
+
+import lsprotocol.types as lsp
+
+
+class HourlyTokenBudget:
+    """Counts the tokens used within the last hour.
+
+    Attributes:
+        _usage: The time and the number of tokens of each request, oldest first.
+    """
+
+    def __init__(self) -> None:
+        self._usage: deque[tuple[float, int]] = deque()
+
+    def used(self) -> int:
+        """Returns the number of tokens used within the last hour."""
+        hour_ago = time.monotonic() - 3600
+        while self._usage and self._usage[0][0] < hour_ago:
+            self._usage.popleft()
+        return sum(tokens for _, tokens in self._usage)
+
+    def add(self, tokens: int) -> None:
+        """Counts the tokens used by a request."""
+        self._usage.append((time.monotonic(), tokens))
+
+
+@dataclass
+class Speculation:
+    """Represents the speculative generation of a docstring.
+
+    Attributes:
+        uri: The URI of the document of the code entity.
+        cursor: The position of the cursor inside the code entity.
+        fingerprint: The fingerprint of the code entity when it was analyzed.
+        task: The task generating the response.
+        checking: Whether the fingerprint of the code entity is being checked.
+    """
+
+    uri: str
+    cursor: lsp.Position
+    fingerprint: str
+    task: asyncio.Task = field(repr=False)
+    checking: bool = False
+
+
+class Speculator:
+    """Generates a docstring in the background before it is requested.
+
+    Only one docstring is generated speculatively at a time: a new speculation
+    cancels the previous one, so the requests follow the cursor of the user.
+    The tokens used are counted against an hourly budget.
+    """
+
+    def __init__(self) -> None:
+        self.budget = HourlyTokenBudget()
+        self._speculation: Speculation | None = None
+
+    def get(self, uri: str) -> Speculation | None:
+        """Returns the running speculation in the document, or None."""
+        if self._speculation is not None and self._speculation.uri == uri:
+            return self._speculation
+        return None
+
+    def start(
+        self,
+        uri: str,
+        cursor: lsp.Position,
+        fingerprint: str,
+        coroutine: Coroutine[object, object, object],
+    ) -> None:
+        """Starts the speculation, cancelling the running one."""
+        self.cancel()
+        speculation = Speculation(
+            uri, cursor, fingerprint, asyncio.ensure_future(coroutine)
+        )
+        speculation.task.add_done_callback(lambda _: self._finish(speculation))
+        self._speculation = speculation
+
+    def cancel(self) -> None:
+        """Cancels the running speculation."""
+        if self._speculation is not None:
+            self._speculation.task.cancel()
+            self._speculation = None
+
+    def _finish(self, speculation: Speculation) -> None:
+        """Forgets the finished speculation."""
+        if self._speculation is speculation:
+            self._speculation = None
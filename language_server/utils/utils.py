@@ -4,6 +4,7 @@ import contextlib
 import os
 from asyncio import iscoroutinefunction
 from functools import wraps
+from inspect import isasyncgenfunction
 from typing import Any, Callable, Literal, TypeVar
 
 import httpx
@@ -12,7 +13,9 @@ from openai import DefaultAsyncHttpxClient
 from pygls.workspace import TextDocument
 
 from .code_analyzers.base import CodeEntity, DocumentPosition
+from .code_analyzers.cache import AnalyzerCache
 from .code_analyzers.factory import AnalyzerFactory
+from .code_analyzers.line_index import LINE_BREAK_RE
 from .proxy import Proxy
 
 F = TypeVar("F", bound=Callable)
@@ -68,10 +71,22 @@ def stub_for_tests(return_value: Any) -> Callable:  # noqa: ANN401
     """Decorator to return a specified value in tests if PYTEST_CURRENT_TEST is set.
 
     Necessary for server testing because the server runs as a separate process.
+    Async generators yield the value instead.
     """
 
     def decorator(function: Callable) -> Callable:
-        if iscoroutinefunction(function):
+        if isasyncgenfunction(function):
+
+            @wraps(function)
+            async def async_gen_wrapper(*args, **kwargs) -> Any:  # noqa: ANN401
+                if os.getenv("PYTEST_CURRENT_TEST"):
+                    yield return_value
+                    return
+                async for value in function(*args, **kwargs):
+                    yield value
+
+            return async_gen_wrapper
+        elif iscoroutinefunction(function):
 
             @wraps(function)
             async def async_wrapper(*args, **kwargs) -> Any:  # noqa: ANN401
@@ -103,6 +118,22 @@ def get_entity_at_cursor(
     return code_entity
 
 
+def get_document_entity_at_cursor(
+    document: TextDocument,
+    cursor: lsp.Position,
+    analyzer_name: str,
+    analyzer_cache: AnalyzerCache,
+) -> CodeEntity | None:
+    """Returns the code entity at the given cursor position in the document.
+
+    Unlike `get_entity_at_cursor`, the analyzer is taken from the cache,
+    so an unchanged document is not analyzed again.
+    """
+    normalized_cursor = DocumentPosition.from_lsp(cursor)
+    code_analyzer = analyzer_cache.get_analyzer(analyzer_name, document)
+    return code_analyzer.get_context(normalized_cursor)
+
+
 def get_line_endings(lines: list[str]) -> Literal["\r\n", "\n"]:
     """Returns line endings used in the text."""
     with contextlib.suppress(IndexError):
@@ -112,18 +143,37 @@ def get_line_endings(lines: list[str]) -> Literal["\r\n", "\n"]:
 
 
 def match_line_endings(document: TextDocument, text: str) -> str:
-    """Ensures that the edited text line endings matches the document line endings."""
-    expected = get_line_endings(document.source.splitlines(keepends=True))
-    actual = get_line_endings(text.splitlines(keepends=True))
+    """Ensures that the edited text line endings matches the document line endings.
+
+    Only the first line of the document and the text is looked at.
+    """
+    expected = get_line_endings([_first_line(document.source)])
+    actual = get_line_endings([_first_line(text)])
     if actual == expected or actual is None or expected is None:
         return text
     return text.replace(actual, expected)
 
 
-def create_httpx_client(proxy: Proxy | None) -> DefaultAsyncHttpxClient:
-    """Creates openai.DefaultAsyncHttpxClient based on the proxy settings."""
+def _first_line(text: str) -> str:
+    """Returns the first line of the text including its line break."""
+    match = LINE_BREAK_RE.search(text)
+    return text[: match.end()] if match else text
+
+
+def create_httpx_client(
+    proxy: Proxy | None,
+    limits: httpx.Limits | None = None,
+    event_hooks: dict[str, list[Callable]] | None = None,
+) -> DefaultAsyncHttpxClient:
+    """Creates openai.DefaultAsyncHttpxClient based on the proxy settings.
+
+    If `limits` are not given, the default connection limits of openai are used.
+    """
+    kwargs: dict = {"limits": limits} if limits else {}
+    if event_hooks:
+        kwargs["event_hooks"] = event_hooks
     if proxy is None:
-        client = DefaultAsyncHttpxClient()
+        client = DefaultAsyncHttpxClient(**kwargs)
     else:
         if proxy.url.startswith("https://"):
             ssl_context = httpx.create_ssl_context(proxy.strict_ssl)
@@ -136,5 +186,6 @@ def create_httpx_client(proxy: Proxy | None) -> DefaultAsyncHttpxClient:
                 headers=headers,
                 ssl_context=ssl_context,
             ),
+            **kwargs,
         )
     return client
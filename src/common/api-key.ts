@@ -40,6 +40,14 @@ export class ApiKey {
         return _cashedKey || (await this.set());
     }
 
+    // Returns the stored key without asking the user for it
+    public async getStored() {
+        if (!_cashedKey) {
+            _cashedKey = await this.secretStorage.get(this.secretId).then(undefined, () => undefined);
+        }
+        return _cashedKey;
+    }
+
     public async set() {
         const key = await this._ask();
         if (key) {
@@ -5,6 +5,7 @@ import {
     ExecuteCommandRequest,
     LanguageClient,
     ProgressType,
+    TextDocumentIdentifier,
     TextDocumentPositionParams,
     WorkDoneProgressCancelNotification,
     WorkDoneProgressReport,
@@ -14,6 +15,7 @@ import { getWorkspaceSettings } from './settings';
 import { getStatus } from './status';
 import { telemetryReporter } from './telemetry';
 import { getProjectRoot } from './utilities';
+import { getConfiguration } from './vscodeapi';
 
 function showProblemNotification(): void {
     const status: vscode.LanguageStatusItem | undefined = getStatus();
@@ -48,18 +50,28 @@ function showProblemNotification(): void {
     }
 }
 
-export async function generateDocstring(
-    serverId: string,
+async function getCommandContext(
     lsClient: LanguageClient | undefined,
     secrets: vscode.SecretStorage,
-) {
-    if (!lsClient) {
-        showProblemNotification();
+): Promise<{ lsClient: LanguageClient; textEditor: vscode.TextEditor; apiKey: string } | undefined> {
+    const textEditor = vscode.window.activeTextEditor;
+    if (lsClient && !textEditor) {
         return;
     }
 
-    const textEditor = vscode.window.activeTextEditor;
-    if (!textEditor) {
+    const context = await getWorkspaceCommandContext(lsClient, secrets);
+    if (!context || !textEditor) {
+        return;
+    }
+    return { ...context, textEditor };
+}
+
+async function getWorkspaceCommandContext(
+    lsClient: LanguageClient | undefined,
+    secrets: vscode.SecretStorage,
+): Promise<{ lsClient: LanguageClient; apiKey: string } | undefined> {
+    if (!lsClient) {
+        showProblemNotification();
         return;
     }
 
@@ -67,14 +79,18 @@ export async function generateDocstring(
     if (!apiKey) {
         return;
     }
+    return { lsClient, apiKey };
+}
 
+async function executeWithProgress(
+    serverId: string,
+    lsClient: LanguageClient,
+    message: string,
+    command: string,
+    getArguments: (progressTokenID: string) => unknown[],
+) {
     const projectRoot = await getProjectRoot();
     const settings = await getWorkspaceSettings(serverId, projectRoot, false);
-    const pos = textEditor.selection.start;
-    const textDocument: TextDocumentPositionParams = {
-        textDocument: { uri: textEditor.document.uri.toString() },
-        position: { line: pos.line, character: pos.character },
-    };
     vscode.window.withProgress(
         {
             location: settings.showProgressNotification
@@ -83,7 +99,7 @@ export async function generateDocstring(
             cancellable: true,
         },
         (progress, progressToken) => {
-            progress.report({ message: 'Generating docstring...' });
+            progress.report({ message: message });
 
             let progressTokenID = UUID.generateUuid();
             progressToken.onCancellationRequested(() => {
@@ -99,8 +115,8 @@ export async function generateDocstring(
             );
 
             const params: ExecuteCommandParams = {
-                command: 'chatgpt-docstrings.applyGenerate',
-                arguments: [textDocument, apiKey, progressTokenID],
+                command: command,
+                arguments: getArguments(progressTokenID),
             };
 
             const p = new Promise<void>((resolve) => {
@@ -128,3 +144,110 @@ export async function generateDocstring(
         },
     );
 }
+
+export async function generateDocstring(
+    serverId: string,
+    lsClient: LanguageClient | undefined,
+    secrets: vscode.SecretStorage,
+) {
+    const context = await getCommandContext(lsClient, secrets);
+    if (!context) {
+        return;
+    }
+
+    const pos = context.textEditor.selection.start;
+    const textDocument: TextDocumentPositionParams = {
+        textDocument: { uri: context.textEditor.document.uri.toString() },
+        position: { line: pos.line, character: pos.character },
+    };
+    await executeWithProgress(
+        serverId,
+        context.lsClient,
+        'Generating docstring...',
+        'chatgpt-docstrings.applyGenerate',
+        (progressTokenID) => [textDocument, context.apiKey, progressTokenID],
+    );
+}
+
+export async function generateAllDocstrings(
+    serverId: string,
+    lsClient: LanguageClient | undefined,
+    secrets: vscode.SecretStorage,
+) {
+    const context = await getCommandContext(lsClient, secrets);
+    if (!context) {
+        return;
+    }
+
+    const textDocument: TextDocumentIdentifier = { uri: context.textEditor.document.uri.toString() };
+    await executeWithProgress(
+        serverId,
+        context.lsClient,
+        'Generating missing docstrings...',
+        'chatgpt-docstrings.applyGenerateAll',
+        (progressTokenID) => [textDocument, context.apiKey, progressTokenID],
+    );
+}
+
+export async function generateWorkspaceDocstrings(
+    serverId: string,
+    lsClient: LanguageClient | undefined,
+    secrets: vscode.SecretStorage,
+) {
+    const context = await getWorkspaceCommandContext(lsClient, secrets);
+    if (!context) {
+        return;
+    }
+
+    await executeWithProgress(
+        serverId,
+        context.lsClient,
+        'Generating missing docstrings in the workspace...',
+        'chatgpt-docstrings.applyGenerateWorkspace',
+        (progressTokenID) => [context.apiKey, progressTokenID],
+    );
+}
+
+export function registerSpeculation(
+    serverId: string,
+    getLsClient: () => LanguageClient | undefined,
+    secrets: vscode.SecretStorage,
+): vscode.Disposable {
+    let timer: NodeJS.Timeout | undefined;
+    const selectionListener = vscode.window.onDidChangeTextEditorSelection((e) => {
+        clearTimeout(timer);
+        const document = e.textEditor.document;
+        const config = getConfiguration(serverId, document.uri);
+        if (document.languageId !== 'python' || !config.get<boolean>('speculativeGeneration')) {
+            return;
+        }
+
+        // Generate the docstring once the cursor has rested for the delay
+        const pos = e.selections[0].start;
+        timer = setTimeout(async () => {
+            const lsClient = getLsClient();
+            if (!lsClient || !lsClient.isRunning()) {
+                return;
+            }
+            const apiKey = await new ApiKey(lsClient.outputChannel, secrets).getStored();
+            if (!apiKey) {
+                return;
+            }
+            const textDocument: TextDocumentPositionParams = {
+                textDocument: { uri: document.uri.toString() },
+                position: { line: pos.line, character: pos.character },
+            };
+            const params: ExecuteCommandParams = {
+                command: 'chatgpt-docstrings.speculate',
+                arguments: [textDocument, apiKey],
+            };
+            lsClient.sendRequest(ExecuteCommandRequest.type, params).catch((error) => {
+                lsClient.outputChannel.appendLine(`Background docstring generation failed: ${error.message}`);
+            });
+        }, config.get<number>('speculationDelay') ?? 1500);
+    });
+    return new vscode.Disposable(() => {
+        clearTimeout(timer);
+        selectionListener.dispose();
+    });
+}
@@ -24,6 +24,7 @@ export class ServerManager {
         private serverId: string,
         private serverName: string,
         private outputChannel: LogOutputChannel,
+        private storagePath: string,
     ) {}
 
     public async restartServer(): Promise<void> {
@@ -119,6 +120,7 @@ export class ServerManager {
         const initOptions = {
             settings: await getExtensionSettings(this.serverId, true),
             globalSettings: await getGlobalSettings(this.serverId, false),
+            storagePath: this.storagePath,
         };
 
         traceInfo(`Server run command: ${[command, ...args].join(' ')}`);
@@ -18,6 +18,26 @@ export interface ISettings {
     showProgressNotification: boolean;
     codeAnalyzer: string;
     proxy: IProxy;
+    maxConnections: number;
+    connectionIdleTimeout: number;
+    streamResponse: boolean;
+    maxConcurrentRequests: number;
+    maxRequestsPerMinute: number;
+    maxEntitiesPerRequest: number;
+    promptTokenBudget: number;
+    summarizeClasses: boolean;
+    synthesizeSections: boolean;
+    speculativeGeneration: boolean;
+    speculationDelay: number;
+    speculationTokensPerHour: number;
+    endpoints: IEndpoint[];
+    endpointRouting: string;
+}
+
+interface IEndpoint {
+    baseUrl: string;
+    model?: string;
+    apiKeyEnv?: string;
 }
 
 interface IProxy {
@@ -124,6 +144,20 @@ export async function getWorkspaceSettings(
         showProgressNotification: config.get<boolean>(`showProgressNotification`) ?? true,
         codeAnalyzer: config.get<string>(`codeAnalyzer`) ?? 'jedi',
         proxy: getProxy(namespace),
+        maxConnections: config.get<number>(`maxConnections`) ?? 10,
+        connectionIdleTimeout: config.get<number>(`connectionIdleTimeout`) ?? 60,
+        streamResponse: config.get<boolean>(`streamResponse`) ?? true,
+        maxConcurrentRequests: config.get<number>(`maxConcurrentRequests`) ?? 4,
+        maxRequestsPerMinute: config.get<number>(`maxRequestsPerMinute`) ?? 0,
+        maxEntitiesPerRequest: config.get<number>(`maxEntitiesPerRequest`) ?? 5,
+        promptTokenBudget: config.get<number>(`promptTokenBudget`) ?? 0,
+        summarizeClasses: config.get<boolean>(`summarizeClasses`) ?? true,
+        synthesizeSections: config.get<boolean>(`synthesizeSections`) ?? false,
+        speculativeGeneration: config.get<boolean>(`speculativeGeneration`) ?? false,
+        speculationDelay: config.get<number>(`speculationDelay`) ?? 1500,
+        speculationTokensPerHour: config.get<number>(`speculationTokensPerHour`) ?? 20000,
+        endpoints: config.get<IEndpoint[]>(`endpoints`) ?? [],
+        endpointRouting: config.get<string>(`endpointRouting`) ?? 'latency',
     };
     return workspaceSetting;
 }
@@ -160,6 +194,20 @@ export async function getGlobalSettings(namespace: string, includeInterpreter?:
         showProgressNotification: getGlobalValue<boolean>(config, `showProgressNotification`, true),
         codeAnalyzer: getGlobalValue<string>(config, 'codeAnalyzer', 'jedi'),
         proxy: getProxy(namespace),
+        maxConnections: getGlobalValue<number>(config, 'maxConnections', 10),
+        connectionIdleTimeout: getGlobalValue<number>(config, 'connectionIdleTimeout', 60),
+        streamResponse: getGlobalValue<boolean>(config, 'streamResponse', true),
+        maxConcurrentRequests: getGlobalValue<number>(config, 'maxConcurrentRequests', 4),
+        maxRequestsPerMinute: getGlobalValue<number>(config, 'maxRequestsPerMinute', 0),
+        maxEntitiesPerRequest: getGlobalValue<number>(config, 'maxEntitiesPerRequest', 5),
+        promptTokenBudget: getGlobalValue<number>(config, 'promptTokenBudget', 0),
+        summarizeClasses: getGlobalValue<boolean>(config, 'summarizeClasses', true),
+        synthesizeSections: getGlobalValue<boolean>(config, 'synthesizeSections', false),
+        speculativeGeneration: getGlobalValue<boolean>(config, 'speculativeGeneration', false),
+        speculationDelay: getGlobalValue<number>(config, 'speculationDelay', 1500),
+        speculationTokensPerHour: getGlobalValue<number>(config, 'speculationTokensPerHour', 20000),
+        endpoints: getGlobalValue<IEndpoint[]>(config, 'endpoints', []),
+        endpointRouting: getGlobalValue<string>(config, 'endpointRouting', 'latency'),
     };
     return setting;
 }
@@ -178,6 +226,20 @@ export function checkIfConfigurationChanged(e: ConfigurationChangeEvent, namespa
         `${namespace}.proxy`,
         `${namespace}.proxyAuthorization`,
         `${namespace}.proxyStrictSSL`,
+        `${namespace}.maxConnections`,
+        `${namespace}.connectionIdleTimeout`,
+        `${namespace}.streamResponse`,
+        `${namespace}.maxConcurrentRequests`,
+        `${namespace}.maxRequestsPerMinute`,
+        `${namespace}.maxEntitiesPerRequest`,
+        `${namespace}.promptTokenBudget`,
+        `${namespace}.summarizeClasses`,
+        `${namespace}.synthesizeSections`,
+        `${namespace}.speculativeGeneration`,
+        `${namespace}.speculationDelay`,
+        `${namespace}.speculationTokensPerHour`,
+        `${namespace}.endpoints`,
+        `${namespace}.endpointRouting`,
         `http.proxy`,
         `http.proxyAuthorization`,
         `http.proxyStrictSSL`,
@@ -1,6 +1,11 @@
 import * as vscode from 'vscode';
 import { ApiKey } from './common/api-key';
-import { generateDocstring } from './common/generate-docstring';
+import {
+    generateAllDocstrings,
+    generateDocstring,
+    generateWorkspaceDocstrings,
+    registerSpeculation,
+} from './common/generate-docstring';
 import { getLSClientTraceLevel, registerLogger, traceLog, traceVerbose } from './common/logging';
 import { initializePython, onDidChangePythonInterpreter } from './common/python';
 import { ServerManager } from './common/server';
@@ -43,7 +48,9 @@ export async function activate(context: vscode.ExtensionContext): Promise<void>
     traceLog(`Module: ${serverInfo.module}`);
     traceVerbose(`Full Server Info: ${JSON.stringify(serverInfo)}`);
 
-    serverManager = new ServerManager(serverId, serverName, outputChannel);
+    // Workspace storage is not available if no folder is opened
+    const storagePath = (context.storageUri ?? context.globalStorageUri).fsPath;
+    serverManager = new ServerManager(serverId, serverName, outputChannel, storagePath);
 
     context.subscriptions.push(
         onDidChangePythonInterpreter(async () => {
@@ -65,6 +72,13 @@ export async function activate(context: vscode.ExtensionContext): Promise<void>
         registerCommand(`${serverId}.generateDocstring`, () => {
             generateDocstring(serverId, serverManager.lsClient, context.secrets);
         }),
+        registerCommand(`${serverId}.generateAllDocstrings`, () => {
+            generateAllDocstrings(serverId, serverManager.lsClient, context.secrets);
+        }),
+        registerCommand(`${serverId}.generateWorkspaceDocstrings`, () => {
+            generateWorkspaceDocstrings(serverId, serverManager.lsClient, context.secrets);
+        }),
+        registerSpeculation(serverId, () => serverManager.lsClient, context.secrets),
         registerLanguageStatusItem(serverId, serverName, `${serverId}.showLogs`),
     );
 
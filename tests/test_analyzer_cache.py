@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import lsprotocol.types as lsp
+from pygls.workspace import TextDocument
+
+from language_server.utils.code_analyzers.base import Position
+from language_server.utils.code_analyzers.cache import AnalyzerCache
+
+URI = "file:///module.py"
+CODE = "def foo():\n    return None\n"
+
+
+def test_same_version_is_analyzed_once() -> None:
+    cache = AnalyzerCache()
+    document = TextDocument(URI, CODE, version=1)
+    analyzer = cache.get_analyzer("ast", document)
+    assert cache.get_analyzer("ast", document) is analyzer
+    assert cache.get_analyzer("jedi", document) is not analyzer
+    assert len(cache) == 2
+
+
+def test_new_version_replaces_outdated_analyzer() -> None:
+    cache = AnalyzerCache()
+    analyzer = cache.get_analyzer("ast", TextDocument(URI, CODE, version=1))
+    new_analyzer = cache.get_analyzer("ast", TextDocument(URI, CODE, version=2))
+    assert new_analyzer is not analyzer
+    assert len(cache) == 1
+
+
+def test_unversioned_document_is_not_cached() -> None:
+    cache = AnalyzerCache()
+    document = TextDocument(URI, CODE)
+    assert cache.get_analyzer("ast", document) is not cache.get_analyzer(
+        "ast", document
+    )
+    assert len(cache) == 0
+
+
+def test_least_recently_used_analyzer_is_evicted() -> None:
+    cache = AnalyzerCache(maxsize=2)
+    first = TextDocument("file:///first.py", CODE, version=1)
+    second = TextDocument("file:///second.py", CODE, version=1)
+    third = TextDocument("file:///third.py", CODE, version=1)
+    analyzer = cache.get_analyzer("ast", first)
+    cache.get_analyzer("ast", second)
+    cache.get_analyzer("ast", first)
+    cache.get_analyzer("ast", third)
+    assert len(cache) == 2
+    assert cache.get_analyzer("ast", first) is analyzer
+
+
+def test_invalidate_removes_document_analyzers() -> None:
+    cache = AnalyzerCache()
+    document = TextDocument(URI, CODE, version=1)
+    cache.get_analyzer("ast", document)
+    cache.get_analyzer("jedi", document)
+    cache.get_analyzer("ast", TextDocument("file:///other.py", CODE, version=1))
+    cache.invalidate(URI)
+    assert len(cache) == 1
+
+
+def test_update_moves_incremental_analyzers_to_new_version() -> None:
+    cache = AnalyzerCache()
+    document = TextDocument(URI, CODE, version=1)
+    cache.get_analyzer("ast", document)
+    cache.get_analyzer("jedi", document)
+    change = lsp.TextDocumentContentChangeEvent_Type1(
+        range=lsp.Range(lsp.Position(1, 0), lsp.Position(1, 0)), text="    x = 1\n"
+    )
+    document.apply_change(change)
+    document.version = 2
+    cache.update(document, [change])
+    assert len(cache) == 1
+    entity = cache.get_analyzer("ast", document).get_context(Position(2, 5))
+    assert entity is not None
+    assert entity.code == "def foo():\n    x = 1\n    return None"
+
+
+def test_analyzers_of_file_documents_know_their_path() -> None:
+    cache = AnalyzerCache()
+    file_document = TextDocument(URI, CODE, version=1)
+    untitled_document = TextDocument("untitled:Untitled-1", CODE, version=1)
+    assert cache.get_analyzer("jedi", file_document)._path == file_document.path
+    assert cache.get_analyzer("jedi", untitled_document)._path is None
+
+
+def test_analyzer_of_outdated_version_is_not_cached() -> None:
+    cache = AnalyzerCache()
+    analyzer = cache.get_analyzer("ast", TextDocument(URI, CODE, version=2))
+    cache.get_analyzer("ast", TextDocument(URI, CODE, version=1))
+    assert len(cache) == 1
+    assert cache.get_analyzer("ast", TextDocument(URI, CODE, version=2)) is analyzer
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from unittest.mock import Mock
+
+import lsprotocol.types as lsp
+import pytest
+
+from language_server.utils.batch import (
+    AnalyzedFile,
+    BatchJournal,
+    WorkspaceJob,
+    apply_text_edits,
+    discover_python_files,
+    write_source,
+)
+
+
+def test_discover_python_files(tmp_path: Path) -> None:
+    for path in [
+        "module.py",
+        "package/__init__.py",
+        "package/README.md",
+        ".hidden/module.py",
+        "package/__pycache__/module.py",
+        "venv/lib/module.py",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+    (tmp_path / "venv" / "pyvenv.cfg").write_text("")
+
+    assert list(discover_python_files(str(tmp_path))) == [
+        str(tmp_path / "module.py"),
+        str(tmp_path / "package" / "__init__.py"),
+    ]
+
+
+def test_apply_text_edits() -> None:
+    source = 'def foo():\n    """Old."""\n    pass\n\ndef bar():\n    pass\n'
+    text_edits = [
+        lsp.TextEdit(
+            range=lsp.Range(lsp.Position(1, 0), lsp.Position(2, 0)), new_text=""
+        ),
+        lsp.TextEdit(
+            range=lsp.Range(lsp.Position(1, 0), lsp.Position(1, 0)),
+            new_text='    """New."""\n',
+        ),
+        lsp.TextEdit(
+            range=lsp.Range(lsp.Position(5, 0), lsp.Position(5, 0)),
+            new_text='    """Bar."""\n',
+        ),
+    ]
+    assert apply_text_edits(source, text_edits) == (
+        'def foo():\n    """New."""\n    pass\n\ndef bar():\n    """Bar."""\n    pass\n'
+    )
+
+
+def test_journal_is_resumed(tmp_path: Path) -> None:
+    path = str(tmp_path / "job.json")
+    journal = BatchJournal(path, ["/b", "/a"])
+    journal.complete("/a/module.py", "source")
+    digest = journal.completed_digest("/a/module.py")
+    assert digest is not None
+
+    assert BatchJournal(path, ["/a", "/b"]).completed_digest("/a/module.py") == digest
+    assert BatchJournal(path, ["/a"]).completed_digest("/a/module.py") is None
+
+    journal.finish()
+    assert BatchJournal(path, ["/a", "/b"]).completed_digest("/a/module.py") is None
+
+
+def test_journal_appends_records(tmp_path: Path) -> None:
+    path = tmp_path / "job.jsonl"
+    journal = BatchJournal(str(path), ["/a"])
+    journal.complete("/a/one.py", "one")
+    journal.complete("/a/two.py", "two")
+    assert len(path.read_text().splitlines()) == 3
+
+    # A record cut short by a crash is skipped
+    with open(path, "a") as file:
+        file.write('{"path": "/a/three.py", "dig')
+    resumed = BatchJournal(str(path), ["/a"])
+    assert len(resumed) == 2
+    resumed.complete("/a/three.py", "three")
+    assert len(BatchJournal(str(path), ["/a"])) == 3
+
+
+def test_write_source(tmp_path: Path) -> None:
+    path = tmp_path / "module.py"
+    path.write_text("x = 1\n")
+    assert not write_source(str(path), "x = 2\n", "y = 1\n")
+    assert write_source(str(path), "x = 1\n", "y = 1\n")
+    assert path.read_text() == "y = 1\n"
+
+
+@pytest.mark.asyncio
+async def test_workspace_job_bounds_files_in_progress() -> None:
+    max_documented_files = 3
+    job: WorkspaceJob[Mock] = WorkspaceJob(
+        Mock(),
+        1,
+        BatchJournal(None, []),
+        Mock(),
+        max_analyses=2,
+        max_documented_files=max_documented_files,
+        get_analysis=Mock(),
+        generate_edits=Mock(),
+    )
+    analyzing: list[str] = []
+    queued_or_documenting: list[str] = []
+    peaks = {"analyses": 0, "files": 0}
+
+    async def analyze_file(path: str) -> AnalyzedFile[Mock] | bool:
+        analyzing.append(path)
+        peaks["analyses"] = max(peaks["analyses"], len(analyzing))
+        await asyncio.sleep(0)
+        analyzing.remove(path)
+        if path.endswith("0.py"):
+            return False
+        queued_or_documenting.append(path)
+        peaks["files"] = max(peaks["files"], len(queued_or_documenting))
+        return AnalyzedFile(path, "", [Mock()])
+
+    async def document_file(path: str, analyzed_file: AnalyzedFile[Mock]) -> bool:
+        await asyncio.sleep(0.001)
+        queued_or_documenting.remove(path)
+        if path.endswith("1.py"):
+            raise OSError("disk full")
+        return True
+
+    job._analyze_file = analyze_file
+    job._document_file = document_file
+    file_paths = [f"/workspace/{i}.py" for i in range(50)]
+
+    assert await job.run(file_paths) == (40, 5)
+    assert peaks["analyses"] <= 2
+    # Documented files, queued files, and one analyzed file waiting for the queue
+    assert peaks["files"] <= 2 * max_documented_files + 2
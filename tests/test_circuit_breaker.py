@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError
+
+from language_server.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+REQUEST = httpx.Request("POST", "https://api.test/v1/chat/completions")
+
+
+async def fail(error: BaseException) -> None:
+    raise error
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_failures() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            async with breaker.guard("endpoint"):
+                await fail(asyncio.TimeoutError())
+
+    with pytest.raises(CircuitOpenError, match="endpoint is unreachable"):
+        async with breaker.guard("endpoint"):
+            pytest.fail("The request must not be sent")
+
+    # Other endpoints are not affected
+    async with breaker.guard("other"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_error_responses_close_circuit() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    with pytest.raises(APIConnectionError):
+        async with breaker.guard("endpoint"):
+            await fail(APIConnectionError(request=REQUEST))
+    response = httpx.Response(400, request=REQUEST)
+    with pytest.raises(BadRequestError):
+        async with breaker.guard("endpoint"):
+            await fail(BadRequestError("bad", response=response, body=None))
+    with pytest.raises(APIConnectionError):
+        async with breaker.guard("endpoint"):
+            await fail(APIConnectionError(request=REQUEST))
+
+    async with breaker.guard("endpoint"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_half_open_circuit_is_probed(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1000.0
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with pytest.raises(asyncio.TimeoutError):
+        async with breaker.guard("endpoint"):
+            await fail(asyncio.TimeoutError())
+
+    # A failed probe opens the circuit again
+    now += 31
+    with pytest.raises(asyncio.TimeoutError):
+        async with breaker.guard("endpoint"):
+            await fail(asyncio.TimeoutError())
+    with pytest.raises(CircuitOpenError):
+        async with breaker.guard("endpoint"):
+            pass
+
+    # Only one request probes the endpoint, and its success closes the circuit
+    now += 31
+    async with breaker.guard("endpoint"):
+        with pytest.raises(CircuitOpenError):
+            async with breaker.guard("endpoint"):
+                pass
+    async with breaker.guard("endpoint"):
+        pass
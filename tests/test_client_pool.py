@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+
+from language_server.utils.client_pool import ClientPool
+from language_server.utils.proxy import Proxy
+
+pytestmark = pytest.mark.asyncio
+
+BASE_URL = "https://api.openai.com/v1"
+
+
+async def test_client_is_reused() -> None:
+    pool = ClientPool()
+    async with pool.client(api_key="key", base_url=BASE_URL) as client:
+        pass
+    async with pool.client(api_key="key", base_url=BASE_URL) as same_client:
+        assert same_client is client
+    async with pool.client(api_key="other", base_url=BASE_URL) as other_client:
+        assert other_client is not client
+    proxy = Proxy("http://127.0.0.1:80")
+    async with pool.client(api_key="key", base_url=BASE_URL, proxy=proxy) as client_:
+        assert client_ is not client
+    assert len(pool) == 3
+    await pool.aclose()
+
+
+async def test_idle_client_is_closed() -> None:
+    pool = ClientPool()
+    async with pool.client(api_key="key", idle_timeout=-1) as client:
+        # A client in use is not closed
+        async with pool.client(api_key="key", idle_timeout=-1) as same_client:
+            assert same_client is client
+    async with pool.client(api_key="key", idle_timeout=-1) as new_client:
+        assert new_client is not client
+        assert client.is_closed()
+    assert len(pool) == 1
+    await pool.aclose()
+
+
+async def test_pool_is_closed() -> None:
+    pool = ClientPool()
+    async with pool.client(api_key="key") as client:
+        pass
+    await pool.aclose()
+    assert client.is_closed()
+    assert len(pool) == 0
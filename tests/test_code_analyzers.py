@@ -1,7 +1,16 @@
 from __future__ import annotations
 
+import ast
+
+import lsprotocol.types as lsp
 from pytest import FixtureRequest, fixture, mark
 
+from language_server.utils.code_analyzers.ast_analyzer import (
+    AstAnalyzer,
+    ASTContextResolver,
+    ASTIntervalContextResolver,
+    AstTolerantAnalyzer,
+)
 from language_server.utils.code_analyzers.base import (
     BaseClass,
     BaseFunction,
@@ -59,6 +68,8 @@ for i in "123":
     print(i)
 '''
 
+ANALYZERS = [{"name": "ast"}, {"name": "ast-tolerant"}, {"name": "jedi"}]
+
 
 @fixture(scope="module")
 def cursor(request: FixtureRequest) -> Position:
@@ -75,7 +86,7 @@ def code_entity(analyzer: BaseAnalyzer, cursor: Position) -> CodeEntity | None:
     return analyzer.get_context(cursor)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize("cursor", [{"position": (2, 10)}], indirect=True)
 def test_class(code_entity: CodeEntity | None) -> None:
     assert isinstance(code_entity, BaseClass)
@@ -105,7 +116,7 @@ def test_class(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(2, 10)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize("cursor", [{"position": (40, 10)}], indirect=True)
 def test_nested_class(code_entity: CodeEntity | None) -> None:
     assert isinstance(code_entity, BaseClass)
@@ -123,7 +134,7 @@ def test_nested_class(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(40, 17)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [{"position": (3, 5)}, {"position": (3, 28)}],
@@ -142,7 +153,7 @@ def test_class_oneline_method(code_entity: CodeEntity | None) -> None:
     ) or code_entity.signature_end == Position(3, 23)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [{"position": (5, 5)}, {"position": (7, 20)}, {"position": (9, 15)}],
@@ -170,7 +181,7 @@ def test_class_method(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(7, 20)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor", [{"position": (11, 10)}, {"position": (14, 11)}], indirect=True
 )
@@ -194,7 +205,7 @@ def test_outer_func(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(11, 17)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor", [{"position": (12, 5)}, {"position": (13, 12)}], indirect=True
 )
@@ -208,7 +219,7 @@ def test_inner_func(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(12, 21)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [{"position": (16, 21)}, {"position": (17, 12)}, {"position": (18, 15)}],
@@ -232,7 +243,7 @@ def test_func_with_docstring(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(16, 21)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [{"position": (20, 16)}, {"position": (22, 7)}, {"position": (25, 4)}],
@@ -262,7 +273,7 @@ def test_func_with_multiline_docstring(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(20, 31)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor", [{"position": (27, 13)}, {"position": (28, 15)}], indirect=True
 )
@@ -276,7 +287,7 @@ def test_async_func(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(27, 23)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor", [{"position": (30, 8)}, {"position": (30, 31)}], indirect=True
 )
@@ -293,7 +304,7 @@ def test_oneline_func(code_entity: CodeEntity | None) -> None:
     )  # `ast` and `jedi` have difference
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [
@@ -316,7 +327,7 @@ def test_func_with_ignore_typing(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(line=32, character=42)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [{"position": (35, 12)}, {"position": (36, 12)}, {"position": (37, 7)}],
@@ -338,7 +349,7 @@ def test_func_starting_with_comment(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(line=35, character=28)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize("cursor", [{"position": (39, 24)}], indirect=True)
 def test_func_with_nested_class(code_entity: CodeEntity | None) -> None:
     assert isinstance(code_entity, BaseFunction)
@@ -360,7 +371,7 @@ def test_func_with_nested_class(code_entity: CodeEntity | None) -> None:
     assert code_entity.signature_end == Position(line=39, character=24)
 
 
-@mark.parametrize("analyzer", [{"name": "ast"}, {"name": "jedi"}], indirect=True)
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
 @mark.parametrize(
     "cursor",
     [
@@ -384,3 +395,206 @@ def test_module(code_entity: CodeEntity | None) -> None:
     assert code_entity.docstring_range is None
     assert len(code_entity.code_lines) == 45
     assert len(code_entity.code) in (669, 668)  # `ast` and `jedi` have difference
+
+
+def test_interval_context_resolver_matches_visitor() -> None:
+    tree = ast.parse(CODE)
+    for line in range(len(CODE.splitlines()) + 2):
+        for character in range(40):
+            cursor = Position(line, character)
+            expected = ASTContextResolver(cursor, tree)
+            actual = ASTIntervalContextResolver(cursor, tree)
+            assert actual.get_current_context() is expected.get_current_context()
+            assert actual.find_function_node() is expected.find_function_node()
+            assert actual.find_class_node() is expected.find_class_node()
+            assert actual.find_module_node() is expected.find_module_node()
+
+
+def test_ast_analyzer_with_changes() -> None:
+    analyzer = AstAnalyzer(CODE)
+    # Insert a new line into the body of `outer_func`
+    change = lsp.TextDocumentContentChangeEvent_Type1(
+        range=lsp.Range(lsp.Position(13, 0), lsp.Position(13, 0)),
+        text="    x = 1\n",
+    )
+    lines = CODE.splitlines(keepends=True)
+    changed_code = "".join([*lines[:13], "    x = 1\n", *lines[13:]])
+    changed_analyzer = analyzer.with_changes(changed_code, [change])
+    fresh_analyzer = AstAnalyzer(changed_code)
+
+    for line, character in [(2, 10), (11, 10), (14, 5), (17, 12), (41, 10), (45, 0)]:
+        cursor = Position(line, character)
+        expected = fresh_analyzer.get_context(cursor)
+        actual = changed_analyzer.get_context(cursor)
+        assert type(actual) is type(expected)
+        assert actual is not None and expected is not None
+        assert actual.code == expected.code
+        assert actual.docstring_range == expected.docstring_range
+        if isinstance(expected, (BaseClass, BaseFunction)):
+            assert isinstance(actual, (BaseClass, BaseFunction))
+            assert actual.name == expected.name
+            assert actual.code_range == expected.code_range
+            assert actual.signature_end == expected.signature_end
+
+    # Only the changed block has been parsed again
+    reused = {id(block.tree) for block in analyzer._blocks}
+    changed = [id(block.tree) not in reused for block in changed_analyzer._blocks]
+    assert changed.count(True) == 1
+
+
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
+@mark.parametrize("cursor", [{"position": (7, 12)}], indirect=True)
+def test_entity_is_memoized(code_entity: CodeEntity | None) -> None:
+    assert isinstance(code_entity, BaseFunction)
+    assert not hasattr(code_entity, "__dict__")
+    assert code_entity.code_lines is code_entity.code_lines
+    assert code_entity.code_range is code_entity.code_range
+    assert code_entity.signature_end is code_entity.signature_end
+
+
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
+def test_iter_entities(analyzer: BaseAnalyzer) -> None:
+    entities = list(analyzer.iter_entities())
+    assert [entity.name for entity in entities] == [
+        "Foo",
+        "__init__",
+        "sum",
+        "outer_func",
+        "inner_func",
+        "with_docstring",
+        "with_multiline_docstring",
+        "async_func",
+        "oneline_func",
+        "with_ignore_typing",
+        "starting_with_comment",
+        "with_nested_class",
+        "newcls",
+        "__new__",
+    ]
+    assert [entity.name for entity in entities if entity.has_docstring] == [
+        "with_docstring",
+        "with_multiline_docstring",
+    ]
+    # The entities are the same as the ones found by the cursor
+    for entity in entities:
+        signature_end = entity.signature_end
+        cursor = Position(signature_end.line, signature_end.character - 1)
+        code_entity = analyzer.get_context(cursor)
+        assert isinstance(code_entity, type(entity))
+        assert code_entity.code_range == entity.code_range
+        assert code_entity.code == entity.code
+
+
+@mark.parametrize("analyzer", ANALYZERS, indirect=True)
+def test_entities_in_range(analyzer: BaseAnalyzer) -> None:
+    range_ = Range(Position(5, 0), Position(13, 0))
+    entities = analyzer.entities_in_range(range_)
+    assert [entity.name for entity in entities] == ["sum", "outer_func", "inner_func"]
+
+
+FINGERPRINT_CODE = """
+def sum(x: int, y: int):
+    \"\"\"Old docstring.\"\"\"
+    result = x + y
+    return result
+"""
+REFORMATTED_CODE = """
+class Foo:
+    def sum(x: int,
+            y: int):  # comment
+        # comment
+        result = x+y
+
+        return result
+"""
+CHANGED_CODE = FINGERPRINT_CODE.replace("x + y", "x - y")
+
+
+@mark.parametrize("name", ["ast", "ast-tolerant", "jedi"])
+def test_fingerprint(name: str) -> None:
+    def get_fingerprint(code: str, cursor: Position) -> str:
+        analyzer = AnalyzerFactory.create_analyzer(name, code)
+        code_entity = analyzer.get_function(cursor)
+        assert isinstance(code_entity, BaseFunction)
+        return code_entity.fingerprint
+
+    fingerprint = get_fingerprint(FINGERPRINT_CODE, Position(4, 5))
+    assert get_fingerprint(REFORMATTED_CODE, Position(6, 9)) == fingerprint
+    assert get_fingerprint(CHANGED_CODE, Position(4, 5)) != fingerprint
+
+
+UNCLOSED_QUOTES_CODE = CODE.replace('    """ docstring """', '    """')
+INVALID_METHOD_CODE = CODE.replace("result = x + y", "result = = x + y")
+UNCLOSED_BRACKET_CODE = CODE.replace("pass\n    return None", "pass\n    return (")
+
+
+@mark.parametrize(
+    "code, cursor, name",
+    [
+        # Unclosed triple quotes are paired with the docstring of the next function
+        (UNCLOSED_QUOTES_CODE, Position(17, 7), "with_docstring"),
+        # Other definitions are analyzed despite a syntax error
+        (INVALID_METHOD_CODE, Position(12, 5), "inner_func"),
+        (INVALID_METHOD_CODE, Position(9, 10), "sum"),
+        (UNCLOSED_BRACKET_CODE, Position(28, 5), "async_func"),
+    ],
+)
+def test_ast_tolerant_analyzer(code: str, cursor: Position, name: str) -> None:
+    code_entity = AstTolerantAnalyzer(code).get_context(cursor)
+    assert isinstance(code_entity, BaseFunction)
+    assert code_entity.name == name
+    assert code_entity.docstring_range is None
+
+
+def test_ast_tolerant_analyzer_with_form_feed() -> None:
+    # Form feeds do not break lines for the parser
+    code = INVALID_METHOD_CODE.replace("pass\n\n", "pass\n\f\n", 1)
+    code_entity = AstTolerantAnalyzer(code).get_context(Position(28, 5))
+    assert isinstance(code_entity, BaseFunction)
+    assert code_entity.name == "async_func"
+    assert code_entity.code_range.start.line == 27
+    assert code_entity.signature_end == Position(27, 23)
+
+
+SUMMARY_CODE = '''
+def outer():
+    class Foo(Base):
+        """Foo."""
+
+        name: str = "foo"
+
+        def __init__(self, name: str) -> None:
+            self.name = name
+
+        @property
+        def upper(self) -> str:
+            """The upper name."""
+            # The name is not empty
+            return self.name.upper()
+
+        def short(self): return self.name[:3]
+'''
+
+
+@mark.parametrize("name", ["ast", "ast-tolerant", "jedi"])
+def test_class_summary(name: str) -> None:
+    analyzer = AnalyzerFactory.create_analyzer(name, SUMMARY_CODE)
+    code_entity = analyzer.get_class(Position(3, 11))
+    assert isinstance(code_entity, BaseClass)
+    assert [method.name for method in code_entity.methods] == [
+        "__init__",
+        "upper",
+        "short",
+    ]
+    assert code_entity.clean_code() == (
+        "class Foo(Base):\n"
+        '    name: str = "foo"\n'
+        "    def __init__(self, name: str) -> None:\n"
+        "        ...\n"
+        "    @property\n"
+        "    def upper(self) -> str:\n"
+        '        """The upper name."""\n'
+        "        ...\n"
+        "    def short(self): return self.name[:3]"
+    )
+    assert "self.name = name" in code_entity.clean_code(skip=["method_bodies"])
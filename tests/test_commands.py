@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from dataclasses import asdict
+from pathlib import Path
+from typing import AsyncIterator
+from unittest.mock import Mock
+
+import pytest
+from lsprotocol import types as lsp
+from pygls import uris
+from pygls.workspace import Workspace
+from tests.test_language_server import GlobalSettings
+
+from language_server import commands, server, settings
+from language_server.utils.routing import Endpoint
+from language_server.utils.scheduler import Priority
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+def create_server(tmp_path: Path, code: str = CODE) -> server.DocstringLanguageServer:
+    """Creates a server with a workspace of one document, applying the edits."""
+    root_uri = uris.from_fs_path(str(tmp_path))
+    ls = server.create_server()
+    ls.lsp._workspace = Workspace(root_uri)
+    ls.workspace.put_text_document(
+        lsp.TextDocumentItem(
+            uri=f"{root_uri}/sample.py", language_id="python", version=0, text=code
+        )
+    )
+    global_settings = {**asdict(GlobalSettings()), "streamResponse": True}
+    ls.global_settings = settings.GlobalSettings(global_settings)
+    ls.workspace_settings = settings.WorkspaceSettings(
+        [{**global_settings, "workspace": root_uri}], ls.global_settings
+    )
+    ls.show_message_log = Mock()
+    ls.show_message = Mock()
+    ls.progress.report = Mock()
+
+    async def apply_edit_async(
+        edit: lsp.WorkspaceEdit,
+    ) -> lsp.ApplyWorkspaceEditResult:
+        for change in edit.document_changes or []:
+            assert isinstance(change, lsp.TextDocumentEdit)
+            document = ls.workspace.get_text_document(change.text_document.uri)
+            if document.version != change.text_document.version:
+                return lsp.ApplyWorkspaceEditResult(applied=False)
+            for text_edit in change.edits:
+                document.apply_change(
+                    lsp.TextDocumentContentChangeEvent_Type1(
+                        range=text_edit.range, text=text_edit.new_text
+                    )
+                )
+            document.version = (document.version or 0) + 1
+        return lsp.ApplyWorkspaceEditResult(applied=True)
+
+    ls.apply_edit_async = apply_edit_async  # type: ignore
+    return ls
+
+
+async def test_concurrent_streaming_requests_share_one_api_call(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ls = create_server(tmp_path)
+    calls = []
+
+    async def stream_docstring(**kwargs: str) -> AsyncIterator[str]:
+        calls.append(kwargs["prompt"])
+        yield '"""Add two numbers.\n'
+        await asyncio.sleep(0.05)
+        yield '"""Add two numbers.\n"""'
+
+    monkeypatch.setattr(commands, "stream_docstring", stream_docstring)
+    uri = (tmp_path / "sample.py").as_uri()
+    args: tuple[commands.TextDocumentPosition, str, int] = (
+        {"textDocument": {"uri": uri}, "position": {"line": 1, "character": 4}},
+        "api-key",
+        1,
+    )
+
+    results = await asyncio.gather(
+        commands.apply_generate_docstring(ls, args),
+        commands.apply_generate_docstring(ls, args),
+    )
+
+    assert results == [True, True]
+    assert len(calls) == 1
+    source = ls.workspace.get_text_document(uri).source
+    assert source.count("Add two numbers.") == 1
+    ls.analysis_executor.shutdown()
+    ls.loop.close()
+
+
+async def test_streamed_response_is_routed_by_time_to_first_token(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ls = create_server(tmp_path)
+    endpoint = Endpoint(None, "other-model", "api-key")
+    models = []
+
+    async def stream_docstring(**kwargs: str) -> AsyncIterator[str]:
+        models.append(kwargs["model"])
+        yield '"""Add two numbers.\n'
+        await asyncio.sleep(0.2)
+        yield '"""Add two numbers.\n"""'
+
+    monkeypatch.setattr(commands, "stream_docstring", stream_docstring)
+    monkeypatch.setattr(
+        commands, "_get_endpoints", lambda ls, settings, api_key: [endpoint]
+    )
+    # Key the responses by their model only
+    monkeypatch.setattr(
+        commands.DocstringCache, "make_key", staticmethod(lambda **key: key["model"])
+    )
+    uri = (tmp_path / "sample.py").as_uri()
+    args: tuple[commands.TextDocumentPosition, str, int] = (
+        {"textDocument": {"uri": uri}, "position": {"line": 1, "character": 4}},
+        "api-key",
+        1,
+    )
+
+    assert await commands.apply_generate_docstring(ls, args)
+    assert models == ["other-model"]
+    assert ls.docstring_cache.get("other-model") == '"""Add two numbers.\n"""'
+    assert ls.docstring_cache.get(GlobalSettings().aiModel) is None
+    [latency] = ls.router._samples(endpoint, streamed=True)
+    assert latency < 0.2
+    assert not ls.router._samples(endpoint)
+    ls.analysis_executor.shutdown()
+    ls.loop.close()
+
+
+async def test_shared_docstring_is_not_assumed_inserted_elsewhere(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ls = create_server(tmp_path, f"{CODE}\n\n{CODE}")
+    uri = (tmp_path / "sample.py").as_uri()
+    document = ls.workspace.get_text_document(uri)
+    calls = []
+
+    async def stream_docstring(**kwargs: str) -> AsyncIterator[str]:
+        calls.append(kwargs["prompt"])
+        await asyncio.sleep(0.05)
+        yield '"""Add two numbers."""'
+
+    monkeypatch.setattr(commands, "stream_docstring", stream_docstring)
+
+    def args(line: int) -> tuple[commands.TextDocumentPosition, str, int]:
+        return (
+            {"textDocument": {"uri": uri}, "position": {"line": line, "character": 4}},
+            "api-key",
+            1,
+        )
+
+    results = await asyncio.gather(
+        commands.apply_generate_docstring(ls, args(1)),
+        commands.apply_generate_docstring(ls, args(4)),
+    )
+
+    # The same docstring is shared, but inserted only into the first function
+    assert len(calls) == 1
+    assert results == [True, False]
+    assert document.source.count("Add two numbers.") == 1
+    ls.analysis_executor.shutdown()
+    ls.loop.close()
+
+
+async def test_local_wait_does_not_open_circuit(tmp_path: Path) -> None:
+    ls = create_server(tmp_path)
+    document = ls.workspace.get_text_document((tmp_path / "sample.py").as_uri())
+    settings_ = ls.workspace_settings.get_settings_for_document(document)
+    endpoint = settings_["baseUrl"]
+
+    async def request(client: object, model: str) -> str:
+        pytest.fail("The request must not be sent")
+
+    # Take all the interactive slots of the endpoint
+    async with contextlib.AsyncExitStack() as stack:
+        for _ in range(settings_["maxConcurrentRequests"] + 1):
+            await stack.enter_async_context(
+                ls.scheduler.slot(
+                    endpoint,
+                    priority=Priority.INTERACTIVE,
+                    max_concurrent=settings_["maxConcurrentRequests"],
+                    folder=settings_["workspaceFS"],
+                )
+            )
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            deadline = ls.loop.time() + 0.01
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    commands._route_request(
+                        ls,
+                        settings_,
+                        commands._get_endpoints(ls, settings_, "api-key"),
+                        None,
+                        deadline,
+                        request,
+                    ),
+                    0.05,
+                )
+
+    circuit = commands._describe_endpoint(settings_, endpoint)
+    assert ls.circuit_breaker.is_available(circuit)
+    ls.analysis_executor.shutdown()
+    ls.loop.close()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from language_server.utils.docstring_cache import DocstringCache
+
+KEY_ARGS = {
+    "fingerprint": "0123456789abcdef",
+    "model": "gpt-4o-mini",
+    "docstring_style": "google",
+    "prompt_pattern": "Generate a {docstring_style}-style docstring:\n{code}",
+    "base_url": "https://api.openai.com/v1",
+    "summarize_classes": True,
+    "token_budget": 4000,
+}
+
+
+def test_key_depends_on_all_arguments() -> None:
+    key = DocstringCache.make_key(**KEY_ARGS)
+    assert DocstringCache.make_key(**KEY_ARGS) == key
+    for name, value in KEY_ARGS.items():
+        other = not value if isinstance(value, bool) else "other"
+        assert DocstringCache.make_key(**{**KEY_ARGS, name: other}) != key
+
+
+def test_least_recently_used_response_is_evicted() -> None:
+    cache = DocstringCache(maxsize=2)
+    cache.set("a", "docstring a")
+    cache.set("b", "docstring b")
+    assert cache.get("a") == "docstring a"
+    cache.set("c", "docstring c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "docstring a"
+    assert len(cache) == 2
+
+
+def test_responses_are_persisted(tmp_path: Path) -> None:
+    path = str(tmp_path / "storage" / "docstrings.sqlite3")
+    cache = DocstringCache(path)
+    cache.set("a", "docstring a")
+    cache.close()
+    assert DocstringCache(path).get("a") == "docstring a"
+    assert DocstringCache().get("a") is None
+
+
+def test_disk_size_is_limited(tmp_path: Path) -> None:
+    path = str(tmp_path / "docstrings.sqlite3")
+    cache = DocstringCache(path, maxsize=0, max_disk_size=20)
+    cache.set("a", "docstring a")
+    cache.set("b", "docstring b")
+    assert cache.get("a") is None
+    assert cache.get("b") == "docstring b"
+
+
+def test_unavailable_storage_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_text("")
+    cache = DocstringCache(str(path / "docstrings.sqlite3"))
+    cache.set("a", "docstring a")
+    assert cache.get("a") == "docstring a"
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import pytest
+
+from language_server.utils.docstring_sections import (
+    DocstringSections,
+    Parameter,
+    get_signature,
+    parse_sections,
+    render_docstring,
+)
+
+FUNCTION_CODE = """def scale(self, factor: float, *, offset: int = 0) -> float:
+    def check(value):
+        raise TypeError("nested")
+    if factor < 0:
+        raise ValueError("negative")
+    return self.value * factor + offset"""
+
+SECTIONS = DocstringSections(
+    summary="Scales the value.",
+    description="",
+    params={"factor": "The scale factor.", "offset": "The added offset."},
+    returns="The scaled value.",
+    raises={"ValueError": "If the factor is negative."},
+)
+
+
+def test_get_signature() -> None:
+    signature = get_signature(FUNCTION_CODE)
+    assert signature is not None
+    assert signature.parameters == [
+        Parameter("factor", "float", None),
+        Parameter("offset", "int", "0"),
+    ]
+    assert signature.returns == "float"
+    assert signature.returns_value
+    assert not signature.yields
+    assert signature.raises == ["ValueError"]
+
+
+def test_get_class_signature() -> None:
+    code = (
+        "class Foo:\n"
+        "    def __init__(self, x, *args, **kwargs): ...\n"
+        "    def bar(self): ..."
+    )
+    signature = get_signature(code)
+    assert signature is not None
+    assert [parameter.name for parameter in signature.parameters] == [
+        "x",
+        "*args",
+        "**kwargs",
+    ]
+    assert not signature.returns_value
+
+
+def test_get_signature_of_invalid_code() -> None:
+    assert get_signature("def foo(:") is None
+
+
+@pytest.mark.parametrize(
+    "response",
+    ['"""Docstring."""', '{"description": "No summary."}', "{not json}"],
+)
+def test_parse_invalid_sections(response: str) -> None:
+    assert parse_sections(response) is None
+
+
+def test_parse_sections() -> None:
+    response = (
+        'Sure:\n{"summary": "Scales the value.", "params": {"*factor": "Factor."},'
+        ' "raises": []}'
+    )
+    assert parse_sections(response) == DocstringSections(
+        "Scales the value.", "", {"factor": "Factor."}, "", {}
+    )
+
+
+@pytest.mark.parametrize(
+    "style, expected",
+    [
+        (
+            "google",
+            """Scales the value.
+
+Args:
+    factor (float): The scale factor.
+    offset (int, optional): The added offset. Defaults to 0.
+
+Returns:
+    float: The scaled value.
+
+Raises:
+    ValueError: If the factor is negative.""",
+        ),
+        (
+            "numpy",
+            """Scales the value.
+
+Parameters
+----------
+factor : float
+    The scale factor.
+offset : int, optional
+    The added offset. Default is 0.
+
+Returns
+-------
+float
+    The scaled value.
+
+Raises
+------
+ValueError
+    If the factor is negative.""",
+        ),
+        (
+            "sphinx",
+            """Scales the value.
+
+:param factor: The scale factor.
+:type factor: float
+:param offset: The added offset. Defaults to 0.
+:type offset: int
+:return: The scaled value.
+:rtype: float
+:raises ValueError: If the factor is negative.""",
+        ),
+    ],
+)
+def test_render_docstring(style: str, expected: str) -> None:
+    signature = get_signature(FUNCTION_CODE)
+    assert render_docstring(SECTIONS, signature, style) == expected
+
+
+def test_render_docstring_without_signature() -> None:
+    assert render_docstring(SECTIONS, None, "google") == "Scales the value."
@@ -17,6 +17,7 @@ from pytest_asyncio import fixture as async_fixture
 
 from language_server.commands import (
     CommandArguments,
+    DocumentCommandArguments,
     Position,
     TextDocument,
     TextDocumentPosition,
@@ -63,6 +64,20 @@ class GlobalSettings:
     showProgressNotification: bool = True
     codeAnalyzer: str = "jedi"
     proxy: ProxySettings = field(default_factory=ProxySettings)
+    maxConnections: int = 10
+    connectionIdleTimeout: int = 60
+    streamResponse: bool = False
+    maxConcurrentRequests: int = 4
+    maxRequestsPerMinute: int = 0
+    maxEntitiesPerRequest: int = 5
+    promptTokenBudget: int = 0
+    summarizeClasses: bool = True
+    synthesizeSections: bool = False
+    speculativeGeneration: bool = False
+    speculationDelay: int = 1500
+    speculationTokensPerHour: int = 20000
+    endpoints: list[dict] = field(default_factory=list)
+    endpointRouting: str = "latency"
 
 
 @dataclass
@@ -187,7 +202,10 @@ async def test_generate_docstring_command(
     # Check that the command has been registered by the server
     assert initialize_result.capabilities.execute_command_provider
     assert initialize_result.capabilities.execute_command_provider.commands == [
-        command_name
+        command_name,
+        "chatgpt-docstrings.applyGenerateAll",
+        "chatgpt-docstrings.applyGenerateWorkspace",
+        "chatgpt-docstrings.speculate",
     ]
 
     # Exetute the command
@@ -211,3 +229,34 @@ async def test_generate_docstring_command(
     assert remove_docstring.new_text == ""
     assert str(add_docstring.range) == "16:0-16:0"
     assert add_docstring.new_text == '    """docstring"""\n'
+
+
+async def test_generate_all_docstrings_command(client: LanguageClient) -> None:
+    command_arguments = DocumentCommandArguments(
+        text_document=TextDocument(uri=WORKSPACE_FILE_URI),
+        api_key="",
+        progress_token=2,
+    )
+    apply_edit_count = client.apply_edit.call_count
+
+    # Exetute the command
+    response = await client.workspace_execute_command_async(
+        lsp.ExecuteCommandParams(
+            command="chatgpt-docstrings.applyGenerateAll",
+            arguments=list(command_arguments),
+        )
+    )
+    assert response
+
+    # Check that all docstrings were added with a single 'workspace/applyEdit'
+    assert client.apply_edit.call_count == apply_edit_count + 1
+    apply_edit_params = client.apply_edit.call_args.args[0]
+    document_changes = apply_edit_params.edit.document_changes
+    assert len(document_changes) == 1
+    edits = document_changes[0].edits
+    assert [str(edit.range) for edit in edits] == ["4:0-4:0", "12:0-12:0", "20:0-20:0"]
+    assert [edit.new_text for edit in edits] == [
+        '        """docstring"""\n',
+        '    """docstring"""\n',
+        '    """docstring"""\n',
+    ]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import ast
+
+from language_server.utils.code_analyzers.ast_analyzer import get_source_segment
+from language_server.utils.code_analyzers.line_index import LineIndex
+
+CODE = 'x = "é"\r\ndef föo():\f\r    return "日本"\n\n'
+
+
+def test_lines_are_split_at_line_breaks() -> None:
+    line_index = LineIndex(CODE)
+    assert len(line_index) == 5
+    assert line_index.lines(0, 5) == [
+        'x = "é"',
+        "def föo():\f",
+        '    return "日本"',
+        "",
+        "",
+    ]
+    assert line_index.line(0, keepends=True) == 'x = "é"\r\n'
+    assert line_index.line_of(CODE.index("return")) == 2
+
+
+def test_utf8_columns_are_converted_to_offsets() -> None:
+    line_index = LineIndex(CODE)
+    assert line_index.offset(2, 12, utf8=True) == CODE.index("日")
+    assert line_index.offset(2, 15, utf8=True) == CODE.index("本")
+    assert line_index.offset(2, 13) == CODE.index("本")
+    assert line_index.segment(1, 4, 1, 8, utf8=True) == "föo"
+
+
+def test_source_segment_matches_ast() -> None:
+    line_index = LineIndex(CODE)
+    for node in ast.walk(ast.parse(CODE)):
+        if isinstance(node, (ast.expr, ast.stmt)):
+            expected = ast.get_source_segment(CODE, node)
+            assert get_source_segment(line_index, node) == expected
+
+
+def test_padded_source_segment() -> None:
+    function = ast.parse(CODE).body[1]
+    assert isinstance(function, ast.FunctionDef)
+    node = function.body[0]
+    assert get_source_segment(CODE, node, padded=True) == '    return "日本"'
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import pytest
+
+from language_server.utils.docstring import (
+    PackedResponseError,
+    pack_prompts,
+    unpack_response,
+)
+
+
+def test_pack_prompts() -> None:
+    assert pack_prompts(["Document foo", "Document bar"]) == (
+        "### Request 1\nDocument foo\n\n### Request 2\nDocument bar"
+    )
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        '{"1": "Foo.", "2": "Bar.\\n\\nReturns:\\n    None."}',
+        '```json\n{"2": "Bar.\\n\\nReturns:\\n    None.", "1": "Foo."}\n```',
+    ],
+)
+def test_unpack_response(response: str) -> None:
+    assert unpack_response(response, 2) == ["Foo.", "Bar.\n\nReturns:\n    None."]
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        '"""Foo."""',
+        '{"1": "Foo.", "2": ',
+        '{"1": "Foo."}',
+        '{"1": "Foo.", "2": ""}',
+        '{"1": "Foo.", "2": ["Bar."]}',
+    ],
+)
+def test_invalid_response_is_rejected(response: str) -> None:
+    with pytest.raises(PackedResponseError):
+        unpack_response(response, 2)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import pytest
+
+from language_server.utils.prompt import (
+    build_prompt,
+    elide_code,
+    estimate_tokens,
+    get_token_budget,
+)
+
+CLASS_CODE = '''@dataclass
+class Foo(Base):
+    NAMES = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]
+
+    def __init__(self, x: int, y: int = 0) -> None:
+        """Creates a foo."""
+        self.a = x
+        self.b = y
+        self.c = x
+        self.d = y
+        if x < 0:
+            raise ValueError("negative")
+        for i in range(x):
+            print(i)
+
+    def total(self) -> int:
+        values = [self.a, self.b, self.c, self.d]
+        return sum(values)'''
+
+
+def test_estimate_tokens() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("def foo(bar):") == 6
+    assert estimate_tokens("return 1234567") == 5
+
+
+def test_get_token_budget() -> None:
+    assert get_token_budget("gpt-4o-mini") == 8000
+    assert get_token_budget("gpt-4-0613") == 4000
+    assert get_token_budget("unknown-model") == 4000
+
+
+def test_code_within_budget_is_kept() -> None:
+    assert elide_code(CLASS_CODE, estimate_tokens(CLASS_CODE)) == CLASS_CODE
+
+
+def test_literals_and_repeated_statements_are_elided_first() -> None:
+    code = elide_code(CLASS_CODE, estimate_tokens(CLASS_CODE) - 30)
+    assert "NAMES = ['a', 'b', 'c', ...]" in code
+    assert "self.b = y\n        ...\n        if x < 0:" in code
+    assert "for i in range(x):" in code
+
+
+def test_long_docstrings_are_kept() -> None:
+    docstring = "Adds the numbers, " * 10
+    code = CLASS_CODE.replace('"""Creates a foo."""', f'"""{docstring}"""')
+    elided_code = elide_code(code, estimate_tokens(code) - 30)
+    assert f'"""{docstring}"""' in elided_code
+    assert "raise ValueError('negative')" in elided_code
+
+
+def test_nested_bodies_are_elided() -> None:
+    code = elide_code(CLASS_CODE, 140)
+    assert code == (
+        "@dataclass\n"
+        "class Foo(Base):\n"
+        "    NAMES = ['a', 'b', 'c', ...]\n"
+        "\n"
+        "    def __init__(self, x: int, y: int=0) -> None:\n"
+        '        """Creates a foo."""\n'
+        "        ...\n"
+        "        raise ValueError('negative')\n"
+        "\n"
+        "    def total(self) -> int:\n"
+        "        ...\n"
+        "        return sum(values)"
+    )
+    assert estimate_tokens(code) <= 140
+
+
+@pytest.mark.parametrize("code", [CLASS_CODE, "def foo(:\n" + "    pass\n" * 50])
+def test_code_is_truncated_to_fit(code: str) -> None:
+    elided_code = elide_code(code, 20)
+    assert elided_code.endswith("\n...")
+    assert estimate_tokens(elided_code) <= 20
+
+
+def test_build_prompt() -> None:
+    prompt, saved_tokens = build_prompt(
+        "Generate a {docstring_style} docstring for the {entity}:\n{code}",
+        docstring_style="google",
+        entity="class",
+        code=CLASS_CODE,
+        max_tokens=150,
+    )
+    assert prompt.startswith("Generate a google docstring for the class:\n@dataclass")
+    assert estimate_tokens(prompt) <= 150
+    assert saved_tokens > 0
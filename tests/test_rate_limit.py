@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+from language_server.utils.rate_limit import RateLimiter, TokenBucket, parse_duration
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("1s", 1), ("6m0s", 360), ("20ms", 0.02), ("1h2m3.5s", 3723.5), ("", 0)],
+)
+def test_parse_duration(value: str, expected: float) -> None:
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+def test_token_bucket_sync() -> None:
+    bucket = TokenBucket(capacity=100, rate=100 / 60, level=100)
+    bucket.take(30)
+    assert bucket.delay(50) == 0
+
+    bucket.sync(limit=1000, remaining=10, reset=9.9)
+    assert bucket.capacity == 1000
+    assert bucket.rate == pytest.approx(100)
+    assert bucket.delay(10) == 0
+    assert bucket.delay(60) == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_limiter_paces_requests_with_headers() -> None:
+    limiter = RateLimiter()
+    headers = {
+        "x-ratelimit-limit-requests": "1200",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "1m",
+    }
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda _: httpx.Response(200, headers=headers)),
+        event_hooks=limiter.event_hooks("https://api.test/v1"),
+    )
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Hi"}]}
+
+    async with client:
+        await client.post("https://api.test/v1/chat/completions", json=body)
+        start = time.monotonic()
+        await client.post("https://api.test/v1/chat/completions", json=body)
+        assert time.monotonic() - start >= 0.04
+
+        # Other models and other requests are not paced
+        start = time.monotonic()
+        await client.post(
+            "https://api.test/v1/chat/completions", json={**body, "model": "gpt-4o"}
+        )
+        await client.get("https://api.test/v1/models")
+        assert time.monotonic() - start < 0.04
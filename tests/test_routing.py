@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from language_server.utils.routing import Endpoint, EndpointRouter
+
+PRIMARY = Endpoint("https://primary.test/v1", "gpt-4o-mini", "key")
+SECONDARY = Endpoint("https://secondary.test/v1", "gpt-4o-mini", "key")
+
+
+def record(router: EndpointRouter, endpoint: Endpoint, latencies: list[float]) -> None:
+    for latency in latencies:
+        router.record(endpoint, latency)
+
+
+def test_choose_prefers_unknown_then_faster_endpoints() -> None:
+    router = EndpointRouter()
+    record(router, PRIMARY, [1.0])
+    assert router.choose([PRIMARY, SECONDARY]) == SECONDARY
+
+    record(router, SECONDARY, [0.001])
+    choices = [router.choose([PRIMARY, SECONDARY]) for _ in range(100)]
+    assert choices.count(SECONDARY) > 90
+
+
+def test_streamed_latencies_are_kept_apart() -> None:
+    router = EndpointRouter()
+    for _ in range(5):
+        router.record(PRIMARY, 0.2, streamed=True)
+        router.record(PRIMARY, 2.0)
+    assert router.p90(PRIMARY, streamed=True) == 0.2
+    assert router.p90(PRIMARY) == 2.0
+    assert router.choose([PRIMARY, SECONDARY], streamed=True) == SECONDARY
+
+
+def test_p90() -> None:
+    router = EndpointRouter()
+    record(router, PRIMARY, [0.1, 0.2, 0.3, 0.4])
+    assert router.p90(PRIMARY) is None
+    record(router, PRIMARY, [0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 5.0])
+    assert router.p90(PRIMARY) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_hedge_cancels_slow_primary() -> None:
+    router = EndpointRouter()
+    record(router, PRIMARY, [0.01] * 10)
+    cancelled = []
+
+    async def request(endpoint: Endpoint) -> str | None:
+        try:
+            await asyncio.sleep(10 if endpoint == PRIMARY else 0)
+        except asyncio.CancelledError:
+            cancelled.append(endpoint)
+            raise
+        return endpoint.base_url
+
+    assert await router.hedge(PRIMARY, SECONDARY, request) == SECONDARY.base_url
+    await asyncio.sleep(0)
+    assert cancelled == [PRIMARY]
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_sent_if_primary_answers_in_time() -> None:
+    router = EndpointRouter()
+    requested = []
+
+    async def request(endpoint: Endpoint) -> str | None:
+        requested.append(endpoint)
+        return endpoint.base_url
+
+    assert await router.hedge(PRIMARY, SECONDARY, request) == PRIMARY.base_url
+    assert requested == [PRIMARY]
+
+
+@pytest.mark.asyncio
+async def test_hedge_falls_back_on_failure() -> None:
+    router = EndpointRouter()
+
+    async def request(endpoint: Endpoint) -> str | None:
+        if endpoint == PRIMARY:
+            raise ValueError("primary")
+        return endpoint.base_url
+
+    assert await router.hedge(PRIMARY, SECONDARY, request) == SECONDARY.base_url
+
+    async def fail(endpoint: Endpoint) -> str | None:
+        raise ValueError(endpoint.base_url)
+
+    with pytest.raises(ValueError, match="primary"):
+        await router.hedge(PRIMARY, SECONDARY, fail)
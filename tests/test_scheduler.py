@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from language_server.utils.scheduler import GenerationScheduler, Priority
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_each_endpoint() -> None:
+    scheduler = GenerationScheduler()
+    running: dict[str, int] = {"a": 0, "b": 0}
+    max_running: dict[str, int] = {"a": 0, "b": 0}
+
+    async def request(endpoint: str) -> None:
+        async with scheduler.slot(endpoint, priority=Priority.BATCH, max_concurrent=2):
+            running[endpoint] += 1
+            max_running[endpoint] = max(max_running[endpoint], running[endpoint])
+            await asyncio.sleep(0.01)
+            running[endpoint] -= 1
+
+    await asyncio.gather(*(request(endpoint) for endpoint in "aaaaabbb"))
+    assert max_running == {"a": 2, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_request_rate() -> None:
+    scheduler = GenerationScheduler()
+    starts: list[float] = []
+
+    async def request() -> None:
+        async with scheduler.slot(
+            "a", priority=Priority.BATCH, max_concurrent=10, requests_per_minute=1200
+        ):
+            starts.append(time.monotonic())
+
+    await asyncio.gather(*(request() for _ in range(3)))
+    assert starts[2] - starts[0] >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_scheduler_admits_by_priority() -> None:
+    scheduler = GenerationScheduler()
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: Priority) -> None:
+        async with scheduler.slot("a", priority=priority, max_concurrent=1):
+            order.append(name)
+            await release.wait()
+
+    blocker = asyncio.ensure_future(request("blocker", Priority.BATCH))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.ensure_future(request(name, priority))
+        for name, priority in [
+            ("speculative", Priority.SPECULATIVE),
+            ("batch", Priority.BATCH),
+            ("interactive", Priority.INTERACTIVE),
+        ]
+    ]
+    await asyncio.sleep(0)
+
+    # The interactive request uses the reserved slot
+    assert order == ["blocker", "interactive"]
+    metrics = scheduler.metrics()
+    assert metrics[Priority.BATCH].queued == 1
+    assert metrics[Priority.INTERACTIVE].running == 1
+
+    release.set()
+    await asyncio.gather(blocker, *waiting)
+    assert order == ["blocker", "interactive", "batch", "speculative"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_shares_slots_across_folders() -> None:
+    scheduler = GenerationScheduler()
+    order: list[str] = []
+    events = {name: asyncio.Event() for name in ["x1", "x2", "x3", "y1"]}
+
+    async def request(name: str) -> None:
+        async with scheduler.slot(
+            "a", priority=Priority.BATCH, max_concurrent=2, folder=name[0]
+        ):
+            order.append(name)
+            await events[name].wait()
+
+    tasks = []
+    for name in events:
+        tasks.append(asyncio.ensure_future(request(name)))
+        await asyncio.sleep(0)
+
+    # The folder y has no request running, so it goes before x3
+    events["x2"].set()
+    await asyncio.sleep(0.01)
+    assert order == ["x1", "x2", "y1"]
+
+    for event in events.values():
+        event.set()
+    await asyncio.gather(*tasks)
+    assert order == ["x1", "x2", "y1", "x3"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_leaves_queue() -> None:
+    scheduler = GenerationScheduler()
+    release = asyncio.Event()
+
+    async def request() -> None:
+        async with scheduler.slot("a", priority=Priority.BATCH, max_concurrent=1):
+            await release.wait()
+
+    first = asyncio.ensure_future(request())
+    second = asyncio.ensure_future(request())
+    await asyncio.sleep(0)
+    second.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await second
+    assert scheduler.metrics()[Priority.BATCH].queued == 0
+
+    release.set()
+    await first
+    assert scheduler.metrics()[Priority.BATCH].running == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_queued_requests_together_frees_slots() -> None:
+    scheduler = GenerationScheduler()
+
+    async def request() -> None:
+        async with scheduler.slot("a", priority=Priority.BATCH, max_concurrent=1):
+            await asyncio.sleep(10)
+
+    requests = asyncio.gather(*(request() for _ in range(3)))
+    await asyncio.sleep(0.01)
+    requests.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await requests
+    metrics = scheduler.metrics()[Priority.BATCH]
+    assert (metrics.queued, metrics.running) == (0, 0)
+
+    async with scheduler.slot("a", priority=Priority.BATCH, max_concurrent=1):
+        assert scheduler.metrics()[Priority.BATCH].running == 1
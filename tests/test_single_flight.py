@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from language_server.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_shared() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*[flights.run("key", call) for _ in range(3)])
+    assert results == [1, 1, 1]
+    assert not flights.is_running("key")
+
+    assert await flights.run("key", call) == 2
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_with_last_caller() -> None:
+    flights: SingleFlight[str] = SingleFlight()
+    started = asyncio.Event()
+    cancelled = False
+
+    async def call() -> str:
+        nonlocal cancelled
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "response"
+
+    first = asyncio.ensure_future(flights.run("key", call))
+    second = asyncio.ensure_future(flights.run("key", call))
+    await started.wait()
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await asyncio.sleep(0)
+    assert not cancelled
+    assert flights.is_running("key")
+
+    second.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await second
+    await asyncio.sleep(0)
+    assert cancelled
+    assert not flights.is_running("key")
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+
+import lsprotocol.types as lsp
+import pytest
+
+from language_server.utils.speculation import HourlyTokenBudget, Speculator
+
+
+def test_hourly_token_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 10000.0
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    budget = HourlyTokenBudget()
+    budget.add(100)
+    now += 1800
+    budget.add(50)
+    assert budget.used() == 150
+    now += 1801
+    assert budget.used() == 50
+
+
+@pytest.mark.asyncio
+async def test_speculator_runs_one_speculation() -> None:
+    speculator = Speculator()
+    cursor = lsp.Position(0, 0)
+    speculator.start("file:///a.py", cursor, "a", asyncio.sleep(10))
+    first = speculator.get("file:///a.py")
+    assert first is not None
+
+    speculator.start("file:///b.py", cursor, "b", asyncio.sleep(0))
+    second = speculator.get("file:///b.py")
+    assert second is not None
+    assert speculator.get("file:///a.py") is None
+
+    await second.task
+    await asyncio.sleep(0)
+    assert first.task.cancelled()
+    assert speculator.get("file:///b.py") is None
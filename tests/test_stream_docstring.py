@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from language_server.utils.docstring import is_docstring_complete, stream_docstring
+
+
+class FakeStream:
+    """Stream of chat completion chunks, tracking how many chunks were read."""
+
+    def __init__(self, contents: list[str]) -> None:
+        self.contents = contents
+        self.read = 0
+        self.closed = False
+
+    async def __aenter__(self) -> FakeStream:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:  # noqa: ANN401
+        self.closed = True
+
+    def __aiter__(self) -> FakeStream:
+        return self
+
+    async def __anext__(self) -> SimpleNamespace:
+        if self.read == len(self.contents):
+            raise StopAsyncIteration
+        content = self.contents[self.read]
+        self.read += 1
+        delta = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def create_client(stream: FakeStream) -> Any:  # noqa: ANN401
+    async def create(**kwargs: Any) -> FakeStream:  # noqa: ANN401
+        assert kwargs["stream"] is True
+        return stream
+
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+
+@pytest.mark.parametrize(
+    "response, expected",
+    [
+        ('"""Add two integers."""', True),
+        ('Here it is:\n"""Add two integers.\n"""\nDone', True),
+        ('"""Add two integers.', False),
+        ("Add two integers.", False),
+    ],
+)
+def test_is_docstring_complete(response: str, expected: bool) -> None:
+    assert is_docstring_complete(response) is expected
+
+
+@pytest.mark.asyncio
+async def test_stream_stops_after_docstring(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PYTEST_CURRENT_TEST")
+    stream = FakeStream(['"""Add', " two", ' integers."""', "\nUnneeded", " text"])
+    responses = [
+        response
+        async for response in stream_docstring(
+            client=create_client(stream), model="gpt-4o-mini", prompt=""
+        )
+    ]
+    assert responses == ['"""Add', '"""Add two', '"""Add two integers."""']
+    assert stream.read == 3
+    assert stream.closed